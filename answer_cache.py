@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import pickle
+import sqlite3
+import threading
+import numpy as np
+
+# --- SEMANTIC ANSWER CACHE ---
+# A cached answer is reused when a new question embeds within `threshold`
+# cosine similarity of a stored one AND retrieval returned the same parent
+# documents. Entries expire after `ttl` seconds, the least recently used are
+# evicted past `max_entries`, and re-ingesting a source drops every answer citing it.
+
+CACHE_NAME = "answer_cache.sqlite"
+
+
+class AnswerCache:
+    def __init__(self, db_path, threshold=0.95, ttl=7 * 24 * 3600, max_entries=5000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(db_path, exist_ok=True)
+        self.path = os.path.join(db_path, CACHE_NAME)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY,"
+            " query TEXT NOT NULL,"
+            " embedding BLOB NOT NULL,"
+            " parent_ids TEXT NOT NULL,"
+            " answer TEXT NOT NULL,"
+            " documents BLOB NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS answer_sources ("
+            " answer_id INTEGER NOT NULL,"
+            " source TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS answer_sources_source ON answer_sources(source);"
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        # Embeddings live in memory as one matrix, so a lookup is a single mat-vec
+        rows = self._conn.execute("SELECT id, embedding, parent_ids FROM answers").fetchall()
+        self._ids = [r[0] for r in rows]
+        self._parents = [r[2] for r in rows]
+        self._matrix = np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows]) if rows else None
+
+    @staticmethod
+    def _key(parent_ids):
+        return json.dumps(sorted(set(parent_ids)))
+
+    def lookup(self, query_vector, parent_ids):
+        """
+        Returns {"answer", "documents", "query"} or None.
+        """
+        with self._lock:
+            if self._matrix is None or not parent_ids:
+                self.misses += 1
+                return None
+            vec = np.asarray(query_vector, dtype=np.float32)
+            sims = self._matrix @ (vec / (np.linalg.norm(vec) or 1.0))
+            key = self._key(parent_ids)
+            now = time.time()
+            expired = []
+            hit = None
+            for i in np.argsort(-sims):
+                if sims[i] < self.threshold:
+                    break
+                if self._parents[i] != key:
+                    continue
+                row = self._conn.execute(
+                    "SELECT query, answer, documents, created FROM answers WHERE id = ?", (self._ids[i],)
+                ).fetchone()
+                if row is None:
+                    continue
+                if now - row[3] > self.ttl:
+                    # A less similar entry may still be fresh
+                    expired.append(self._ids[i])
+                    continue
+                self._conn.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, self._ids[i]))
+                self._conn.commit()
+                hit = {"query": row[0], "answer": row[1], "documents": pickle.loads(row[2])}
+                break
+            if expired:
+                self._delete(expired)  # Reloads the matrix, so only after the scan
+            if hit is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return hit
+
+    def put(self, query, query_vector, parent_ids, answer, documents):
+        if not parent_ids or not answer:
+            return
+        vec = np.asarray(query_vector, dtype=np.float32)
+        vec = vec / (np.linalg.norm(vec) or 1.0)
+        now = time.time()
+        sources = {d.metadata.get("source") for d in documents if d.metadata.get("source")}
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO answers(query, embedding, parent_ids, answer, documents, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (query, vec.tobytes(), self._key(parent_ids), answer,
+                 pickle.dumps(documents, protocol=pickle.HIGHEST_PROTOCOL), now, now),
+            )
+            self._conn.executemany("INSERT INTO answer_sources(answer_id, source) VALUES (?, ?)",
+                                   [(cur.lastrowid, s) for s in sources])
+            self._conn.commit()
+            if not self._evict(now):
+                self._ids.append(cur.lastrowid)
+                self._parents.append(self._key(parent_ids))
+                self._matrix = vec[None, :] if self._matrix is None else np.vstack([self._matrix, vec])
+
+    def _evict(self, now):
+        doomed = [r[0] for r in self._conn.execute("SELECT id FROM answers WHERE created < ?", (now - self.ttl,))]
+        excess = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0] - len(doomed) - self.max_entries
+        if excess > 0:
+            doomed += [r[0] for r in self._conn.execute(
+                "SELECT id FROM answers WHERE created >= ? ORDER BY last_used ASC LIMIT ?", (now - self.ttl, excess))]
+        if doomed:
+            self._delete(doomed)
+        return bool(doomed)
+
+    def _delete(self, ids):
+        self._conn.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in ids])
+        self._conn.executemany("DELETE FROM answer_sources WHERE answer_id = ?", [(i,) for i in ids])
+        self._conn.commit()
+        self._load()
+
+    def invalidate_source(self, source):
+        """
+        Drops every cached answer that cites `source` (called when it is re-ingested or removed).
+        """
+        with self._lock:
+            ids = [r[0] for r in self._conn.execute(
+                "SELECT DISTINCT answer_id FROM answer_sources WHERE source = ?", (source,))]
+            if ids:
+                self._delete(ids)
+            return len(ids)
+
+    def reload(self):
+        """
+        Re-reads the entries (another process may have added or invalidated some).
+        """
+        with self._lock:
+            self._load()
+
+    def clear(self):
+        with self._lock:
+            self._conn.executescript("DELETE FROM answers; DELETE FROM answer_sources;")
+            self._conn.commit()
+            self._load()
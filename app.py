@@ -1,8 +1,11 @@
+import time
+_IMPORT_START = time.perf_counter()
 import streamlit as st
 import os
-import re
 from rag_engine import RAGEngine
 from config import Config
+from startup import StartupTimer, Warmup
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 # Page Configuration
 st.set_page_config(page_title="Saudi Legal AI Advisor", layout="wide")
@@ -38,14 +41,79 @@ def get_engine():
     """Cache the RAG engine to prevent reloading on every click."""
     return RAGEngine()
 
+@st.cache_resource
+def get_warmup():
+    """Starts loading the model and indexes in the background, once per server."""
+    timer = StartupTimer()
+    timer.add("imports", _IMPORT_SECONDS)
+    warmup = Warmup(get_engine(), timer)
+    if Config.WARMUP == "blocking":
+        warmup.run()
+    elif Config.WARMUP != "off":
+        warmup.start()
+    return warmup
+
+def render_status(warmup):
+    status = warmup.status()
+    if status["state"] == "warming":
+        phase = status["phase"] or "..."
+        st.info(f"⏳ جاري تحميل النظام ({phase}) - {status['elapsed']:.0f}s")
+    elif status["state"] == "ready":
+        st.success(f"✅ جاهز (تم التحميل في {status['timings']['total']:.1f}s)")
+        with st.expander("⏱️ Startup timings"):
+            st.json(status["timings"])
+    elif status["state"] == "failed":
+        st.error(f"❌ فشل التحميل المسبق: {status['error']}")
+
+def render_live_status(warmup):
+    render_status(warmup)
+    if warmup.state != "warming":
+        # Loaded: one full rerun draws the static box, which ends this fragment's timer
+        st.rerun()
+
+# Re-render just the status box every second, only while loading (Streamlit >= 1.37)
+if hasattr(st, "fragment"):
+    render_live_status = st.fragment(run_every=1.0)(render_live_status)
+
+def render_trace(slot, trace):
+    """
+    Debug panel: where the last answer's time went (see tracing.py).
+    """
+    with slot.container():
+        if not trace:
+            st.caption("No question traced yet." if Config.TRACING else "Tracing is off (TRACING=0).")
+            return
+        st.dataframe(
+            [{"stage": "\u2003" * row["depth"] + row["span"], "ms": row["ms"]} for row in trace],
+            hide_index=True,
+        )
+
+def wait_until_ready(warmup):
+    if warmup.state == "warming":
+        with st.spinner("جاري تحميل النموذج والفهارس..."):
+            warmup.wait()
+
 def main():
-    # Initialize Engine
+    # Initialize Engine (heavy parts load in the background, see startup.py)
     engine = get_engine()
+    warmup = get_warmup()
 
     # --- SIDEBAR ---
     with st.sidebar:
         st.header("⚙️ Control Panel")
         st.info(f"Mode: **{Config.MODE}**")
+        if warmup.state == "warming" and hasattr(st, "fragment"):
+            render_live_status(warmup)
+        else:
+            render_status(warmup)
+
+        st.divider()
+        st.subheader("🔎 Search Scope")
+        subjects = [s["subject"] for s in engine.subjects()]
+        selected_subjects = st.multiselect("الأنظمة", subjects, placeholder="كل الأنظمة")
+        auto_route = st.toggle("🧭 Auto-select the law", value=Config.LAW_ROUTER,
+                               disabled=bool(selected_subjects),
+                               help="Searches only the laws closest to the question")
         
         st.divider()
         st.subheader("📂 Upload Documents")
@@ -53,6 +121,7 @@ def main():
         
         if uploaded_file:
             if st.button("Process & Ingest File"):
+                wait_until_ready(warmup)
                 with st.spinner("Processing & Indexing..."):
                     # Save locally
                     if not os.path.exists(Config.DATA_PATH):
@@ -71,10 +140,17 @@ def main():
 
         st.divider()
         if st.button("🔄 Re-Index All Data Folder"):
+            wait_until_ready(warmup)
             with st.spinner("Scanning 'data' folder..."):
                 engine.ingest_all_data()
                 st.success("✅ All files re-indexed!")
 
+        st.divider()
+        with st.expander("🐞 Last question breakdown"):
+            # Filled again once the current answer is done
+            trace_slot = st.empty()
+            render_trace(trace_slot, st.session_state.get("last_trace"))
+
     # --- MAIN CHAT ---
     st.title("⚖️ المساعد القانوني السعودي")
     st.caption("نظام ذكي للإجابة على الاستفسارات القانونية بناءً على الأنظمة السعودية.")
@@ -95,43 +171,56 @@ def main():
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # 2. Generate Answer
+        # 2. Generate Answer (streamed: sources first, then tokens as they arrive)
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
-            with st.spinner("جاري البحث في المصادر..."):
-                try:
-                    qa_chain = engine.get_qa_chain()
-                    response = qa_chain.invoke({"query": prompt})
-                    
-                    answer = response['result']
-                    
-                    # Remove <think> blocks if present
-                    answer = re.sub(r'<think>.*?</think>', '', answer, flags=re.DOTALL).strip()
-                    
-                    sources = response['source_documents']
-                    
-                    # Display the Main Answer
-                    message_placeholder.markdown(answer)
-                    
-                    # --- CITATION BLOCK (The part you asked for) ---
-                    if sources:
-                        with st.expander("📚 المصادر والمواد القانونية المستخدمة"):
-                            for i, doc in enumerate(sources):
-                                # Extract Metadata
-                                source_file = doc.metadata.get('source', 'Unknown')
-                                article_num = doc.metadata.get('article', 'General')
-                                subject = doc.metadata.get('subject', 'Law')
-                                
-                                # Display nicely
-                                st.markdown(f"**{i+1}. {subject}** - `{article_num}`")
-                                st.caption(f"الملف: {source_file}")
-                                st.text(doc.page_content[:300] + "...") # Preview text
-                    
-                    # Save History
-                    st.session_state.messages.append({"role": "assistant", "content": answer})
-                    
-                except Exception as e:
-                    st.error(f"حدث خطأ: {str(e)}")
+            try:
+                wait_until_ready(warmup)
+                answer = ""
+                timing = None
+                events = engine.stream_answer(prompt, subjects=selected_subjects, route=auto_route)
+                with st.spinner("جاري البحث في المصادر..."):
+                    # Retrieval happens before the first ("sources") event
+                    retrieved = next(events)
+                    sources = retrieved["documents"]
+                if retrieved.get("scope") and not selected_subjects:
+                    st.caption(f"🧭 {' | '.join(retrieved['scope'])}")
+                for event in events:
+                    if event["type"] == "token":
+                        answer += event["text"]
+                        message_placeholder.markdown(answer + "▌")
+                    elif event["type"] == "done":
+                        timing = event
+                
+                answer = answer.strip()
+                
+                # Display the Main Answer
+                message_placeholder.markdown(answer)
+                if timing:
+                    cached = " | ⚡ إجابة محفوظة" if timing.get("cached") else ""
+                    st.caption(f"⏱️ أول كلمة: {timing['ttft']:.2f}s | الإجمالي: {timing['total']:.2f}s{cached}")
+                    st.session_state.last_trace = timing.get("trace")
+                    render_trace(trace_slot, st.session_state.last_trace)
+                
+                # --- CITATION BLOCK (The part you asked for) ---
+                if sources:
+                    with st.expander("📚 المصادر والمواد القانونية المستخدمة"):
+                        for i, doc in enumerate(sources):
+                            # Extract Metadata
+                            source_file = doc.metadata.get('source', 'Unknown')
+                            article_num = doc.metadata.get('article', 'General')
+                            subject = doc.metadata.get('subject', 'Law')
+                            
+                            # Display nicely
+                            st.markdown(f"**{i+1}. {subject}** - `{article_num}`")
+                            st.caption(f"الملف: {source_file}")
+                            st.text(doc.page_content[:300] + "...") # Preview text
+                
+                # Save History
+                st.session_state.messages.append({"role": "assistant", "content": answer})
+                
+            except Exception as e:
+                st.error(f"حدث خطأ: {str(e)}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,172 @@
+import re
+import unicodedata
+from typing import List
+from langchain_core.embeddings import Embeddings
+
+# --- ARABIC NORMALIZATION ---
+# Translation tables are built once at import; str.translate then folds a whole
+# string in a single C-level pass.
+# Three levels:
+#   display_text    -- lossless folds applied to every page at ingest, so the
+#                      stored text (what users and the LLM read) keeps its
+#                      diacritics, hamza spelling and digits: presentation forms
+#                      -> base letters, tatweel and invisible marks removed.
+#   normalize_text  -- what the embedder sees, for documents and queries alike
+#                      (NormalizedEmbeddings): display_text plus alef/ya/hamza
+#                      variants unified, diacritics removed, digits made ASCII.
+#   fold_for_search -- further folds (ta marbuta, case) for the BM25, article
+#                      and packing keys.
+
+TATWEEL = 'ـ'
+DIACRITICS = [chr(c) for c in range(0x064B, 0x0660)] + ['ٰ']
+
+
+def _presentation_forms():
+    """
+    Maps Arabic presentation forms (U+FB50-U+FDFF, U+FE70-U+FEFF) to base letters.
+    Ligatures such as 'ﻻ' expand to several characters.
+    """
+    table = {}
+    for block in (range(0xFB50, 0xFE00), range(0xFE70, 0xFF00)):
+        for code in block:
+            ch = chr(code)
+            base = unicodedata.normalize('NFKC', ch)
+            if base != ch:
+                table[code] = base.strip()
+    return table
+
+
+# Zero-width and bidi control marks left behind by PDF extractors and reshaping
+INVISIBLE = ['\u200b', '\u200c', '\u200d', '\u200e', '\u200f', '\u061c', '\ufeff',
+             '\u202a', '\u202b', '\u202c', '\u202d', '\u202e', '\u2066', '\u2067', '\u2068', '\u2069']
+# Joins a page batch for one translate() call; maps to itself, so it splits back exactly
+PAGE_SEPARATOR = '\x00'
+# Stored in the manifest: text normalized differently has to be re-indexed
+NORMALIZATION = "norm2"
+
+
+def _display_table():
+    table = {ord(c): None for c in [TATWEEL] + INVISIBLE}
+    table[0x00A0] = ' '
+    table.update(_presentation_forms())
+    return table
+
+
+def _normalize_table():
+    table = {ord(c): None for c in DIACRITICS + [TATWEEL] + INVISIBLE}
+    table[0x00A0] = ' '
+    # Fold letter variants that users (and OCR/PDF text) mix freely
+    table.update({ord(c): 'ا' for c in 'أإآٱ'})
+    table.update({ord('ى'): 'ي', ord('ئ'): 'ي', ord('ؤ'): 'و'})
+    # Arabic-Indic and Persian digits -> ASCII
+    table.update({0x0660 + i: str(i) for i in range(10)})
+    table.update({0x06F0 + i: str(i) for i in range(10)})
+    # Presentation forms expand to base letters, which are then folded the same way
+    table.update({code: base.translate(table) for code, base in _presentation_forms().items()})
+    return table
+
+
+def _search_table():
+    table = dict(NORMALIZE_TABLE)
+    table[ord('ة')] = 'ه'
+    # Presentation forms of ta marbuta have to follow the base letter
+    table.update({code: value.replace('ة', 'ه') for code, value in table.items()
+                  if isinstance(value, str) and 'ة' in value})
+    return table
+
+
+DISPLAY_TABLE = _display_table()
+NORMALIZE_TABLE = _normalize_table()
+SEARCH_TABLE = _search_table()
+TOKEN_RE = re.compile(r'\w+')
+
+
+def _chars_pattern(table):
+    return re.compile('[' + ''.join(re.escape(chr(code)) for code in sorted(table)) + ']')
+
+
+# translate() does a dict lookup per character even when nothing maps; a regex
+# scan for any mapped character is several times cheaper, so text that is
+# already clean (most born-digital PDFs under DISPLAY_TABLE) is returned as is.
+_TABLE_CHARS = {id(table): _chars_pattern(table)
+                for table in (DISPLAY_TABLE, NORMALIZE_TABLE, SEARCH_TABLE)}
+
+
+def _translate(text, table):
+    pattern = _TABLE_CHARS.get(id(table))
+    if pattern is not None and pattern.search(text) is None:
+        return text
+    return text.translate(table)
+
+
+def display_text(text):
+    """
+    Lossless folds applied to the stored text (see above).
+    """
+    return _translate(text, DISPLAY_TABLE)
+
+
+def normalize_text(text):
+    """
+    Embedding-side normalization, shared by documents and queries (see above).
+    Drops diacritics and hamza spelling, so never for stored or displayed text.
+    """
+    return text.translate(NORMALIZE_TABLE)
+
+
+def normalize_batch(texts, table=NORMALIZE_TABLE):
+    """
+    normalize_text() (or another table) over a list of texts with a single
+    translate() call.
+    """
+    if not texts:
+        return []
+    text = PAGE_SEPARATOR.join(t.replace(PAGE_SEPARATOR, '') for t in texts)
+    return _translate(text, table).split(PAGE_SEPARATOR)
+
+
+def iter_normalized(texts, batch_chars=200_000, table=NORMALIZE_TABLE):
+    """
+    Streams normalize_batch() over an iterable of page texts: pages are buffered
+    until `batch_chars` and translated together, then yielded in order.
+    """
+    batch, size = [], 0
+    for text in texts:
+        batch.append(text)
+        size += len(text)
+        if size >= batch_chars:
+            yield from normalize_batch(batch, table)
+            batch, size = [], 0
+    yield from normalize_batch(batch, table)
+
+
+class NormalizedEmbeddings(Embeddings):
+    """
+    Applies normalize_text() to everything sent to the wrapped embedder, so
+    stored chunks and queries are embedded in the same folded form.
+    """
+
+    def __init__(self, inner: Embeddings):
+        self.inner = inner
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(normalize_batch(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.inner.embed_query(normalize_text(text))
+
+    def report(self):
+        if hasattr(self.inner, "report"):
+            self.inner.report()
+
+
+def fold_for_search(text):
+    """
+    Aggressive fold used for index keys and query terms (never for display):
+    normalize_text() plus ta marbuta -> ha and lower case.
+    """
+    return text.translate(SEARCH_TABLE).lower()
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(fold_for_search(text))
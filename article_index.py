@@ -0,0 +1,214 @@
+import os
+import re
+import json
+import threading
+from arabic_norm import fold_for_search, tokenize
+
+# --- DIRECT ARTICLE LOOKUP ---
+# (subject, article number) -> parent doc ids, built from the `article` metadata
+# that smart_split attaches to every section. Citation queries such as
+# "ما نص المادة الخامسة من نظام حماية البيانات" resolve here without the embedding model.
+
+INDEX_NAME = "article_index.json"
+
+# Ordinal words, folded with fold_for_search and without the leading "ال"
+_UNITS = {
+    'اول': 1, 'اولي': 1, 'حادي': 1, 'حاديه': 1,
+    'ثاني': 2, 'ثانيه': 2, 'ثالث': 3, 'ثالثه': 3,
+    'رابع': 4, 'رابعه': 4, 'خامس': 5, 'خامسه': 5,
+    'سادس': 6, 'سادسه': 6, 'سابع': 7, 'سابعه': 7,
+    'ثامن': 8, 'ثامنه': 8, 'تاسع': 9, 'تاسعه': 9,
+    'عاشر': 10, 'عاشره': 10,
+}
+_TEEN = {'عشر', 'عشره'}
+_TENS = {
+    'عشرون': 20, 'عشرين': 20, 'ثلاثون': 30, 'ثلاثين': 30,
+    'اربعون': 40, 'اربعين': 40, 'خمسون': 50, 'خمسين': 50,
+    'ستون': 60, 'ستين': 60, 'سبعون': 70, 'سبعين': 70,
+    'ثمانون': 80, 'ثمانين': 80, 'تسعون': 90, 'تسعين': 90,
+}
+_HUNDREDS = {
+    'مايه': 100, 'ميه': 100, 'مايتان': 200, 'مايتين': 200, 'ميتان': 200, 'ميتين': 200,
+}
+_FILLER = {'بعد', 'رقم'}
+# Words every law title shares; they say nothing about *which* law is meant
+_GENERIC_TITLE_WORDS = {
+    'نظام', 'لنظام', 'النظام', 'قانون', 'لقانون', 'القانون', 'لايحه', 'اللايحه',
+    'law', 'laws', 'the', 'of', 'and', 'chapter', 'part',
+    'general', 'provisions', 'introduction', 'preamble',
+}
+# A query that says "law"/"نظام"/"قانون" names a law: it must match one, even
+# when only a single law has the article number
+_LAW_RE = re.compile(r'(?:^|\s)(?:و?(?:[لب]?ال|لل|[لب])?(?:نظام|قانون|لايحه)|law|act|code|regulations?)(?=\s|$)')
+
+_ARTICLE_RE = re.compile(r'(?:^|\s)(?:الماده|ماده|للماده|بالماده|article|art)\s*[\(\[]?\s*((?:\S+\s*){1,5})')
+_DIGITS_RE = re.compile(r'^\(?(\d+)')
+_CAMEL_RE = re.compile(r'(?<=[a-z])(?=[A-Z])')
+
+
+def _strip_prefixes(word):
+    if word.startswith('و') and len(word) > 3:
+        word = word[1:]
+    if word.startswith('ال'):
+        word = word[2:]
+    return word
+
+
+def parse_article_number(text):
+    """
+    'المادة 12' / 'Article 12' / 'المادة الخامسة عشرة' / 'الحادية بعد المائة' -> int.
+    `text` is what follows the article keyword. Returns None if no number is found.
+    """
+    text = fold_for_search(text).strip()
+    m = _DIGITS_RE.match(text)
+    if m:
+        return int(m.group(1))
+    total = 0
+    for word in re.findall(r'\w+', text):
+        if word.isdigit():
+            return int(word) if not total else total
+        stem = _strip_prefixes(word)
+        if stem in _UNITS:
+            total += _UNITS[stem]
+        elif stem in _TEEN and total:
+            total += 10
+        elif stem in _TENS:
+            total += _TENS[stem]
+        elif stem in _HUNDREDS:
+            total += _HUNDREDS[stem]
+        elif stem in _FILLER:
+            continue
+        else:
+            break
+    return total or None
+
+
+def article_number(title):
+    """
+    Article number of a section title ('المادة الخامسة' / 'Article 5'), or None.
+    """
+    m = _ARTICLE_RE.search(fold_for_search(title))
+    return parse_article_number(m.group(1)) if m else None
+
+
+def title_words(text):
+    return {w for w in tokenize(text) if len(w) > 1 and not w.isdigit() and w not in _GENERIC_TITLE_WORDS}
+
+
+def subject_words(subject):
+    """
+    'PersonalData' / 'Bankruptcy Law' -> {'personal', 'data'} / {'bankruptcy'}
+    """
+    return title_words(_CAMEL_RE.sub(' ', subject).replace('_', ' '))
+
+
+class ArticleIndex:
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.articles = {}   # subject -> {article number (str, JSON keys) -> [parent ids]}
+        self.titles = {}     # subject -> title words (law name from the preamble + file name)
+        self.dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                self.articles = state.get("articles", {})
+                self.titles = state.get("titles", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Article index unreadable ({e}). It will be rebuilt.")
+        self._reindex_parents()
+
+    def _reindex_parents(self):
+        self._parents = {}  # parent id -> (subject, number) for deletes
+        for subject, numbers in self.articles.items():
+            for number, ids in numbers.items():
+                for pid in ids:
+                    self._parents[pid] = (subject, number)
+
+    def __len__(self):
+        return len(self._parents)
+
+    def add(self, parent_ids, documents):
+        with self._lock:
+            for pid, doc in zip(parent_ids, documents):
+                meta = doc.metadata or {}
+                subject = meta.get("subject")
+                title = meta.get("article", "")
+                if not subject:
+                    continue
+                if subject not in self.titles:
+                    self.titles[subject] = sorted(subject_words(subject))
+                number = article_number(title)
+                if number is None:
+                    if not self.articles.get(subject):
+                        # Preamble: its last lines usually carry the law's name
+                        self._add_title(subject, doc.page_content)
+                    continue
+                key = str(number)
+                self.articles.setdefault(subject, {}).setdefault(key, []).append(pid)
+                self._parents[pid] = (subject, key)
+            self.dirty = True
+
+    def _add_title(self, subject, text):
+        lines = [l for l in text.split('\n') if l.strip() and not l.startswith(("Source:", "Section:", "Part:"))]
+        words = set(self.titles[subject])
+        for line in lines[-2:]:
+            words.update(title_words(line))
+        self.titles[subject] = sorted(words)
+
+    def remove(self, parent_ids):
+        with self._lock:
+            for pid in parent_ids:
+                where = self._parents.pop(pid, None)
+                if where is None:
+                    continue
+                subject, key = where
+                ids = self.articles[subject][key]
+                ids.remove(pid)
+                if not ids:
+                    del self.articles[subject][key]
+                if not self.articles[subject]:
+                    del self.articles[subject]
+                    self.titles.pop(subject, None)
+                self.dirty = True
+
+    def lookup(self, query):
+        """
+        Returns the parent ids of the article a citation query asks for, or None
+        when the query is not a citation or the law cannot be pinned down.
+        """
+        folded = fold_for_search(query)
+        m = _ARTICLE_RE.search(folded)
+        if not m:
+            return None
+        number = parse_article_number(m.group(1))
+        if number is None:
+            return None
+        key = str(number)
+        candidates = [s for s, numbers in self.articles.items() if key in numbers]
+        if not candidates:
+            return None
+        if len(candidates) > 1 or _LAW_RE.search(folded):
+            # Pick the law whose name the query covers best; a law the query
+            # names but no candidate matches is not ours to answer
+            words = set(tokenize(folded))
+            scored = sorted(
+                ((len(words & set(self.titles.get(s, ()))) / max(len(self.titles.get(s, ())), 1), s) for s in candidates),
+                reverse=True,
+            )
+            if scored[0][0] == 0 or (len(scored) > 1 and scored[0][0] == scored[1][0]):
+                return None
+            candidates = [scored[0][1]]
+        return list(self.articles[candidates[0]][key])
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"articles": self.articles, "titles": self.titles}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+            self.dirty = False
@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+# --- ANN INDEX BENCHMARK ---
+# Builds Chroma HNSW indexes over growing corpora and compares them with exact
+# (brute-force) search over the same vectors:
+#   build_s        time to insert the corpus (HNSW construction)
+#   p50_ms/p95_ms  single-query latency
+#   recall@k       overlap of the ANN top-k with the exact top-k
+# for the single collection, the per-subject sharded layout (all shards queried
+# in parallel, hits merged by distance) and the sharded layout restricted to
+# the query's own subject (what a law filter / the law router searches; recall
+# is still measured against the whole corpus). Vectors are synthetic clustered
+# embeddings (one cluster per "law"), or real ones read from an index (--db).
+# Run: python -m benchmarks.bench_ann --sizes 5000 20000 80000 --ef-search 32 64 128
+
+
+def synthetic_corpus(size, dim, subjects, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(subjects, dim)).astype(np.float32)
+    labels = rng.integers(0, subjects, size=size)
+    vectors = centers[labels] + rng.normal(scale=1.5, size=(size, dim)).astype(np.float32)
+    return normalize(vectors), labels
+
+
+def db_corpus(db_path, size, seed=0):
+    import chromadb
+    client = chromadb.PersistentClient(path=os.path.join(db_path, "chroma_vectors"))
+    vectors, subjects = [], []
+    for collection in client.list_collections():
+        name = getattr(collection, "name", collection)
+        if not name.startswith(Config.VECTOR_COLLECTION):
+            continue
+        batch = client.get_collection(name).get(include=["embeddings", "metadatas"])
+        vectors.extend(batch["embeddings"])
+        subjects.extend(m.get("subject", "") for m in batch["metadatas"])
+    vectors = normalize(np.asarray(vectors, dtype=np.float32))
+    names = sorted(set(subjects))
+    labels = np.array([names.index(s) for s in subjects])
+    rng = np.random.default_rng(seed)
+    # Larger-than-index sizes are filled by jittered copies, so growth can still be measured
+    pick = rng.choice(len(vectors), size=size, replace=size > len(vectors))
+    jitter = rng.normal(scale=0.01, size=(size, vectors.shape[1])).astype(np.float32) if size > len(vectors) else 0
+    return normalize(vectors[pick] + jitter), labels[pick]
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+
+
+def make_queries(corpus, count, seed=1):
+    """
+    Queries near random corpus vectors. Returns (queries, source rows).
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(corpus), size=count, replace=False)
+    picks = corpus[rows]
+    return normalize(picks + rng.normal(scale=0.02, size=picks.shape).astype(np.float32)), rows
+
+
+def exact_topk(corpus, queries, k):
+    sims = queries @ corpus.T
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def build_collection(client, name, vectors, ids, metadata, batch=5000):
+    collection = client.create_collection(name, metadata=metadata)
+    for i in range(0, len(vectors), batch):
+        collection.add(ids=ids[i:i + batch], embeddings=vectors[i:i + batch].tolist())
+    return collection
+
+
+def measure(search, queries, truth, k, subjects):
+    latencies, recalls = [], []
+    for query, expected, subject in zip(queries, truth, subjects):
+        start = time.perf_counter()
+        found = search(query, k, subject)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(set(found) & set(expected)) / k)
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+    }
+
+
+def run_size(client, corpus, labels, queries, query_labels, k, ef_search, threads):
+    truth = exact_topk(corpus, queries, k)
+    ids = [str(i) for i in range(len(corpus))]
+    results = {"size": len(corpus)}
+    for ef in ef_search:
+        metadata = {
+            "hnsw:space": "cosine",
+            "hnsw:M": Config.HNSW_M,
+            "hnsw:construction_ef": Config.HNSW_EF_CONSTRUCTION,
+            "hnsw:search_ef": ef,
+        }
+        tag = f"{len(corpus)}_{ef}"
+
+        # Single collection
+        start = time.perf_counter()
+        single = build_collection(client, f"bench_single_{tag}", corpus, ids, metadata)
+        build = time.perf_counter() - start
+
+        def search_single(query, k, subject):
+            hits = single.query(query_embeddings=[query.tolist()], n_results=k)
+            return [int(i) for i in hits["ids"][0]]
+
+        results[f"single_ef{ef}"] = {"build_s": round(build, 2),
+                                     **measure(search_single, queries, truth, k, query_labels)}
+
+        # One collection per subject, queried in parallel and merged by distance
+        start = time.perf_counter()
+        shards = {}
+        for label in np.unique(labels):
+            rows = np.flatnonzero(labels == label)
+            shards[label] = build_collection(client, f"bench_shard_{tag}_{label}", corpus[rows],
+                                             [ids[r] for r in rows], metadata)
+        build = time.perf_counter() - start
+        pool = ThreadPoolExecutor(max_workers=threads)
+
+        def one(shard, query, k):
+            hits = shard.query(query_embeddings=[query.tolist()], n_results=min(k, shard.count()))
+            return zip(hits["distances"][0], hits["ids"][0])
+
+        def search_sharded(query, k, subject):
+            merged = sorted(hit for hits in pool.map(lambda s: one(s, query, k), shards.values()) for hit in hits)
+            return [int(i) for _, i in merged[:k]]
+
+        def search_routed(query, k, subject):
+            return [int(i) for _, i in sorted(one(shards[subject], query, k))]
+
+        results[f"sharded_ef{ef}"] = {"build_s": round(build, 2), "shards": len(shards),
+                                      **measure(search_sharded, queries, truth, k, query_labels)}
+        results[f"routed_ef{ef}"] = measure(search_routed, queries, truth, k, query_labels)
+        pool.shutdown()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recall and latency of the HNSW index vs brute force.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 50000])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[Config.HNSW_EF_SEARCH])
+    parser.add_argument("--dim", type=int, default=1024, help="Synthetic vector size (bge-m3: 1024)")
+    parser.add_argument("--subjects", type=int, default=12, help="Synthetic laws (clusters / shards)")
+    parser.add_argument("--db", help="Sample real vectors from this index instead of synthetic ones")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=Config.RETRIEVAL_FETCH_K)
+    parser.add_argument("--threads", type=int, default=Config.VECTOR_SHARD_THREADS)
+    args = parser.parse_args(argv)
+
+    import chromadb
+    workdir = tempfile.mkdtemp(prefix="bench_ann_")
+    client = chromadb.PersistentClient(path=workdir)
+    print(f"📊 HNSW M={Config.HNSW_M} ef_construction={Config.HNSW_EF_CONSTRUCTION}, k={args.k}, "
+          f"{'vectors from ' + args.db if args.db else f'synthetic dim={args.dim}, {args.subjects} subjects'}")
+    runs = []
+    try:
+        for size in args.sizes:
+            if args.db:
+                corpus, labels = db_corpus(args.db, size)
+            else:
+                corpus, labels = synthetic_corpus(size, args.dim, args.subjects)
+            queries, rows = make_queries(corpus, min(args.queries, size))
+            result = run_size(client, corpus, labels, queries, labels[rows], args.k, args.ef_search, args.threads)
+            print(f"   {size:>7} vectors: " + ", ".join(
+                f"{name} p95 {m['p95_ms']}ms recall {m[f'recall@{args.k}']}"
+                for name, m in result.items() if name != "size"))
+            runs.append(result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(json.dumps({"k": args.k, "hnsw": {"M": Config.HNSW_M, "ef_construction": Config.HNSW_EF_CONSTRUCTION},
+                      "results": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
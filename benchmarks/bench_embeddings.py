@@ -0,0 +1,90 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from pipeline import list_data_files
+
+# --- EMBEDDING BACKEND BENCHMARK ---
+# Embeds the same chunks (from the data folder) with each backend and reports:
+#   throughput   chunks/s for embed_documents
+#   query_ms     mean latency of a single embed_query
+#   agreement    mean cosine to the torch vector of the same chunk
+#   recall@k     overlap of each chunk's k nearest neighbours with torch's
+# Run: python -m benchmarks.bench_embeddings --backends torch onnx onnx-int8
+
+
+def load_chunks(data_path, limit):
+    from extraction import load_file
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=400, chunk_overlap=100)
+    chunks = []
+    for path in list_data_files(data_path):
+        for doc in splitter.split_documents(load_file(path)):
+            chunks.append(doc.page_content)
+            if len(chunks) >= limit:
+                return chunks
+    return chunks
+
+
+def neighbours(matrix, k):
+    sims = matrix @ matrix.T
+    np.fill_diagonal(sims, -np.inf)
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def run_backend(backend, chunks, queries):
+    embeddings = Config.get_base_embeddings(device="cpu", backend=backend)
+    embeddings.embed_documents(chunks[:8])  # warm-up (graph optimisation, lazy allocations)
+
+    start = time.perf_counter()
+    vectors = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+    elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for q in queries:
+        embeddings.embed_query(q)
+    query_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+    return vectors, {"chunks_per_s": round(len(chunks) / elapsed, 2), "query_ms": round(query_ms, 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare embedding backends on the data folder.")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--data", default=Config.DATA_PATH)
+    parser.add_argument("--limit", type=int, default=500, help="Max chunks to embed")
+    parser.add_argument("--queries", type=int, default=50, help="Single-query latency samples")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    chunks = load_chunks(args.data, args.limit)
+    if not chunks:
+        print(f"⚠️ No chunks found in {args.data}.")
+        return
+    queries = chunks[:args.queries]
+    print(f"📊 {len(chunks)} chunks, backends: {', '.join(args.backends)}")
+
+    results, reference, reference_nn = {}, None, None
+    for backend in args.backends:
+        vectors, metrics = run_backend(backend, chunks, queries)
+        if reference is None:
+            reference, reference_nn = vectors, neighbours(vectors, args.k)
+            metrics["reference"] = True
+        else:
+            nn = neighbours(vectors, args.k)
+            metrics["agreement"] = round(float(np.mean(np.sum(vectors * reference, axis=1))), 4)
+            metrics[f"recall@{args.k}"] = round(float(np.mean(
+                [len(set(a) & set(b)) / args.k for a, b in zip(nn, reference_nn)])), 4)
+        results[backend] = metrics
+        print(f"   {backend}: {metrics}")
+
+    print(json.dumps({"chunks": len(chunks), "k": args.k, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
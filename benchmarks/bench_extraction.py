@@ -0,0 +1,112 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+from config import Config
+from pipeline import list_data_files
+from article_index import article_number
+from arabic_norm import DISPLAY_TABLE, normalize_batch
+from extraction import PDF_BACKENDS, clean_text, iter_sections, text_quality, choose_pdf_backend
+
+# --- EXTRACTION BENCHMARK ---
+# For every PDF in the data folder and every installed PDF backend (OCR off):
+#   chars_per_s     page extraction + cleaning throughput
+#   display_ms      display folds (arabic_norm.DISPLAY_TABLE) over the pages
+#   segment_ms      single-pass article segmentation of the folded pages
+#                   (legacy_split_ms: the old re.split + per-segment re.match
+#                   approach on the same text, for a like-for-like reference)
+#   quality         extraction.text_quality of the whole text
+#   articles        article sections found; accuracy = share of the expected
+#                   article numbers 1..N found, where N comes from --truth
+#                   ({"file.pdf": N}) or the highest number detected
+# Run: python -m benchmarks.bench_extraction [--truth counts.json]
+
+_LEGACY_PATTERN = r'(?:^|\n)((?:Article|المادة|اﻟﻤﺎدة)\s+(?:\d+|\w+(?:\s+\w+){0,4}))'
+
+
+def legacy_split(text, source):
+    # The former smart_split: regex compiled per call, then re.match per segment
+    docs = []
+    title = "Introduction"
+    for seg in re.split(_LEGACY_PATTERN, text):
+        seg = seg.strip()
+        if not seg:
+            continue
+        if re.match(r'^(Article|المادة|اﻟﻤﺎدة)', seg):
+            title = seg
+        elif len(seg) > 20:
+            docs.append(Document(page_content=f"Source: {source}\nSection: {title}\n\n{seg}",
+                                 metadata={"source": source, "article": title}))
+    return docs
+
+
+def run(path, backend, expected=None):
+    start = time.perf_counter()
+    pages = [clean_text(p) for p in backend.pages(path, ocr_jobs=1)]
+    extract = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pages = normalize_batch(pages, DISPLAY_TABLE)
+    display = time.perf_counter() - start
+    text = "\n".join(pages)
+
+    start = time.perf_counter()
+    sections = list(iter_sections(pages, os.path.basename(path)))
+    segment = time.perf_counter() - start
+    start = time.perf_counter()
+    legacy_split(text, os.path.basename(path))
+    legacy = time.perf_counter() - start
+
+    numbers = [article_number(d.metadata["article"]) for d in sections]
+    found = {n for n in numbers if n}
+    expected = expected or max(found, default=0)
+    return {
+        "pages": len(pages),
+        "chars": len(text),
+        "chars_per_s": round(len(text) / extract) if extract > 0 else 0,
+        "display_ms": round(display * 1000, 1),
+        "segment_ms": round(segment * 1000, 1),
+        "legacy_split_ms": round(legacy * 1000, 1),
+        "quality": round(text_quality(text), 3),
+        "sections": len(sections),
+        "articles": sum(1 for n in numbers if n),
+        "expected_articles": expected,
+        "accuracy": round(len(found & set(range(1, expected + 1))) / expected, 3) if expected else None,
+        "unparsed_titles": sum(1 for d, n in zip(sections, numbers)
+                               if n is None and d.metadata["article"] != "Introduction"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare PDF backends on the data folder.")
+    parser.add_argument("--data", default=Config.DATA_PATH)
+    parser.add_argument("--truth", help="JSON file {\"file.pdf\": expected article count}")
+    args = parser.parse_args(argv)
+
+    truth = {}
+    if args.truth:
+        with open(args.truth, "r", encoding="utf-8") as f:
+            truth = json.load(f)
+    Config.OCR_ENABLED = False  # Measure the text layer only
+
+    results = {}
+    backends = [b for b in PDF_BACKENDS.values() if b.available()]
+    for path in list_data_files(args.data):
+        if not path.lower().endswith(".pdf"):
+            continue
+        name = os.path.basename(path)
+        results[name] = {"auto": choose_pdf_backend(path).name}
+        for backend in backends:
+            results[name][backend.name] = run(path, backend, truth.get(name))
+            print(f"   {name} [{backend.name}]: {results[name][backend.name]}")
+    print(json.dumps({"backends": [b.name for b in backends], "results": results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from pipeline import list_data_files
+from arabic_norm import DISPLAY_TABLE, TOKEN_RE, normalize_text, normalize_batch, iter_normalized
+from extraction import PDF_BACKENDS, ARTICLE_PATTERN, clean_text, fix_arabic_text
+
+# --- NORMALIZATION BENCHMARK ---
+# Page texts of every PDF in the data folder (PyMuPDF, OCR off), cleaned as at
+# ingest, then:
+#   per_page_mb_s   normalize_text() page by page (the embedder-side fold)
+#   batch_mb_s      iter_normalized() (one translate per page batch)
+#   display_mb_s    the display folds in page batches (what ingest stores)
+#   reshape_ms      fix_arabic_text() over the pages (the pdfplumber path;
+#                   skipped without arabic-reshaper / python-bidi)
+#   legacy_match_ms article-header scan of the raw text with the old pattern
+#                   (presentation-form alternative); match_ms: the current
+#                   pattern on display-folded text
+#   presentation    share of raw chars that are presentation forms
+#   vocabulary      distinct word forms before -> after normalization (fewer
+#                   forms: fewer index/query mismatches)
+# Run: python -m benchmarks.bench_normalize [--repeat 5]
+
+_LEGACY_PATTERN = re.compile(r'(?:^|\n)((?:Article|المادة|اﻟﻤﺎدة)\s+(?:\d+|\w+(?:\s+\w+){0,4}))')
+_PRESENTATION_RE = re.compile(r'[ﭐ-﷿ﹰ-﻾]')
+
+
+def best_of(repeat, fn):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds), result
+
+
+def run(path, repeat):
+    pages = [clean_text(p) for p in PDF_BACKENDS["pymupdf"].pages(path, ocr_jobs=1)]
+    raw = "\n".join(pages)
+    megabytes = len(raw.encode("utf-8")) / 1e6
+
+    per_page, normalized = best_of(repeat, lambda: [normalize_text(p) for p in pages])
+    batch, batched = best_of(repeat, lambda: list(iter_normalized(pages)))
+    assert batched == normalized == normalize_batch(pages)
+    display, displayed = best_of(repeat, lambda: list(iter_normalized(pages, table=DISPLAY_TABLE)))
+    text = "\n".join(normalized)
+    stored = "\n".join(displayed)
+
+    legacy_match, legacy_found = best_of(repeat, lambda: len(_LEGACY_PATTERN.findall(raw)))
+    match, found = best_of(repeat, lambda: len(ARTICLE_PATTERN.findall(stored)))
+    result = {
+        "pages": len(pages),
+        "chars": len(raw),
+        "presentation": round(len(_PRESENTATION_RE.findall(raw)) / max(len(raw), 1), 4),
+        "per_page_mb_s": round(megabytes / per_page, 1) if per_page > 0 else None,
+        "batch_mb_s": round(megabytes / batch, 1) if batch > 0 else None,
+        "display_mb_s": round(megabytes / display, 1) if display > 0 else None,
+        "legacy_match_ms": round(legacy_match * 1000, 2),
+        "match_ms": round(match * 1000, 2),
+        "headers": f"{legacy_found} -> {found}",
+        "vocabulary": f"{len(set(TOKEN_RE.findall(raw)))} -> {len(set(TOKEN_RE.findall(text)))}",
+    }
+    try:
+        import arabic_reshaper  # noqa: F401
+        import bidi  # noqa: F401
+        reshape, _ = best_of(1, lambda: [fix_arabic_text(p) for p in pages])
+        result["reshape_ms"] = round(reshape * 1000, 1)
+    except ImportError:
+        result["reshape_ms"] = None
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput of the Arabic normalization stage on the data folder.")
+    parser.add_argument("--data", default=Config.DATA_PATH)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per measurement (best is kept)")
+    args = parser.parse_args(argv)
+
+    Config.OCR_ENABLED = False  # Measure the text layer only
+    results = {}
+    for path in list_data_files(args.data):
+        if not path.lower().endswith(".pdf"):
+            continue
+        name = os.path.basename(path)
+        results[name] = run(path, args.repeat)
+        print(f"   {name}: {results[name]}")
+    print(json.dumps({"repeat": args.repeat, "results": results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
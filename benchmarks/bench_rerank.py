@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from article_index import article_number
+
+# --- RERANKING BENCHMARK ---
+# Runs the labelled questions (benchmarks/questions.json: question, source,
+# article) through the retriever with and without the cross-encoder and reports:
+#   hit@1 / hit@k  the expected article is the first / among the k parents
+#   mrr            mean reciprocal rank of the expected article (0 if missing)
+#   context_chars  mean size of the k parents that would be stuffed into the prompt
+#   p50_ms/p95_ms  retrieval latency (reranking included)
+# Needs a built index (python ingest.py). Run: python -m benchmarks.bench_rerank
+
+QUESTIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions.json")
+
+
+def rank_of(docs, expected):
+    for rank, doc in enumerate(docs, 1):
+        if (doc.metadata.get("source") == expected["source"]
+                and article_number(doc.metadata.get("article", "")) == expected["article"]):
+            return rank
+    return None
+
+
+def evaluate(retriever, questions, repeat):
+    ranks, latencies, context = [], [], []
+    for q in questions:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            docs = retriever.invoke(q["question"])
+            latencies.append((time.perf_counter() - start) * 1000)
+        ranks.append(rank_of(docs, q))
+        context.append(sum(len(d.page_content) for d in docs))
+    found = [r for r in ranks if r is not None]
+    return {
+        "hit@1": round(sum(1 for r in found if r == 1) / len(ranks), 3),
+        f"hit@{retriever.k}": round(len(found) / len(ranks), 3),
+        "mrr": round(sum(1.0 / r for r in found) / len(ranks), 3),
+        "context_chars": round(float(np.mean(context))),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 1),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrieval quality and latency with and without reranking.")
+    parser.add_argument("--questions", default=QUESTIONS)
+    parser.add_argument("--db", default=Config.CHROMA_PATH)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[Config.RERANK_CANDIDATES],
+                        help="Candidate pool sizes to rerank")
+    parser.add_argument("--budget-ms", type=float, default=Config.RERANK_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per question")
+    args = parser.parse_args(argv)
+
+    from rag_engine import RAGEngine
+    from reranker import CrossEncoderReranker
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+
+    engine = RAGEngine(db_path=args.db)
+    retriever = engine.retriever
+    # Citation queries bypass retrieval; measure the search itself
+    retriever.article_lookup = False
+    for q in questions[:2]:
+        retriever.invoke(q["question"])  # warm the model, indexes and caches
+
+    retriever.reranker = None
+    results = {"baseline": evaluate(retriever, questions, args.repeat)}
+    print(f"   baseline: {results['baseline']}")
+
+    reranker = CrossEncoderReranker(Config.RERANK_MODEL, budget_ms=args.budget_ms,
+                                    batch_size=Config.RERANK_BATCH_SIZE, max_length=Config.RERANK_MAX_LENGTH)
+    reranker.warm_up()
+    retriever.reranker = reranker
+    for candidates in args.candidates:
+        retriever.rerank_candidates = candidates
+        name = f"rerank@{candidates}"
+        results[name] = evaluate(retriever, questions, args.repeat)
+        print(f"   {name}: {results[name]}")
+
+    print(json.dumps({"questions": len(questions), "k": retriever.k, "model": Config.RERANK_MODEL,
+                      "budget_ms": args.budget_ms, "results": results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# --- COLD START BENCHMARK ---
+# Each run is a fresh interpreter (nothing cached in sys.modules):
+#   imports      time to import what app.py imports at module load
+#   <phases>     RAGEngine.warm_up() phases (embeddings, vectorstore, docstore, ...)
+# Reports the median of --repeat runs as JSON, so a regression points at one phase.
+# Run: python -m benchmarks.bench_startup --repeat 3
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import sys, json, time, importlib.util
+start = time.perf_counter()
+if importlib.util.find_spec("streamlit"):
+    import streamlit
+from rag_engine import RAGEngine
+from config import Config
+from startup import StartupTimer
+timer = StartupTimer()
+timer.add("imports", time.perf_counter() - start)
+heavy = sorted(m for m in ("torch", "sentence_transformers", "chromadb", "fitz", "pdfplumber") if m in sys.modules)
+if "--imports-only" not in sys.argv:
+    RAGEngine(db_path=sys.argv[1]).warm_up(timer)
+print("@@" + json.dumps({"timings": timer.as_dict(), "heavy_imports_at_load": heavy}))
+"""
+
+
+def run_once(db_path, imports_only):
+    env = dict(os.environ, LLM_BACKEND=os.getenv("LLM_BACKEND", "stub"))
+    cmd = [sys.executable, "-c", _CHILD, db_path] + (["--imports-only"] if imports_only else [])
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Startup run failed:\n{proc.stderr[-2000:]}")
+    out = proc.stdout
+    line = next(l for l in out.splitlines() if l.startswith("@@"))
+    return json.loads(line[2:])
+
+
+def main(argv=None):
+    from config import Config
+    parser = argparse.ArgumentParser(description="Measure cold-start import and warm-up time.")
+    parser.add_argument("--db", default=Config.CHROMA_PATH)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--imports-only", action="store_true", help="Skip loading the model and indexes")
+    args = parser.parse_args(argv)
+
+    runs = []
+    for i in range(args.repeat):
+        runs.append(run_once(args.db, args.imports_only))
+        print(f"   run {i + 1}: {runs[-1]['timings']}")
+
+    phases = runs[0]["timings"].keys()
+    median = {p: sorted(r["timings"][p] for r in runs)[len(runs) // 2] for p in phases}
+    print(json.dumps({"repeat": args.repeat, "median": median,
+                      "heavy_imports_at_load": runs[0]["heavy_imports_at_load"]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+# --- STREAMING EXTRACTION MEMORY BENCHMARK ---
+# Builds synthetic article-structured PDFs of increasing page counts and streams
+# each through ingest.iter_file_sections in a fresh interpreter, reporting the
+# peak RSS and sections/s. With page-by-page extraction the peak should stay
+# roughly flat as the page count grows.
+# Run: python -m benchmarks.bench_streaming --pages 100 1000 5000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import sys, json, time, resource
+from extraction import iter_file_sections
+start = time.perf_counter()
+sections = sum(1 for _ in iter_file_sections(sys.argv[1], ocr_jobs=1))
+elapsed = time.perf_counter() - start
+peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print("@@" + json.dumps({"sections": sections, "seconds": round(elapsed, 2), "peak_rss_mb": round(peak_kb / 1024, 1)}))
+"""
+
+
+def make_pdf(path, pages, articles_per_page=3):
+    import fitz
+    doc = fitz.open()
+    n = 0
+    body = "The competent authority shall review the application and notify the applicant. " * 6
+    for _ in range(pages):
+        page = doc.new_page()
+        text = []
+        for _ in range(articles_per_page):
+            n += 1
+            text.append(f"Article {n}\n{body}")
+        page.insert_textbox(page.rect + (36, 36, -36, -36), "\n".join(text), fontsize=7)
+    doc.save(path)
+    doc.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Peak memory of streaming extraction vs. document size.")
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1000, 3000])
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f"synthetic_{pages}.pdf")
+            make_pdf(path, pages)
+            env = dict(os.environ, OCR_ENABLED="0")
+            proc = subprocess.run([sys.executable, "-c", _CHILD, path], cwd=ROOT, env=env,
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                raise RuntimeError(f"Extraction run failed:\n{proc.stderr[-2000:]}")
+            line = next(l for l in proc.stdout.splitlines() if l.startswith("@@"))
+            results[pages] = json.loads(line[2:])
+            print(f"   {pages} pages: {results[pages]}")
+    print(json.dumps({"results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from benchmarks.bench_rerank import QUESTIONS, rank_of
+
+# --- END-TO-END BENCHMARK ---
+# Builds an index from a fixed corpus (the data folder) in a scratch directory,
+# then runs the labelled questions (benchmarks/questions.json: question, source,
+# article) through RAGEngine with the deterministic stub LLM (LLM_BACKEND=stub),
+# so it runs offline. Reports:
+#   ingest     wall time, files / sections / chars, sections/s and chars/s
+#   retrieval  recall@1/3/k and MRR of RAGEngine.retriever for the expected article
+#   latency    p50/p95/p99 ms per stage: embed (query embedding), search (dense
+#              + BM25 + fusion, given the vector), fetch (docstore), retrieve (the
+#              whole retriever call), generate (prompt packing + LLM) and total
+#              (RAGEngine.answer, answer cache off)
+#   memory     peak RSS of this process (and of the extraction workers)
+# Results are written as JSON (benchmarks/results/<timestamp>.json by default);
+# --compare prints the change of every metric against an earlier result.
+# Run: python -m benchmarks.run_benchmark [--repeat 3] [--compare old.json]
+
+RESULTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+STAGES = ("embed", "search", "fetch", "retrieve", "generate", "total")
+
+
+def peak_rss_mb(who=None):
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def percentiles(values):
+    if not values:
+        return None
+    return {
+        "p50": round(float(np.percentile(values, 50)), 2),
+        "p95": round(float(np.percentile(values, 95)), 2),
+        "p99": round(float(np.percentile(values, 99)), 2),
+        "mean": round(float(np.mean(values)), 2),
+    }
+
+
+def ingest(engine, data_path, jobs):
+    start = time.perf_counter()
+    stats = engine.ingest_all_data(jobs=jobs, data_path=data_path)
+    seconds = time.perf_counter() - start
+    result = {"seconds": round(seconds, 2), "files": 0, "sections": 0, "chars": 0,
+              "children": engine.vectorstore._collection.count()
+              if hasattr(engine.vectorstore, "_collection") else None}
+    if stats is not None:
+        result.update(files=stats.files, sections=stats.sections, chars=stats.chars,
+                      extract_seconds=round(stats.extract_seconds, 2), embed_seconds=round(stats.embed_seconds, 2))
+    result["sections_per_s"] = round(result["sections"] / seconds, 2) if seconds > 0 else None
+    result["chars_per_s"] = round(result["chars"] / seconds) if seconds > 0 else None
+    return result
+
+
+def timed(timings, stage, fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    timings[stage].append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def run_questions(engine, questions, repeat):
+    retriever = engine.retriever
+    timings = {stage: [] for stage in STAGES}
+    rows = []
+    for q in questions:
+        question = q["question"]
+        for _ in range(repeat):
+            vector = timed(timings, "embed", engine.embeddings.embed_query, question)
+            ids = timed(timings, "search", retriever._search_ids, question, vector=vector)
+            timed(timings, "fetch", retriever.docstore.mget, ids)
+            docs = timed(timings, "retrieve", retriever.invoke, question)
+            timed(timings, "generate", lambda: engine.llm.invoke(engine._build_prompt(question, docs)[0]))
+            result = timed(timings, "total", engine.answer, question)
+        rank = rank_of(docs, q)
+        rows.append({"question": question, "source": q["source"], "article": q["article"], "rank": rank,
+                     "cited": q["source"] in result["result"]})
+    return rows, timings
+
+
+def quality(rows, k):
+    n = len(rows) or 1
+    ranks = [r["rank"] for r in rows]
+    result = {f"recall@{c}": round(sum(1 for r in ranks if r is not None and r <= c) / n, 3)
+              for c in sorted({1, 3, k})}
+    result["mrr"] = round(sum(1.0 / r for r in ranks if r) / n, 3)
+    result["cited"] = round(sum(1 for r in rows if r["cited"]) / n, 3)
+    return result
+
+
+def flatten(data, prefix=""):
+    out = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
+
+
+def compare(current, previous_path):
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = json.load(f)
+    old = flatten({k: previous.get(k, {}) for k in ("ingest", "retrieval", "latency_ms", "memory")})
+    new = flatten({k: current.get(k, {}) for k in ("ingest", "retrieval", "latency_ms", "memory")})
+    print(f"📈 Compared with {previous_path} ({previous.get('meta', {}).get('commit')}):")
+    for name in sorted(set(old) & set(new)):
+        if old[name] != new[name]:
+            change = f" ({(new[name] - old[name]) / old[name] * 100:+.1f}%)" if old[name] else ""
+            print(f"   {name}: {old[name]} -> {new[name]}{change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end ingest, retrieval and latency benchmark (stub LLM).")
+    parser.add_argument("--data", default=Config.DATA_PATH, help="Corpus folder to index")
+    parser.add_argument("--questions", default=QUESTIONS)
+    parser.add_argument("--db", help="Index folder to build (default: a temporary one, removed afterwards). "
+                                     "An existing index is only brought up to date, not rebuilt.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per question")
+    parser.add_argument("--jobs", type=int, help="Extraction processes")
+    parser.add_argument("--ocr", action="store_true", help="OCR scanned pages while indexing")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier result file to diff against")
+    args = parser.parse_args(argv)
+
+    # Offline and repeatable: stub LLM, no answer cache, text layer only
+    os.environ["LLM_BACKEND"] = "stub"
+    Config.ANSWER_CACHE = False
+    Config.OCR_ENABLED = args.ocr
+
+    from rag_engine import RAGEngine
+    with open(args.questions, "r", encoding="utf-8") as f:
+        questions = json.load(f)
+
+    db_path = args.db or tempfile.mkdtemp(prefix="rag_bench_")
+    try:
+        engine = RAGEngine(db_path=db_path)
+        print(f"📊 Indexing {args.data} into {db_path}...")
+        ingest_result = ingest(engine, args.data, args.jobs)
+        ingest_rss = peak_rss_mb()
+
+        engine.warm_up()
+        for q in questions[:2]:
+            engine.answer(q["question"])  # load the indexes, the model and the LLM client
+        print(f"📊 Running {len(questions)} questions x {args.repeat}...")
+        rows, timings = run_questions(engine, questions, args.repeat)
+
+        result = {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "embedding": Config.embedding_fingerprint(),
+                "embed_backend": Config.EMBED_BACKEND,
+                "llm": "stub",
+                "questions": len(questions),
+                "repeat": args.repeat,
+                "k": engine.retriever.k,
+                "fetch_k": engine.retriever.fetch_k,
+                "hybrid": engine.retriever.hybrid,
+                "rerank": Config.RERANK,
+                "context_packing": Config.CONTEXT_PACKING,
+                "vector_layout": Config.vector_layout(),
+            },
+            "ingest": ingest_result,
+            "retrieval": quality(rows, engine.retriever.k),
+            "latency_ms": {stage: percentiles(values) for stage, values in timings.items()},
+            "memory": {"peak_rss_mb_after_ingest": ingest_rss, "peak_rss_mb": peak_rss_mb()},
+            "questions": rows,
+        }
+        try:
+            import resource
+            result["memory"]["workers_peak_rss_mb"] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+        except ImportError:
+            pass
+    finally:
+        if not args.db:
+            shutil.rmtree(db_path, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(f"   ingest: {result['ingest']}")
+    print(f"   retrieval: {result['retrieval']}")
+    for stage, stats in result["latency_ms"].items():
+        print(f"   {stage:>9}: {stats}")
+    print(f"   memory: {result['memory']}")
+    print(f"💾 Saved {output}")
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,7 @@
 import os
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_ollama import ChatOllama
-from langchain_huggingface import HuggingFaceEmbeddings
+# Model backends (torch, sentence-transformers, langchain integrations) are
+# imported inside the factories below so importing Config stays cheap.
 
 # Load environment variables
 load_dotenv()
@@ -12,32 +11,212 @@ class Config:
     CHROMA_PATH = os.getenv("CHROMA_PATH", "./saudi_legal_db_final1")
     DATA_PATH = "data"
 
+    # Ingestion pipeline (see pipeline.py)
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+    INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+    INGEST_QUEUE_DEPTH = int(os.getenv("INGEST_QUEUE_DEPTH", "4"))  # Section chunks buffered ahead of the embedder
+    VECTOR_WRITE_BATCH = int(os.getenv("VECTOR_WRITE_BATCH", "128"))  # Child chunks per embed + upsert
+
+    # Watch-folder ingestion (see watcher.py)
+    WATCH_BACKEND = os.getenv("WATCH_BACKEND", "auto")                      # auto (watchdog if installed) | poll
+    WATCH_DEBOUNCE_SECONDS = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "5"))  # Quiet time before a batch sync
+    WATCH_MAX_DELAY_SECONDS = float(os.getenv("WATCH_MAX_DELAY_SECONDS", "60"))
+    WATCH_POLL_SECONDS = float(os.getenv("WATCH_POLL_SECONDS", "10"))
+
+    # PDF text extraction backend (see extraction.py): auto (per document) | pymupdf | pdfplumber
+    PDF_BACKEND = os.getenv("PDF_BACKEND", "auto").lower()
+
+    # OCR of scanned / low-text PDF pages (see ocr.py). The page cache lives outside the DB.
+    OCR_ENABLED = os.getenv("OCR_ENABLED", "1") == "1"
+    OCR_LANG = os.getenv("OCR_LANG", "ara+eng")
+    OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+    OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", "50"))   # Fewer chars in the text layer -> OCR the page
+    OCR_JOBS = int(os.getenv("OCR_JOBS", os.cpu_count() or 1))  # Per file, when not already in a worker pool
+    OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "./ocr_cache")
+
+    # Startup: background (warm up on a thread after launch) | blocking | off (load on first question)
+    WARMUP = os.getenv("WARMUP", "background").lower()
+
+    # Retrieval
+    RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "5"))               # Parents passed to the LLM
+    RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "20"))  # Children per search side
+    HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") == "1"         # BM25 + dense (RRF)
+    ARTICLE_LOOKUP = os.getenv("ARTICLE_LOOKUP", "1") == "1"       # "المادة X" answered from the article index
+    LAW_ROUTER = os.getenv("LAW_ROUTER", "0") == "1"               # Narrow unfiltered queries to the closest laws
+    ROUTER_TOP_N = int(os.getenv("ROUTER_TOP_N", "2"))             # At most this many laws per routed query
+    ROUTER_MARGIN = float(os.getenv("ROUTER_MARGIN", "0.03"))      # ... within this cosine of the best one
+    # Cross-encoder reranking (see reranker.py): over-fetch, rescore, keep RETRIEVAL_K
+    RERANK = os.getenv("RERANK", "0") == "1"
+    RERANK_MODEL = os.getenv("RERANK_MODEL", "BAAI/bge-reranker-v2-m3")  # Multilingual (Arabic + English)
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+    RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "800"))     # Over budget -> keep retrieval order
+    RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "8"))
+    RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))     # Tokens per (question, parent) pair
+
+    # Vector index (Chroma HNSW). Applied when a collection is created: changing
+    # them takes effect after `python ingest.py --rebuild`
+    VECTOR_COLLECTION = "saudi_legal_docs"
+    HNSW_SPACE = os.getenv("HNSW_SPACE", "cosine")                        # cosine | l2 | ip
+    HNSW_M = int(os.getenv("HNSW_M", "16"))                               # Graph degree: recall vs memory
+    HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))  # Build-time candidate list
+    HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))               # Query-time candidate list (>= fetch k)
+    # off: one collection | subject: one collection per law, searched in parallel (see vector_shards.py)
+    VECTOR_SHARDING = os.getenv("VECTOR_SHARDING", "off").lower()
+    VECTOR_SHARD_THREADS = int(os.getenv("VECTOR_SHARD_THREADS", "4"))
+
+    # Context packing (see context_packer.py): parents trimmed to their relevant
+    # sentences and packed into a token budget before the prompt is built
+    CONTEXT_PACKING = os.getenv("CONTEXT_PACKING", "1") == "1"
+    CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))
+    CONTEXT_DOC_MAX_TOKENS = int(os.getenv("CONTEXT_DOC_MAX_TOKENS", "900"))
+    CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "Qwen/Qwen2.5-7B-Instruct")  # Same vocabulary as OLLAMA_MODEL
+
+    # Semantic answer cache (see answer_cache.py), stored next to the vectors
+    ANSWER_CACHE = os.getenv("ANSWER_CACHE", "1") == "1"
+    ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # Cosine similarity
+    ANSWER_CACHE_TTL_HOURS = float(os.getenv("ANSWER_CACHE_TTL_HOURS", "168"))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+    # Query service (see server.py)
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))  # Parallel generations sent to Ollama
+
+    # Stage timings and counters (see tracing.py)
+    TRACING = os.getenv("TRACING", "1") == "1"
+    TRACE_LOG = os.getenv("TRACE_LOG", "")        # JSON lines, one per span ("" = off)
+    METRICS_FILE = os.getenv("METRICS_FILE", "")  # Prometheus text file written on exit / after ingest
+
+    # Embedding backend: torch (sentence-transformers) | onnx | onnx-int8 (see onnx_embeddings.py)
+    EMBED_MODEL = "BAAI/bge-m3"
+    EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").lower()
+    EMBED_ONNX_DIR = os.getenv("EMBED_ONNX_DIR", "./onnx_models")
+    EMBED_ONNX_THREADS = int(os.getenv("EMBED_ONNX_THREADS", "0"))   # 0 = all available cores
+    EMBED_ONNX_PIN_THREADS = os.getenv("EMBED_ONNX_PIN_THREADS", "0") == "1"
+
+    # Query-embedding micro-batching (see embed_batcher.py); 0 disables
+    EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+    EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "16"))
+
+    # Embedding cache (see embedding_cache.py). Lives outside the DB so --rebuild keeps it.
+    EMBED_CACHE = os.getenv("EMBED_CACHE", "1") == "1"
+    EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "./embedding_cache")
+    EMBED_CACHE_MAX_MB = int(os.getenv("EMBED_CACHE_MAX_MB", "2048"))
+    EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float16")
+    EMBED_CACHE_QUERIES = int(os.getenv("EMBED_CACHE_QUERIES", "1024"))  # In-memory only, never persisted
+
+    @staticmethod
+    def hnsw_metadata():
+        return {
+            "hnsw:space": Config.HNSW_SPACE,
+            "hnsw:M": Config.HNSW_M,
+            "hnsw:construction_ef": Config.HNSW_EF_CONSTRUCTION,
+            "hnsw:search_ef": Config.HNSW_EF_SEARCH,
+        }
+
+    @staticmethod
+    def vector_layout():
+        return "subject" if Config.VECTOR_SHARDING == "subject" else "single"
+
     @staticmethod
-    def get_embeddings():
+    def embedding_fingerprint(backend=None):
+        """
+        Identifies the vector space an index was built in. torch and onnx (fp32)
+        run the same weights and pooling, so they share a space; int8 does not.
+        """
+        backend = backend or Config.EMBED_BACKEND
+        precision = "int8" if backend.endswith("int8") else "fp32"
+        return f"{Config.EMBED_MODEL}|{precision}"
+
+    @staticmethod
+    def get_base_embeddings(device=None, backend=None):
         """
         Returns BAAI/bge-m3.
         Force CPU for Laptop (DEV) to prevent crashing.
         Use CUDA (GPU) for Client (PROD).
+        An explicit `device` overrides the mode-based choice.
+        EMBED_BACKEND=onnx / onnx-int8 runs it with onnxruntime on CPU instead.
         """
-        model_name = "BAAI/bge-m3"
+        model_name = Config.EMBED_MODEL
+        backend = backend or Config.EMBED_BACKEND
         encode_kwargs = {'normalize_embeddings': True}
         
-        if Config.MODE == "DEV":
-            device = "cpu"
-            print(f"🔌 DEV MODE: Loading {model_name} on CPU (Lightweight)...")
+        if backend.startswith("onnx"):
+            from onnx_embeddings import OnnxEmbeddings
+            print(f"⚙️ Loading {model_name} with ONNX Runtime ({backend}) on CPU...")
+            embeddings = OnnxEmbeddings(
+                model_name,
+                cache_dir=Config.EMBED_ONNX_DIR,
+                quantize=backend.endswith("int8"),
+                threads=Config.EMBED_ONNX_THREADS,
+                pin_threads=Config.EMBED_ONNX_PIN_THREADS,
+                normalize=encode_kwargs['normalize_embeddings'],
+            )
         else:
-            import torch
-            if torch.cuda.is_available():
-                device = "cuda"
-                print(f"🚀 PROD MODE: Loading {model_name} on GPU (Max Performance)...")
-            else:
+            from langchain_huggingface import HuggingFaceEmbeddings
+            if device is not None:
+                print(f"🔌 Loading {model_name} on {device.upper()}...")
+            elif Config.MODE == "DEV":
                 device = "cpu"
-                print(f"⚠️ PROD MODE: GPU not found. Falling back to CPU for {model_name}...")
+                print(f"🔌 DEV MODE: Loading {model_name} on CPU (Lightweight)...")
+            else:
+                import torch
+                if torch.cuda.is_available():
+                    device = "cuda"
+                    print(f"🚀 PROD MODE: Loading {model_name} on GPU (Max Performance)...")
+                else:
+                    device = "cpu"
+                    print(f"⚠️ PROD MODE: GPU not found. Falling back to CPU for {model_name}...")
+
+            embeddings = HuggingFaceEmbeddings(
+                model_name=model_name,
+                model_kwargs={'device': device},
+                encode_kwargs=encode_kwargs
+            )
+        return embeddings
 
-        return HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={'device': device},
-            encode_kwargs=encode_kwargs
+    @staticmethod
+    def get_embeddings(device=None, backend=None):
+        """
+        The model from get_base_embeddings(), with concurrent queries micro-batched
+        (EMBED_BATCH_WINDOW_MS > 0) and wrapped in the persistent embedding cache
+        unless EMBED_CACHE=0. Inputs are Arabic-normalized first (arabic_norm), so
+        the cache is keyed by the normalized text.
+        """
+        from arabic_norm import NormalizedEmbeddings
+        backend = backend or Config.EMBED_BACKEND
+        embeddings = Config.get_base_embeddings(device=device, backend=backend)
+        if Config.EMBED_BATCH_WINDOW_MS > 0:
+            from embed_batcher import BatchingEmbeddings
+            embeddings = BatchingEmbeddings(
+                embeddings,
+                window_ms=Config.EMBED_BATCH_WINDOW_MS,
+                max_batch=Config.EMBED_BATCH_MAX,
+            )
+        if not Config.EMBED_CACHE:
+            return NormalizedEmbeddings(embeddings)
+
+        from embedding_cache import CachedEmbeddings
+        return NormalizedEmbeddings(CachedEmbeddings(
+            embeddings,
+            # Cache per backend: int8 vectors must never be served for fp32 lookups
+            model_name=Config.EMBED_MODEL if backend == "torch" else f"{Config.EMBED_MODEL}@{backend}",
+            normalize=True,
+            cache_dir=Config.EMBED_CACHE_PATH,
+            max_bytes=Config.EMBED_CACHE_MAX_MB * (1 << 20),
+            dtype=Config.EMBED_CACHE_DTYPE,
+            query_entries=Config.EMBED_CACHE_QUERIES,
+        ))
+
+    @staticmethod
+    def llm_settings():
+        """
+        (backend, url, model, keep_alive) as currently configured. RAGEngine rebuilds its
+        cached LLM client only when this changes.
+        """
+        return (
+            os.getenv("LLM_BACKEND", "ollama").lower(),
+            os.getenv("OLLAMA_BASE_URL", "http://localhost:11434"),
+            os.getenv("OLLAMA_MODEL", "qwen2.5:14b"),
+            os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
         )
 
     @staticmethod
@@ -48,9 +227,20 @@ class Config:
         Defaults to:
           - URL: http://localhost:11434
           - Model: qwen2.5:14b
+          - Keep-alive: 30m (model stays loaded in Ollama between questions)
+        LLM_BACKEND=stub returns the deterministic StubChatModel instead.
+        The underlying HTTP client keeps its connections alive, so reuse the
+        returned object instead of calling this per request.
         """
-        ollama_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-        ollama_model = os.getenv("OLLAMA_MODEL", "qwen2.5:14b")
+        backend, ollama_url, ollama_model, keep_alive = Config.llm_settings()
+        if backend == "stub":
+            # Deterministic offline stand-in (API tests, benchmarks)
+            from stub_llm import StubChatModel
+            print("🧪 Using stub LLM (LLM_BACKEND=stub)...")
+            return StubChatModel()
+
+        import httpx
+        from langchain_ollama import ChatOllama
         
         print(f"🏠 Using Local LLM (Ollama) at {ollama_url} with model {ollama_model}...")
         
@@ -58,6 +248,11 @@ class Config:
             base_url=ollama_url,
             model=ollama_model,
             temperature=0.0,
+            keep_alive=keep_alive,
+            # Pooled keep-alive connections to the Ollama server
+            client_kwargs={
+                "limits": httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=300),
+            },
             # Stop words to prevent infinite Arabic loops
             stop=["<|eot_id|>", "<|end_of_text|>", "<|im_end|>"]
-        )
\ No newline at end of file
+        )
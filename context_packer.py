@@ -0,0 +1,174 @@
+import re
+import threading
+from langchain_core.documents import Document
+from arabic_norm import fold_for_search, tokenize
+
+# --- CONTEXT PACKING FOR THE "STUFF" PROMPT ---
+# Parents are whole articles; some Executive Regulations sections run to
+# thousands of tokens. Before they reach the prompt each parent is cut down to
+# the sentences that matter: sentences inside the child chunks the search
+# matched, then sentences sharing terms with the question. Sentences already
+# packed from a higher-ranked parent are skipped, and the result is kept within
+# CONTEXT_MAX_TOKENS (CONTEXT_DOC_MAX_TOKENS per parent). The "Source:/Section:"
+# header of every parent is always kept, so citations survive trimming.
+# Tokens are counted with the answering model's tokenizer when it can be loaded,
+# otherwise estimated.
+
+HEADER_RE = re.compile(r'\A((?:Source|Section|Part):[^\n]*\n)+\n?')
+SENTENCE_RE = re.compile(r'[^.!?؟؛;\n]+(?:[.!?؟؛;]+|\n|$)')
+GAP = " …"
+
+
+class TokenCounter:
+    """
+    Counts tokens with a Hugging Face tokenizer (loaded once, on first use).
+    Falls back to ~1 token per 3.5 chars, which errs on the high side for Arabic.
+    """
+
+    def __init__(self, tokenizer_name=None):
+        self.tokenizer_name = tokenizer_name
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def exact(self):
+        return self._load() is not None
+
+    def _load(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if self.tokenizer_name:
+                        try:
+                            from transformers import AutoTokenizer
+                            self._tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_name)
+                        except Exception as e:
+                            print(f"⚠️ Tokenizer {self.tokenizer_name} unavailable ({e}); estimating token counts.")
+                    self._loaded = True
+        return self._tokenizer
+
+    def count(self, text):
+        tokenizer = self._load()
+        if tokenizer is None:
+            return max(1, round(len(text) / 3.5)) if text else 0
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def split_header(text):
+    m = HEADER_RE.match(text)
+    return (m.group(0), text[m.end():]) if m else ("", text)
+
+
+def split_sentences(text):
+    # Sentences keep their trailing newline, so list items stay on their own lines
+    return [s for s in SENTENCE_RE.findall(text) if s.strip()]
+
+
+def _key(sentence):
+    return " ".join(tokenize(sentence))
+
+
+class ContextPacker:
+    def __init__(self, counter, max_tokens=3000, doc_max_tokens=900):
+        self.counter = counter
+        self.max_tokens = max_tokens
+        self.doc_max_tokens = doc_max_tokens
+
+    def _scores(self, sentences, query_terms, spans):
+        folded_spans = [fold_for_search(s) for s in spans]
+        scores = []
+        for sentence in sentences:
+            folded = fold_for_search(sentence)
+            terms = set(tokenize(sentence))
+            score = 0.0
+            if any(folded in span or span in folded for span in folded_spans if span):
+                score += 1.0
+            if query_terms and terms:
+                score += len(terms & query_terms) / len(query_terms)
+            scores.append(score)
+        return scores
+
+    def pack(self, query, documents):
+        """
+        Returns (packed documents, stats). Packed documents keep their metadata;
+        documents left with no room are dropped (lowest ranked go first).
+        """
+        query_terms = set(tokenize(query))
+        seen = set()
+        packed = []
+        stats = {"docs_in": len(documents), "docs_out": 0, "tokens_in": 0, "tokens": 0,
+                 "trimmed": 0, "duplicates": 0}
+        budget = self.max_tokens
+        for doc in documents:
+            header, body = split_header(doc.page_content)
+            stats["tokens_in"] += self.counter.count(doc.page_content)
+            header_tokens = self.counter.count(header)
+            limit = min(budget, self.doc_max_tokens)
+            room = limit - header_tokens
+            if room <= 0:
+                break
+
+            sentences = split_sentences(body)
+            fresh = []
+            for n, sentence in enumerate(sentences):
+                key = _key(sentence)
+                if key and key in seen:
+                    stats["duplicates"] += 1
+                    continue
+                fresh.append((n, sentence, key))
+            if not fresh:
+                continue
+
+            costs = [self.counter.count(s) for _, s, _ in fresh]
+            if sum(costs) <= room and len(fresh) == len(sentences):
+                # Fits whole and nothing repeats: keep it verbatim
+                tokens = self.counter.count(doc.page_content)
+                if tokens <= limit:
+                    seen.update(key for _, _, key in fresh)
+                    budget -= tokens
+                    stats["tokens"] += tokens
+                    packed.append(self._copy(doc, doc.page_content))
+                    continue
+
+            scores = self._scores([s for _, s, _ in fresh], query_terms, doc.metadata.get("matched_spans", ()))
+            chosen, used = [], 0
+            # Best sentences first; ties keep document order
+            for i in sorted(range(len(fresh)), key=lambda i: -scores[i]):
+                if used + costs[i] <= room:
+                    chosen.append(i)
+                    used += costs[i]
+            chosen.sort()
+            # Gap markers (and token merges across joins) are only known once
+            # assembled: drop the weakest sentences until the whole fits
+            while chosen:
+                content = header + self._join(fresh, chosen)
+                tokens = self.counter.count(content)
+                if tokens <= limit:
+                    break
+                chosen.remove(min(chosen, key=lambda i: (scores[i], -i)))
+            if not chosen:
+                continue
+            stats["trimmed"] += 1
+            seen.update(fresh[i][2] for i in chosen)
+            budget -= tokens
+            stats["tokens"] += tokens
+            packed.append(self._copy(doc, content))
+        stats["docs_out"] = len(packed)
+        return packed, stats
+
+    @staticmethod
+    def _join(fresh, chosen):
+        parts, previous = [], None
+        for i in chosen:
+            n, sentence, _ = fresh[i]
+            if previous is not None and n != previous + 1:
+                parts.append(GAP)
+            parts.append(sentence)
+            previous = n
+        return "".join(parts).strip()
+
+    @staticmethod
+    def _copy(doc, content):
+        return Document(page_content=content,
+                        metadata={k: v for k, v in doc.metadata.items() if k != "matched_spans"})
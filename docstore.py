@@ -0,0 +1,131 @@
+import os
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+from langchain_core.stores import BaseStore
+
+# --- ON-DISK PARENT STORE ---
+# SQLite table of pickled parent Documents. mget/mset touch only the requested
+# keys, every write is one transaction (WAL journal), so an interrupted upload
+# never leaves a half-written store behind.
+
+DOCSTORE_NAME = "docstore.sqlite"
+LEGACY_PICKLE_NAME = "docstore.pkl"
+
+
+class SQLiteDocStore(BaseStore[str, Document]):
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # One connection shared by Streamlit's script threads, guarded by a lock
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " key TEXT PRIMARY KEY,"
+            " source TEXT,"
+            " value BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS docs_source ON docs(source)")
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups several writes into one atomic commit. Nested calls join the outer one.
+        """
+        with self._lock:
+            outer = self._depth == 0
+            if outer:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if outer:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if outer:
+                self._conn.execute("COMMIT")
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[Document]]:
+        if not keys:
+            return []
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = list(keys[i:i + 500])
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT key, value FROM docs WHERE key IN ({marks})", chunk)
+                for key, value in rows:
+                    found[key] = pickle.loads(value)
+        return [found.get(k) for k in keys]
+
+    def mset(self, key_value_pairs: Sequence[Tuple[str, Document]]) -> None:
+        rows = [
+            (key, (doc.metadata or {}).get("source"), pickle.dumps(doc, protocol=pickle.HIGHEST_PROTOCOL))
+            for key, doc in key_value_pairs
+        ]
+        with self.transaction():
+            self._conn.executemany("INSERT OR REPLACE INTO docs(key, source, value) VALUES (?, ?, ?)", rows)
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        with self.transaction():
+            self._conn.executemany("DELETE FROM docs WHERE key = ?", [(k,) for k in keys])
+
+    def delete_source(self, source: str) -> int:
+        """
+        Removes every parent of a source file. Returns the number of rows deleted.
+        """
+        with self.transaction():
+            return self._conn.execute("DELETE FROM docs WHERE source = ?", (source,)).rowcount
+
+    def yield_keys(self, *, prefix: Optional[str] = None) -> Iterator[str]:
+        with self._lock:
+            if prefix:
+                rows = self._conn.execute("SELECT key FROM docs WHERE key LIKE ? || '%'", (prefix,)).fetchall()
+            else:
+                rows = self._conn.execute("SELECT key FROM docs").fetchall()
+        for (key,) in rows:
+            yield key
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_docstore(db_path: str) -> SQLiteDocStore:
+    """
+    Opens the SQLite DocStore in `db_path`, migrating a legacy pickled
+    InMemoryStore (docstore.pkl) the first time it is found.
+    """
+    store = SQLiteDocStore(os.path.join(db_path, DOCSTORE_NAME))
+    pkl_path = os.path.join(db_path, LEGACY_PICKLE_NAME)
+    if os.path.exists(pkl_path):
+        print(f"📦 Migrating legacy DocStore {pkl_path} -> {store.path}...")
+        with open(pkl_path, "rb") as f:
+            legacy = pickle.load(f)
+        pairs = []
+        for key in legacy.yield_keys():
+            value = legacy.mget([key])[0]
+            if isinstance(value, bytes):
+                value = pickle.loads(value)
+            if value is not None:
+                pairs.append((key, value))
+        store.mset(pairs)
+        # Keep the old file around, but out of the way so migration runs only once
+        os.replace(pkl_path, pkl_path + ".migrated")
+        print(f"✅ Migrated {len(pairs)} documents.")
+    return store
@@ -0,0 +1,85 @@
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import List
+from langchain_core.embeddings import Embeddings
+
+# --- MICRO-BATCHED QUERY EMBEDDING ---
+# Concurrent embed_query calls are collected for up to `window_ms` (or until
+# `max_batch` are waiting) and encoded in one forward pass, then fanned back
+# out to their callers. Document embedding (ingest) is already batched and
+# passes straight through.
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class BatchingEmbeddings(Embeddings):
+    def __init__(self, inner: Embeddings, window_ms: float = 5.0, max_batch: int = 16):
+        self.inner = inner
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._latencies = deque(maxlen=2000)   # seconds, submit -> result
+        self._batch_sizes = deque(maxlen=2000)
+        self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            texts = [text for text, _, _ in batch]
+            try:
+                vectors = self.inner.embed_documents(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+            now = time.perf_counter()
+            self._batch_sizes.append(len(batch))
+            for (_, future, submitted), vector in zip(batch, vectors):
+                self._latencies.append(now - submitted)
+                future.set_result(vector)
+
+    def submit(self, text: str) -> Future:
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        import asyncio
+        return await asyncio.wrap_future(self.submit(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.inner.embed_documents(texts)
+
+    def stats(self) -> dict:
+        latencies = [x * 1000 for x in self._latencies]
+        sizes = list(self._batch_sizes)
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": len(sizes),
+            "mean_batch_size": sum(sizes) / len(sizes) if sizes else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+        }
@@ -0,0 +1,148 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# --- PERSISTENT EMBEDDING CACHE ---
+# Content-addressed: key = sha256(model | normalize flag | text). Vectors are
+# stored as raw float16/float32 arrays in SQLite, evicted least-recently-used
+# once the cache grows past its size budget. Only document (chunk) vectors are
+# persisted; query vectors live in a small in-memory LRU (`query_entries`), so
+# one-off questions never push chunk vectors out of the disk cache.
+
+CACHE_NAME = "embeddings.sqlite"
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, inner: Embeddings, model_name: str, normalize: bool,
+                 cache_dir: str, max_bytes: int, dtype: str = "float16", query_entries: int = 1024):
+        self.inner = inner
+        self.model_name = model_name
+        self.normalize = normalize
+        self.dtype = np.dtype(dtype)
+        self.max_bytes = max_bytes
+        self.query_entries = query_entries
+        self._queries = OrderedDict()  # key -> vector, most recently used last
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, CACHE_NAME)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            " key TEXT PRIMARY KEY,"
+            " dtype TEXT NOT NULL,"
+            " vec BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS vectors_lru ON vectors(last_used)")
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM vectors").fetchone()[0]
+
+    def _key(self, text: str) -> str:
+        raw = f"{self.model_name}|{int(self.normalize)}|{text}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> dict:
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(f"SELECT key, dtype, vec FROM vectors WHERE key IN ({marks})", chunk)
+                for key, dtype, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=dtype).astype(np.float32).tolist()
+            if found:
+                self._conn.executemany("UPDATE vectors SET last_used = ? WHERE key = ?",
+                                       [(now, k) for k in found])
+                self._conn.commit()
+        return found
+
+    def _store(self, pairs):
+        now = time.time()
+        rows = [(k, self.dtype.name, np.asarray(v, dtype=self.dtype).tobytes(), now) for k, v in pairs]
+        with self._lock:
+            # Overwritten keys (two callers embedding the same text) give their old size back
+            for i in range(0, len(rows), 500):
+                chunk = [r[0] for r in rows[i:i + 500]]
+                marks = ",".join("?" * len(chunk))
+                self._size -= self._conn.execute(
+                    f"SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM vectors WHERE key IN ({marks})", chunk).fetchone()[0]
+            self._conn.executemany("INSERT OR REPLACE INTO vectors(key, dtype, vec, last_used) VALUES (?, ?, ?, ?)", rows)
+            self._size += sum(len(r[2]) for r in rows)
+            if self._size > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop the oldest entries until we are back under 90% of the budget
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT key, LENGTH(vec) FROM vectors ORDER BY last_used ASC")
+        doomed = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            doomed.append((key,))
+            self._size -= size
+        self._conn.executemany("DELETE FROM vectors WHERE key = ?", doomed)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        keys = [self._key(t) for t in texts]
+        found = self._lookup(list(set(keys)))
+        missing = {}
+        hits = 0
+        for i, k in enumerate(keys):
+            if k in found:
+                hits += 1
+            else:
+                missing.setdefault(k, i)
+        # Repeats of an uncached text are embedded once but still were not in the cache
+        self.hits += hits
+        self.misses += len(texts) - hits
+        if missing:
+            todo = list(missing.items())
+            vectors = self.inner.embed_documents([texts[i] for _, i in todo])
+            fresh = [(k, v) for (k, _), v in zip(todo, vectors)]
+            self._store(fresh)
+            found.update(fresh)
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        with self._lock:
+            vector = self._queries.get(key)
+            if vector is not None:
+                self._queries.move_to_end(key)
+                self.hits += 1
+                return vector
+        self.misses += 1
+        vector = self.inner.embed_query(text)
+        with self._lock:
+            self._queries[key] = vector
+            while len(self._queries) > self.query_entries:
+                self._queries.popitem(last=False)
+        return vector
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size_mb": self._size / (1 << 20),
+        }
+
+    def report(self):
+        s = self.stats()
+        print(f"   💽 Embedding cache: {s['hits']} hits / {s['misses']} misses "
+              f"({s['hit_rate']:.0%} saved) | {s['size_mb']:.1f} MB on disk")
@@ -0,0 +1,416 @@
+import os
+import re
+import time
+import itertools
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from arabic_norm import DISPLAY_TABLE, fold_for_search, display_text, iter_normalized
+from config import Config
+import tracing
+from ocr import iter_pdf_pages
+
+# --- UNIFIED EXTRACTION ---
+# One path from file to article sections, used by ingest.py, the pipeline
+# workers and the upload button:
+#   pages (PDF backend chosen per document, or DOCX paragraphs)
+#     -> clean_text (per page) -> display folds (arabic_norm, page batches)
+#     -> iter_sections (single-pass streaming segmenter)
+# PDF backends are pluggable (PDF_BACKENDS). With PDF_BACKEND=auto each
+# document samples a few pages with every installed backend and keeps the one
+# with the best text quality, then the fastest.
+
+
+def clean_text(text):
+    """
+    Cleans up Arabic text artifacts: non-breaking spaces, blank lines and
+    simple page numbers (1-3 digit lines).
+    """
+    lines = (line.strip() for line in text.replace('\xa0', ' ').split('\n'))
+    return '\n'.join(line for line in lines if line and not (len(line) < 4 and line.isdigit()))
+
+
+_ARABIC_RE = re.compile(r'[\u0600-\u06FF]')
+
+
+_reorder = None
+
+
+def _load_reorder():
+    # Resolved once: the reshaper/bidi pair, or False when not installed
+    global _reorder
+    if _reorder is None:
+        try:
+            import arabic_reshaper
+            from bidi.algorithm import get_display
+            _reorder = lambda text: get_display(arabic_reshaper.reshape(text))
+        except ImportError:
+            print("⚠️ arabic-reshaper / python-bidi not installed; visual-order Arabic is left as extracted.")
+            _reorder = False
+    return _reorder
+
+
+def fix_arabic_text(text):
+    """
+    Fixes reversed/disjointed Arabic text (e.g. txeT -> Text) from extractors
+    that return visual order (pdfplumber). Reshaping yields presentation forms;
+    the display-fold stage turns them back into base letters.
+    """
+    if not text: return ""
+    # Check if text contains Arabic characters
+    if _ARABIC_RE.search(text):
+        reorder = _load_reorder()
+        if reorder:
+            # Reshape (connect letters) then Bidi (fix direction)
+            return reorder(text)
+    return text
+
+
+# --- TEXT QUALITY ---
+# Share of words that survive search folding as plain letters/digits, halved
+# when common Arabic function words appear mostly reversed (visual order).
+_CLEAN_WORD = re.compile(r'^[\u0621-\u064a0-9a-z]+$')
+_FORWARD_WORDS = {'في', 'من', 'علي', 'الي', 'التي', 'الذي', 'او'}
+_REVERSED_WORDS = {w[::-1] for w in _FORWARD_WORDS}
+_PUNCT = re.compile(r'[^\w\s]+')
+
+
+def text_quality(text):
+    words = _PUNCT.sub(' ', fold_for_search(text)).split()
+    if not words:
+        return 0.0
+    quality = sum(1 for w in words if _CLEAN_WORD.match(w)) / len(words)
+    forward = sum(1 for w in words if w in _FORWARD_WORDS)
+    backward = sum(1 for w in words if w in _REVERSED_WORDS)
+    if backward > forward:
+        quality *= 0.5
+    return quality
+
+
+# --- PDF BACKENDS ---
+
+class PdfBackend:
+    name = ""
+
+    def available(self):
+        return True
+
+    def sample(self, path, page_numbers):
+        """Raw text of a few pages (no OCR), for backend selection."""
+        raise NotImplementedError
+
+    def pages(self, path, ocr_jobs=None, ocr_stats=None):
+        """Yields the text of every page, in order."""
+        raise NotImplementedError
+
+
+class PyMuPDFBackend(PdfBackend):
+    # Fast; the only backend that OCRs scanned pages (see ocr.py)
+    name = "pymupdf"
+
+    def page_count(self, path):
+        import fitz
+        with fitz.open(path) as doc:
+            return len(doc)
+
+    def sample(self, path, page_numbers):
+        import fitz
+        with fitz.open(path) as doc:
+            return [doc[n].get_text() for n in page_numbers if n < len(doc)]
+
+    def pages(self, path, ocr_jobs=None, ocr_stats=None):
+        return iter_pdf_pages(path, ocr_jobs=ocr_jobs, stats=ocr_stats)
+
+
+class PdfPlumberBackend(PdfBackend):
+    # Slower, but lays out some column/RTL documents better
+    name = "pdfplumber"
+
+    def available(self):
+        try:
+            import pdfplumber  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    def sample(self, path, page_numbers):
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            return [fix_arabic_text(pdf.pages[n].extract_text() or "") for n in page_numbers if n < len(pdf.pages)]
+
+    def pages(self, path, ocr_jobs=None, ocr_stats=None):
+        import pdfplumber
+        with pdfplumber.open(path) as pdf:
+            for page in pdf.pages:
+                if ocr_stats is not None:
+                    ocr_stats.pages += 1
+                yield fix_arabic_text(page.extract_text() or "")
+                page.flush_cache()  # pdfplumber keeps parsed objects of every page otherwise
+
+
+# Registration order is the tie-break order
+PDF_BACKENDS = {b.name: b for b in (PyMuPDFBackend(), PdfPlumberBackend())}
+
+
+def measure_backend(backend, path, page_numbers):
+    """
+    Returns {"chars", "seconds", "quality"} of `backend` on a sample of pages.
+    """
+    start = time.perf_counter()
+    text = "\n".join(backend.sample(path, page_numbers))
+    return {"chars": len(text), "seconds": time.perf_counter() - start, "quality": text_quality(text)}
+
+
+def choose_pdf_backend(path, sample_pages=3):
+    """
+    PDF_BACKEND names a backend, or "auto": sample the first, middle and last
+    pages with every installed backend and keep the best quality (rounded, so
+    near-ties go to the faster one). Backends that lose text are penalised by
+    their char count relative to the best.
+    """
+    if Config.PDF_BACKEND != "auto":
+        return PDF_BACKENDS[Config.PDF_BACKEND]
+    candidates = [b for b in PDF_BACKENDS.values() if b.available()]
+    if len(candidates) == 1:
+        return candidates[0]
+
+    count = PDF_BACKENDS["pymupdf"].page_count(path)
+    page_numbers = sorted({0, count // 2, max(count - 1, 0)})[:sample_pages]
+    scores = {}
+    for backend in candidates:
+        try:
+            scores[backend.name] = measure_backend(backend, path, page_numbers)
+        except Exception as e:
+            print(f"      ⚠️ {backend.name} failed on {os.path.basename(path)}: {e}")
+    if not scores:
+        return candidates[0]
+    most = max(s["chars"] for s in scores.values()) or 1
+
+    def rank(name):
+        s = scores[name]
+        speed = s["chars"] / s["seconds"] if s["seconds"] > 0 else 0.0
+        return round(s["quality"] * min(1.0, s["chars"] / most), 2), speed
+
+    best = max(scores, key=rank)
+    if best != candidates[0].name:
+        print(f"      🧪 Using {best} for {os.path.basename(path)} "
+              f"(quality {rank(best)[0]:.2f} vs {rank(candidates[0].name)[0]:.2f})")
+    return PDF_BACKENDS[best]
+
+
+# Pattern explanation (display folds run first, so no presentation forms or
+# tatweel; diacritics are kept in the stored text, so they are allowed):
+# (?:Article|المادة) : Match "Article" (diacritics allowed between the letters)
+# \s+ : Space
+# (?: ... ) : Match Number/Word
+# \d+ : Digits (any script)
+# | : OR
+# [\w marks]+ : Any word char or diacritic
+_MARKS = '[\u064B-\u065F\u0670]*'
+_WORD = r'[\w\u064B-\u065F\u0670]+'
+ARTICLE_PATTERN = re.compile(r'(?:^|\n)((?:Article|' + _MARKS.join('المادة') + _MARKS + r')\s+(?:\d+|'
+                             + _WORD + r'(?:\s+' + _WORD + r'){0,4}))')
+
+_NON_SPACE = re.compile(r'\S')
+
+# Without two article headers the text is chunked by size instead. Up to this many
+# chars are held back while that is undecided; past it the size chunking streams too.
+FALLBACK_BUFFER_CHARS = 2_000_000
+
+
+def _section(source, subject, title, body):
+    return Document(
+        page_content=f"Source: {source}\nSection: {title}\n\n{body}",
+        metadata={"source": source, "subject": subject, "article": title}
+    )
+
+
+def _iter_size_chunks(texts, source, subject, window=20000):
+    """
+    Standard chunking over a stream of texts, `window` chars at a time. The last
+    chunk of each window is carried into the next one so chunks never cut at a
+    window edge.
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
+    part = 0
+    carry = ""
+
+    def emit(chunks):
+        nonlocal part
+        for chunk in chunks:
+            part += 1
+            yield Document(
+                page_content=f"Source: {source}\nPart: {part}\n\n{chunk}",
+                metadata={"source": source, "subject": subject, "article": f"Page/Part {part}"}
+            )
+
+    for text in texts:
+        carry = f"{carry}\n{text}" if carry else text
+        if len(carry) >= window:
+            chunks = splitter.split_text(carry)
+            carry = chunks.pop()
+            yield from emit(chunks)
+    if carry:
+        yield from emit(splitter.split_text(carry))
+
+
+def iter_sections(pages, source):
+    """
+    Streaming article splitter: consumes page texts and yields one Document per
+    article as soon as the next article header is seen. A partial article is
+    carried across page boundaries; only the last, possibly incomplete, line or
+    header is re-scanned with the next page.
+    Matches:
+    1. Article 1 (Digits)
+    2. المادة 1 (Digits)
+    3. المادة الاولى (Words)
+    Pages must already have the display folds (arabic_norm.display_text).
+    """
+    subject = os.path.splitext(source)[0]
+    title = "Introduction"
+    found_articles = 0
+    body = []          # Pieces of the current article's body
+    tail, skip = "", 0 # Unscanned remainder; tail[:skip] is context already consumed
+    held = []          # Sections held back until we know the text has articles
+    raw = []           # Page texts kept for the size-based fallback
+    raw_chars = 0
+    pages = iter(pages)
+
+    def close_section():
+        text = "".join(body).strip()
+        body.clear()
+        if len(text) > 20:
+            return [_section(source, subject, title, text)]
+        return []
+
+    def scan(text, start, final):
+        # Returns (finished sections, new tail, new skip)
+        nonlocal title, found_articles
+        done = []
+        pos = start
+        for m in ARTICLE_PATTERN.finditer(text, start):
+            if not final and not _NON_SPACE.search(text, m.end()):
+                # Header at the very end: its words may continue on the next page
+                body.append(text[pos:m.start()])
+                return done, text[m.start():], 0
+            body.append(text[pos:m.start()])
+            done += close_section()
+            title = m.group(1).strip()
+            found_articles += 1
+            pos = m.end()
+        if final:
+            body.append(text[pos:])
+            return done + close_section(), "", 0
+        # Keep the last line: a header could start there once the next page arrives
+        nl = text.rfind("\n", pos)
+        if nl > pos:
+            body.append(text[pos:nl])
+            return done, text[nl:], 0
+        return done, text[max(pos - 1, 0):], min(pos, 1)
+
+    for page in pages:
+        if not page:
+            continue
+        if found_articles < 2:
+            raw.append(page)
+            raw_chars += len(page)
+        text = f"{tail}\n{page}" if tail else page
+        docs, tail, skip = scan(text, skip, final=False)
+        if found_articles >= 2:
+            raw = []
+            yield from held
+            held = []
+            yield from docs
+        else:
+            held.extend(docs)
+            if raw_chars > FALLBACK_BUFFER_CHARS:
+                # Huge text without article structure: stream it by size
+                print(f"      ⚠️ Regex found only {found_articles} articles. Switching to Standard Chunking.")
+                yield from _iter_size_chunks(itertools.chain(raw, pages), source, subject)
+                return
+
+    docs, _, _ = scan(tail, skip, final=True)
+    if found_articles >= 2:
+        yield from held
+        yield from docs
+        return
+
+    # Fallback: If we found text but no "Articles", chunk by size
+    text = "\n".join(raw)
+    if len(text) > 1000:
+        print(f"      ⚠️ Regex found only {found_articles} articles. Switching to Standard Chunking.")
+        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
+        for i, d in enumerate(splitter.create_documents([text])):
+            d.metadata = {"source": source, "subject": subject, "article": f"Page/Part {i+1}"}
+            d.page_content = f"Source: {source}\nPart: {i+1}\n\n{d.page_content}"
+            yield d
+    else:
+        yield from held + docs
+
+
+@tracing.traced("extract.smart_split")
+def smart_split(text, source):
+    """
+    Whole-text variant of iter_sections() (applies the display folds first).
+    """
+    return list(iter_sections([display_text(text)], source))
+
+
+def iter_file_sections(filepath, ocr_jobs=None, ocr_stats=None, backend=None):
+    """
+    Yields the sections of a file while it is being read: PDFs page by page
+    (backend chosen per document unless `backend` names one), DOCX paragraph
+    by paragraph. ocr_jobs / ocr_stats are passed to the PDF backend.
+    Stage times (read, clean, normalize, segment) are recorded per file when
+    tracing is on.
+    """
+    name = os.path.basename(filepath)
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.pdf':
+        pdf = PDF_BACKENDS[backend] if backend else choose_pdf_backend(filepath)
+        pages = pdf.pages(filepath, ocr_jobs=ocr_jobs, ocr_stats=ocr_stats)
+    elif ext == '.docx':
+        import docx
+        pages = (p.text for p in docx.Document(filepath).paragraphs)
+    else:
+        return
+    chars = 0
+
+    def cleaned(pages):
+        nonlocal chars
+        for page in pages:
+            text = clean_text(page)
+            chars += len(text)
+            yield text
+
+    if not tracing.enabled():
+        yield from iter_sections(iter_normalized(cleaned(pages), table=DISPLAY_TABLE), name)
+        print(f"   📖 Extracted {chars} chars from {name}...")
+        return
+
+    # Each timer includes the stages upstream of it; the differences are the stages
+    read = tracing.IterTimer(pages)
+    clean = tracing.IterTimer(cleaned(read))
+    normalized = tracing.IterTimer(iter_normalized(clean, table=DISPLAY_TABLE))
+    sections = tracing.IterTimer(iter_sections(normalized, name))
+    count = 0
+    for doc in sections:
+        count += 1
+        yield doc
+    tracing.observe("extract.read", read.seconds, file=name)
+    tracing.observe("extract.clean", clean.seconds - read.seconds, file=name)
+    tracing.observe("extract.normalize", normalized.seconds - clean.seconds, file=name)
+    tracing.observe("extract.segment", sections.seconds - normalized.seconds, file=name)
+    tracing.observe("extract.file", sections.seconds, file=name, chars=chars, sections=count)
+    tracing.count("extract.files")
+    tracing.count("extract.sections", count)
+    tracing.count("extract.chars", chars)
+    print(f"   📖 Extracted {chars} chars from {name}...")
+
+
+@tracing.traced("extract.load_file")
+def load_file(filepath, ocr_jobs=None, ocr_stats=None, backend=None):
+    try:
+        return list(iter_file_sections(filepath, ocr_jobs=ocr_jobs, ocr_stats=ocr_stats, backend=backend))
+    except Exception as e:
+        print(f"   ❌ Error reading {os.path.basename(filepath)}: {e}")
+        return []
@@ -0,0 +1,105 @@
+import os
+import pickle
+import threading
+import numpy as np
+
+# --- LAW ROUTER ---
+# One centroid per law (source file): the normalized mean of its child chunk
+# embeddings, read back from Chroma. A query is routed to the laws whose
+# centroid is closest to the query vector, and the dense/lexical search is then
+# restricted to them. Centroids are refreshed per file when its manifest hash
+# changes, so a re-index only recomputes the laws that were touched.
+
+ROUTER_NAME = "law_router.pkl"
+
+
+def subject_of(source):
+    # Same convention as extraction: the subject is the file name without extension
+    return os.path.splitext(source)[0]
+
+
+class LawRouter:
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.centroids = {}  # source -> {"hash": manifest hash, "vector": np.ndarray}
+        self.dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    self.centroids = pickle.load(f)
+            except Exception as e:
+                print(f"⚠️ Law router unreadable ({e}). It will be rebuilt.")
+                self.centroids = {}
+
+    def __len__(self):
+        return len(self.centroids)
+
+    def refresh(self, manifest, vectorstore, page_size=500):
+        """
+        Brings the centroids in line with the manifest. Returns how many were recomputed.
+        """
+        with self._lock:
+            updated = 0
+            for name in [n for n in self.centroids if n not in manifest.entries]:
+                del self.centroids[name]
+                self.dirty = True
+            for name, entry in manifest.entries.items():
+                known = self.centroids.get(name)
+                if known is not None and known["hash"] == entry["hash"]:
+                    continue
+                total, count = None, 0
+                child_ids = entry["child_ids"]
+                for i in range(0, len(child_ids), page_size):
+                    batch = vectorstore.get(ids=child_ids[i:i + page_size], include=["embeddings"])
+                    vectors = np.asarray(batch["embeddings"], dtype=np.float32)
+                    if not len(vectors):
+                        continue
+                    total = vectors.sum(axis=0) if total is None else total + vectors.sum(axis=0)
+                    count += len(vectors)
+                if not count:
+                    self.centroids.pop(name, None)
+                    continue
+                centroid = total / count
+                self.centroids[name] = {"hash": entry["hash"],
+                                        "vector": centroid / max(np.linalg.norm(centroid), 1e-12)}
+                self.dirty = True
+                updated += 1
+            if updated:
+                print(f"🧭 Law router: refreshed {updated} centroid(s).")
+            return updated
+
+    def scores(self, query_vector):
+        """
+        [(source, cosine)] for every law, best first.
+        """
+        if not self.centroids:
+            return []
+        names = list(self.centroids)
+        matrix = np.stack([self.centroids[n]["vector"] for n in names])
+        query = np.asarray(query_vector, dtype=np.float32)
+        sims = matrix @ (query / max(np.linalg.norm(query), 1e-12))
+        order = np.argsort(-sims)
+        return [(names[i], float(sims[i])) for i in order]
+
+    def route(self, query_vector, top_n=2, margin=0.03):
+        """
+        Sources to search: the best law plus any within `margin` of it, at most
+        `top_n`. None (search everything) when there is nothing to narrow down.
+        """
+        ranked = self.scores(query_vector)
+        if len(ranked) <= top_n:
+            return None
+        best = ranked[0][1]
+        return [name for name, score in ranked[:top_n] if score >= best - margin]
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(self.centroids, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+            self.dirty = False
@@ -0,0 +1,148 @@
+import os
+import math
+import heapq
+import pickle
+import threading
+from array import array
+from collections import Counter
+from arabic_norm import tokenize
+
+# --- SPARSE LEXICAL INDEX (BM25) ---
+# Inverted index over the child chunks: term -> (slot array, term-frequency array).
+# Deleted chunks are tombstoned and physically dropped on the next save once
+# they make up a noticeable share of the index.
+
+INDEX_NAME = "lexical_index.pkl"
+
+
+class LexicalIndex:
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.RLock()
+        self._reset()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    state = pickle.load(f)
+                self.__dict__.update(state)
+            except Exception as e:
+                print(f"⚠️ Lexical index unreadable ({e}). It will be rebuilt.")
+                self._reset()
+
+    def _reset(self):
+        self.child_ids = []     # slot -> child vector id (None once deleted)
+        self.parent_ids = []    # slot -> parent doc id
+        self.lengths = array('I')
+        self.slots = {}         # child id -> slot
+        self.postings = {}      # term -> (array of slots, array of tfs)
+        self.total_length = 0
+        self.live = 0
+        self.dirty = False
+
+    def __len__(self):
+        return self.live
+
+    def add(self, child_ids, parent_ids, texts):
+        with self._lock:
+            for child_id, parent_id, text in zip(child_ids, parent_ids, texts):
+                if child_id in self.slots:
+                    self._remove_one(child_id)
+                terms = Counter(tokenize(text))
+                slot = len(self.child_ids)
+                self.child_ids.append(child_id)
+                self.parent_ids.append(parent_id)
+                length = sum(terms.values())
+                self.lengths.append(length)
+                self.slots[child_id] = slot
+                self.total_length += length
+                self.live += 1
+                for term, tf in terms.items():
+                    entry = self.postings.get(term)
+                    if entry is None:
+                        entry = self.postings[term] = (array('I'), array('I'))
+                    entry[0].append(slot)
+                    entry[1].append(tf)
+            self.dirty = True
+
+    def _remove_one(self, child_id):
+        slot = self.slots.pop(child_id)
+        self.child_ids[slot] = None
+        self.total_length -= self.lengths[slot]
+        self.live -= 1
+
+    def remove(self, child_ids):
+        with self._lock:
+            for child_id in child_ids:
+                if child_id in self.slots:
+                    self._remove_one(child_id)
+                    self.dirty = True
+
+    def search(self, query, k=20, parents=None):
+        """
+        Returns [(child_id, parent_id, score)] for the top-k BM25 matches.
+        `parents` (a set of parent ids) restricts the search to their chunks.
+        """
+        terms = set(tokenize(query))
+        if not terms or not self.live:
+            return []
+        with self._lock:
+            avg_len = self.total_length / self.live
+            scores = {}
+            for term in terms:
+                entry = self.postings.get(term)
+                if entry is None:
+                    continue
+                slots, tfs = entry
+                df = len(slots)
+                if df > self.live / 2 and len(terms) > 1:
+                    # Near-stopword (e.g. "المادة"): negligible idf, longest posting list
+                    continue
+                idf = math.log(1 + (self.live - df + 0.5) / (df + 0.5))
+                for slot, tf in zip(slots, tfs):
+                    if self.child_ids[slot] is None:
+                        continue
+                    if parents is not None and self.parent_ids[slot] not in parents:
+                        continue
+                    norm = self.K1 * (1 - self.B + self.B * self.lengths[slot] / avg_len)
+                    scores[slot] = scores.get(slot, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+            top = heapq.nlargest(k, scores.items(), key=lambda kv: kv[1])
+            return [(self.child_ids[slot], self.parent_ids[slot], score) for slot, score in top]
+
+    def _compact(self):
+        keep = [slot for slot, cid in enumerate(self.child_ids) if cid is not None]
+        remap = {old: new for new, old in enumerate(keep)}
+        postings = {}
+        for term, (slots, tfs) in self.postings.items():
+            new_slots, new_tfs = array('I'), array('I')
+            for slot, tf in zip(slots, tfs):
+                if slot in remap:
+                    new_slots.append(remap[slot])
+                    new_tfs.append(tf)
+            if new_slots:
+                postings[term] = (new_slots, new_tfs)
+        self.child_ids = [self.child_ids[s] for s in keep]
+        self.parent_ids = [self.parent_ids[s] for s in keep]
+        self.lengths = array('I', (self.lengths[s] for s in keep))
+        self.slots = {cid: i for i, cid in enumerate(self.child_ids)}
+        self.postings = postings
+
+    def save(self):
+        """
+        Atomic write next to the vector store. No-op when nothing changed.
+        """
+        if not self.path or not self.dirty:
+            return
+        with self._lock:
+            if len(self.child_ids) > 1.25 * self.live:
+                self._compact()
+            state = {k: v for k, v in self.__dict__.items() if k not in ("path", "_lock")}
+            state["dirty"] = False
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+            self.dirty = False
@@ -0,0 +1,122 @@
+import os
+import json
+import hashlib
+
+# --- INGESTION MANIFEST ---
+# One entry per source file (keyed by file name, which is also the `source` metadata):
+#   {"hash", "mtime", "size", "parent_ids", "child_ids"}
+# Lets a re-index skip unchanged files and remove exactly what a changed/deleted
+# file put into the docstore and the vector store.
+# The top-level "embedding" fingerprint records which model/precision built the
+# vectors; a different fingerprint means every file has to be re-embedded.
+# "layout" records how the vectors are laid out in Chroma (one collection, or
+# one per subject); changing it re-indexes every file as well. So does "text",
+# the arabic_norm version the stored text was prepared with ("raw" before it).
+
+MANIFEST_NAME = "manifest.json"
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Manifest:
+    def __init__(self, db_path):
+        self.path = os.path.join(db_path, MANIFEST_NAME)
+        self.entries = {}
+        self.embedding = None
+        self.layout = None
+        self.text = None
+        self._digests = {}  # path -> hash computed during plan()
+        self.is_new = not os.path.exists(self.path)
+        if not self.is_new:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.entries = data.get("files", {})
+                self.embedding = data.get("embedding")
+                self.layout = data.get("layout", "single" if self.entries else None)
+                self.text = data.get("text", "raw" if self.entries else None)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Manifest unreadable ({e}). Treating every file as new.")
+                self.is_new = True
+
+    def embedding_changed(self, fingerprint):
+        return bool(self.entries) and self.embedding is not None and self.embedding != fingerprint
+
+    def layout_changed(self, layout):
+        return bool(self.entries) and self.layout is not None and self.layout != layout
+
+    def text_changed(self, normalization):
+        return bool(self.entries) and self.text is not None and self.text != normalization
+
+    def plan(self, paths, embedding=None, layout=None, text=None):
+        """
+        Compares `paths` against the manifest.
+        Returns (to_index, removed_names): files that are new or changed, and
+        names in the manifest whose file is gone.
+        Only files whose mtime/size moved are hashed, so a no-op check is cheap.
+        If `embedding` (or `layout`, `text`) differs from what the index was built with,
+        every file is returned for re-embedding.
+        """
+        to_index = []
+        seen = set()
+        reembed = ((embedding is not None and self.embedding_changed(embedding))
+                   or (layout is not None and self.layout_changed(layout))
+                   or (text is not None and self.text_changed(text)))
+        for path in paths:
+            name = os.path.basename(path)
+            seen.add(name)
+            if reembed:
+                to_index.append(path)
+                continue
+            entry = self.entries.get(name)
+            st = os.stat(path)
+            if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+                continue
+            digest = self._digests[path] = file_hash(path)
+            if entry and entry["hash"] == digest:
+                # Touched but identical: just refresh the stat fields
+                entry["mtime"], entry["size"] = st.st_mtime, st.st_size
+                continue
+            to_index.append(path)
+        removed = [name for name in self.entries if name not in seen]
+        return to_index, removed
+
+    def get(self, name):
+        return self.entries.get(name)
+
+    def record(self, path, parent_ids, child_ids):
+        digest = self._digests.pop(path, None)
+        try:
+            st = os.stat(path)
+            digest = digest or file_hash(path)
+            mtime, size = st.st_mtime, st.st_size
+        except FileNotFoundError:
+            # Deleted while it was being indexed: keep the ids, the next plan() removes them
+            digest = mtime = size = None
+        self.entries[os.path.basename(path)] = {
+            "hash": digest,
+            "mtime": mtime,
+            "size": size,
+            "parent_ids": list(parent_ids),
+            "child_ids": list(child_ids),
+        }
+
+    def remove(self, name):
+        return self.entries.pop(name, None)
+
+    def save(self):
+        """
+        Atomic write: a crash leaves either the old or the new manifest.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "embedding": self.embedding, "layout": self.layout, "text": self.text, "files": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self.is_new = False
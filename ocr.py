@@ -0,0 +1,191 @@
+import os
+import time
+import sqlite3
+import hashlib
+import functools
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+from config import Config
+
+# --- OCR STAGE FOR SCANNED PDFS ---
+# Pages whose text layer is missing, too short or garbled are rendered with
+# PyMuPDF and OCR'd with Tesseract (ara+eng). Results are cached per page,
+# keyed by a hash of the page's content streams and images (plus DPI and
+# languages), so a re-ingest never OCRs the same page twice, even if the
+# file around it changed. Needs `pytesseract`, Pillow and the tesseract binary
+# with the Arabic language pack; without them pages keep their native text.
+
+CACHE_NAME = "ocr_pages.sqlite"
+
+
+class OcrStats:
+    def __init__(self):
+        self.pages = 0
+        self.ocr_pages = 0      # Pages OCR'd or served from the OCR cache
+        self.cached_pages = 0   # ... of which were served from the cache
+        self.ocr_seconds = 0.0  # Wall time spent rendering + OCR'ing
+
+    def merge(self, other):
+        self.pages += other.pages
+        self.ocr_pages += other.ocr_pages
+        self.cached_pages += other.cached_pages
+        self.ocr_seconds += other.ocr_seconds
+
+
+class OcrCache:
+    def __init__(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, CACHE_NAME)
+        # Several extraction workers share the file; WAL + busy timeout serialises writers
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " seconds REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys):
+        found = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            found.update(self._conn.execute(f"SELECT key, text FROM pages WHERE key IN ({marks})", chunk))
+        return found
+
+    def put_many(self, rows):
+        self._conn.executemany("INSERT OR REPLACE INTO pages(key, text, seconds) VALUES (?, ?, ?)", rows)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+
+def page_key(doc, page, dpi, lang):
+    """
+    Content hash of a page: its drawing instructions and embedded images.
+    """
+    h = hashlib.sha256(f"{dpi}|{lang}|".encode("utf-8"))
+    h.update(page.read_contents() or b"")
+    for image in page.get_images(full=True):
+        h.update(doc.xref_stream_raw(image[0]) or b"")
+    return h.hexdigest()
+
+
+def needs_ocr(text, min_chars):
+    """
+    True for image-only pages, pages with almost no text layer, and text layers
+    dominated by unmapped glyphs (broken font encodings in scanned exports).
+    """
+    stripped = text.strip()
+    if len(stripped) < min_chars:
+        return True
+    bad = sum(1 for c in stripped if c == '\ufffd' or '\ue000' <= c <= '\uf8ff' or (c < ' ' and c not in '\n\t'))
+    return bad / len(stripped) > 0.1
+
+
+@functools.lru_cache(maxsize=None)
+def _ocr_available():
+    # Checked once per process: get_tesseract_version() runs `tesseract --version`
+    try:
+        import pytesseract
+        from PIL import Image  # noqa: F401
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception as e:
+        print(f"   ⚠️ OCR unavailable ({e}). Scanned pages keep their native text.")
+        return False
+
+
+def _ocr_page(task):
+    """
+    Pool task: renders one page and OCRs it. Returns (page_no, text, seconds).
+    """
+    import pytesseract
+    from PIL import Image
+    path, page_no, dpi, lang = task
+    start = time.perf_counter()
+    with fitz.open(path) as doc:
+        pix = doc[page_no].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+        image = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+    text = pytesseract.image_to_string(image, lang=lang)
+    return page_no, text, time.perf_counter() - start
+
+
+def _ocr_window(path, texts, first_page, todo, cache, pool):
+    """
+    Fills texts[n - first_page] for every page n in `todo` ({page_no: key}) from
+    the cache or by OCR. Returns (pages filled, of which from the cache); pages
+    left alone (no OCR installed) are not counted.
+    """
+    cached = cache.get_many(list(set(todo.values())))
+    missing = []
+    for page_no, key in todo.items():
+        if key in cached:
+            texts[page_no - first_page] = cached[key]
+        else:
+            missing.append(page_no)
+    ocr_done = 0
+    if missing and _ocr_available():
+        tasks = [(path, n, Config.OCR_DPI, Config.OCR_LANG) for n in missing]
+        results = map(_ocr_page, tasks) if pool is None else pool.map(_ocr_page, tasks)
+        rows = []
+        for page_no, text, seconds in results:
+            texts[page_no - first_page] = text
+            rows.append((todo[page_no], text, seconds))
+        cache.put_many(rows)
+        ocr_done = len(rows)
+    hits = len(todo) - len(missing)
+    return hits + ocr_done, hits
+
+
+def iter_pdf_pages(path, ocr_jobs=None, stats=None, window=None):
+    """
+    Yields the text of every page of `path` in order, OCR'ing the pages that need it.
+    Pages are read `window` at a time so the OCR pool has work in parallel while
+    memory stays bounded by the window, not the document.
+    ocr_jobs -- OCR processes for this file (1 = in-process, used when the caller
+                already runs in a worker pool)
+    stats    -- optional OcrStats to accumulate into
+    """
+    stats = stats if stats is not None else OcrStats()
+    ocr_jobs = ocr_jobs or Config.OCR_JOBS
+    window = window or max(8, 4 * ocr_jobs)
+    dpi, lang = Config.OCR_DPI, Config.OCR_LANG
+    cache = pool = None
+    ocr_pages = hits = 0
+    ocr_seconds = 0.0
+    try:
+        with fitz.open(path) as doc:
+            for first in range(0, len(doc), window):
+                pages = range(first, min(first + window, len(doc)))
+                texts = [doc[n].get_text() for n in pages]
+                stats.pages += len(texts)
+                todo = {}
+                if Config.OCR_ENABLED:
+                    todo = {n: page_key(doc, doc[n], dpi, lang) for n, text in zip(pages, texts)
+                            if needs_ocr(text, Config.OCR_MIN_CHARS)}
+                if todo:
+                    start = time.perf_counter()
+                    if cache is None:
+                        cache = OcrCache(Config.OCR_CACHE_PATH)
+                    if pool is None and ocr_jobs > 1 and len(todo) > 1 and _ocr_available():
+                        pool = ProcessPoolExecutor(max_workers=ocr_jobs)
+                    done, cached = _ocr_window(path, texts, first, todo, cache, pool)
+                    if done:
+                        ocr_pages += done
+                        hits += cached
+                        ocr_seconds += time.perf_counter() - start
+                yield from texts
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if cache is not None:
+            cache.close()
+        stats.ocr_pages += ocr_pages
+        stats.cached_pages += hits
+        stats.ocr_seconds += ocr_seconds
+        if ocr_pages:
+            print(f"      🔍 OCR {os.path.basename(path)}: {ocr_pages} pages ({hits} cached) in {ocr_seconds:.1f}s")
@@ -0,0 +1,101 @@
+import os
+import re
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# --- ONNX RUNTIME EMBEDDING BACKEND ---
+# EMBED_BACKEND=onnx      : bge-m3 exported once to ONNX (fp32), run by onnxruntime
+# EMBED_BACKEND=onnx-int8 : same export, dynamically quantized to int8 weights
+# Exports are cached under EMBED_ONNX_DIR. Pooling (CLS) and L2 normalization
+# match the sentence-transformers model, so vectors live in the same space as
+# the torch backend. Needs `optimum[onnxruntime]` (only imported here).
+
+
+def _slug(name):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', name)
+
+
+def export_model(model_name, cache_dir, quantize):
+    """
+    Exports (and optionally quantizes) the model once. Returns (model_dir, onnx_file).
+    """
+    base_dir = os.path.join(cache_dir, _slug(model_name), "fp32")
+    if not os.path.exists(os.path.join(base_dir, "model.onnx")):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+        print(f"📦 Exporting {model_name} to ONNX (one-time)...")
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(base_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(base_dir)
+    if not quantize:
+        return base_dir, "model.onnx"
+
+    int8_dir = os.path.join(cache_dir, _slug(model_name), "int8")
+    if not os.path.exists(os.path.join(int8_dir, "model_quantized.onnx")):
+        from optimum.onnxruntime import ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+        print(f"📦 Quantizing {model_name} to int8 (one-time)...")
+        # Dynamic quantization: int8 weights, activations quantized on the fly.
+        # The AVX2 config runs on every x86-64 CPU we deploy to (VNNI is used when present).
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=True)
+        ORTQuantizer.from_pretrained(base_dir).quantize(save_dir=int8_dir, quantization_config=qconfig)
+        AutoTokenizer.from_pretrained(base_dir).save_pretrained(int8_dir)
+    return int8_dir, "model_quantized.onnx"
+
+
+class OnnxEmbeddings(Embeddings):
+    def __init__(self, model_name, cache_dir, quantize=False, threads=0, pin_threads=False,
+                 normalize=True, batch_size=16, max_length=8192):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.normalize = normalize
+        self.batch_size = batch_size
+        self.max_length = max_length
+        model_dir, onnx_file = export_model(model_name, cache_dir, quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if not threads and hasattr(os, "sched_getaffinity"):
+            threads = len(os.sched_getaffinity(0))
+        if threads:
+            options.intra_op_num_threads = threads
+            if pin_threads and hasattr(os, "sched_getaffinity"):
+                # Thread 0 is the caller; pin the remaining pool threads one core each
+                cores = sorted(os.sched_getaffinity(0))[1:threads]
+                if cores:
+                    options.add_session_config_entry(
+                        "session.intra_op_thread_affinities", ";".join(str(c + 1) for c in cores))
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, onnx_file), sess_options=options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        print(f"⚙️ ONNX embeddings ready ({'int8' if quantize else 'fp32'}, {threads or 'default'} threads)")
+
+    def _encode(self, texts):
+        # Sort by length so each batch pads to similar lengths, then restore order
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            enc = self.tokenizer([texts[i] for i in idx], padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors="np")
+            feeds = {k: v.astype(np.int64) for k, v in enc.items() if k in self._inputs}
+            hidden = self.session.run(None, feeds)[0]
+            cls = hidden[:, 0]
+            if self.normalize:
+                cls = cls / np.linalg.norm(cls, axis=1, keepdims=True).clip(min=1e-12)
+            for i, vec in zip(idx, cls):
+                vectors[i] = vec.astype(np.float32).tolist()
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(list(texts)) if texts else []
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
@@ -0,0 +1,282 @@
+import os
+import time
+import uuid
+import itertools
+import multiprocessing
+from queue import Empty
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+import tracing
+
+# --- STAGED INGESTION PIPELINE ---
+# Stage 1 (process pool): pages (+ OCR of scanned pages) -> clean_text -> display folds -> iter_sections,
+# one file per task, streamed back in chunks through a bounded queue as articles close.
+# Stage 2 (this process): batches sections across files and hands them to the
+# retriever, which splits children and embeds them with the single loaded model.
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+IGNORED_PREFIXES = ('~$', '.')  # Office lock files, hidden / partial downloads
+
+
+def list_data_files(folder):
+    """
+    Returns the ingestible files of a folder, sorted for a stable order.
+    """
+    if not os.path.isdir(folder):
+        return []
+    return sorted(
+        os.path.join(folder, f) for f in os.listdir(folder)
+        if f.lower().endswith(SUPPORTED_EXTENSIONS) and not f.startswith(IGNORED_PREFIXES)
+        and os.path.isfile(os.path.join(folder, f))
+    )
+
+
+_OUT = None  # Worker side of the section queue (set by _init_worker)
+
+
+def _init_worker(queue):
+    global _OUT
+    _OUT = queue
+
+
+def _extract(path, emit, chunk_size, ocr_jobs=None, ship_trace=False):
+    """
+    Streams the sections of `path` to emit("sections", path, docs) in chunks of
+    `chunk_size` while the file is still being read, then emits
+    ("done", path, seconds, ocr_stats, error, trace). With `ship_trace` (worker
+    processes) the file's tracing.Trace travels with "done" for the parent's metrics.
+    Only extraction errors are reported in "done"; an error raised by `emit`
+    (the in-process consumer writing to the index) propagates to the caller.
+    """
+    from extraction import iter_file_sections
+    from ocr import OcrStats
+    start = time.perf_counter()
+    ocr_stats = OcrStats()
+    error = None
+    with tracing.collect() as trace:
+        docs = iter_file_sections(path, ocr_jobs=ocr_jobs, ocr_stats=ocr_stats)
+        while True:
+            try:
+                chunk = list(itertools.islice(docs, chunk_size))
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                break
+            if not chunk:
+                break
+            emit(("sections", path, chunk))
+    emit(("done", path, time.perf_counter() - start, ocr_stats, error, trace if ship_trace else None))
+
+
+def _extract_task(path, chunk_size):
+    """
+    Worker task. Runs in a child process, so the import stays local. Files are
+    already spread over the pool, so OCR stays in the worker.
+    """
+    _extract(path, _OUT.put, chunk_size, ocr_jobs=1, ship_trace=True)
+
+
+def _stop_pool(pool, queue):
+    """
+    Stops a pool after the consumer failed. Workers may be blocked putting
+    sections on the full bounded queue, so a plain shutdown() would wait for
+    ever: queued tasks are cancelled and the running workers terminated (their
+    sections would be discarded anyway).
+    """
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    deadline = time.monotonic() + 10
+    while any(p.is_alive() for p in processes) and time.monotonic() < deadline:
+        try:
+            queue.get(timeout=0.1)  # Unblock a worker still flushing into the pipe
+        except Empty:
+            pass
+    for process in processes:
+        process.join(timeout=1)
+    queue.close()
+    queue.cancel_join_thread()
+
+
+# Stage spans summarised by the report, in pipeline order
+_REPORT_STAGES = ("extract.read", "extract.clean", "extract.normalize", "extract.segment",
+                  "index.split", "index.embed", "index.write", "index.docstore", "index.keyword")
+
+
+class PipelineStats:
+    def __init__(self):
+        self.files = 0
+        self.failed = 0
+        self.sections = 0
+        self.chars = 0
+        self.batches = 0
+        self.ocr = None             # OcrStats summed over files
+        self.extract_seconds = 0.0  # Summed over workers (CPU time spent in stage 1)
+        self.embed_seconds = 0.0    # Wall time of stage 2
+        self.wall_seconds = 0.0
+        self.stages = {}            # Span name -> seconds spent in this run (see tracing.py)
+
+    def report(self):
+        def rate(n, secs):
+            return n / secs if secs > 0 else 0.0
+
+        print("\n📊 Ingestion Report")
+        print(f"   ⏱️ Wall clock: {self.wall_seconds:.1f}s for {self.files} files ({self.failed} empty/failed)")
+        print(f"   📖 Extract stage: {self.extract_seconds:.1f}s worker time | "
+              f"{rate(self.files, self.extract_seconds):.2f} files/s | "
+              f"{rate(self.chars, self.extract_seconds) / 1000:.1f}k chars/s per worker")
+        if self.ocr is not None and self.ocr.pages:
+            share = 100 * self.ocr.ocr_seconds / self.extract_seconds if self.extract_seconds > 0 else 0.0
+            print(f"   🔍 OCR: {self.ocr.ocr_pages}/{self.ocr.pages} pages ({self.ocr.cached_pages} from cache) | "
+                  f"{rate(self.ocr.pages, self.extract_seconds):.1f} pages/s extracted | "
+                  f"{rate(self.ocr.ocr_pages - self.ocr.cached_pages, self.ocr.ocr_seconds):.2f} pages/s OCR'd | "
+                  f"{share:.0f}% of extract time")
+        print(f"   🧠 Embed stage: {self.embed_seconds:.1f}s | {self.batches} batches | "
+              f"{rate(self.sections, self.embed_seconds):.2f} sections/s")
+        stages = [(name, self.stages[name]) for name in _REPORT_STAGES if name in self.stages]
+        if stages:
+            print("   🧩 Stages: " + " | ".join(f"{name.split('.', 1)[1]} {seconds:.2f}s" for name, seconds in stages))
+
+
+def run_pipeline(files, retriever, jobs=None, batch_size=None, queue_depth=None, on_file_done=None):
+    """
+    Extracts `files` in a process pool and feeds the sections to `retriever.add_documents`
+    in batches that span file boundaries. Workers stream sections while they are
+    still reading a file, so embedding starts before a large file is fully read
+    and memory stays bounded by the queue, not by the document size.
+
+    jobs        -- extraction processes (1 runs everything in this process)
+    batch_size  -- sections per add_documents call
+    queue_depth -- max section chunks extracted but not yet embedded (bounds memory)
+    on_file_done(path, parent_ids, child_ids) -- optional callback once all of
+                   a file's sections are indexed (used to update the manifest);
+                   files that extract to nothing are reported with no ids,
+                   failed files are not reported
+    """
+    jobs = jobs or Config.INGEST_WORKERS
+    batch_size = batch_size or Config.INGEST_BATCH_SIZE
+    queue_depth = queue_depth or Config.INGEST_QUEUE_DEPTH
+
+    stats = PipelineStats()
+    stages_before = tracing.totals()
+    wall_start = time.perf_counter()
+    pending = []    # (path, section) waiting for the next embedding batch
+    remaining = {}  # path -> sections of that file not yet indexed
+    counts = {}     # path -> sections received so far
+    file_ids = {}   # path -> (parent ids, child ids) written so far
+    finished = set()  # files whose worker is done (all sections received)
+
+    def file_done(path):
+        parent_ids, child_ids = file_ids.pop(path)
+        del remaining[path], counts[path]
+        finished.discard(path)
+        if on_file_done:
+            on_file_done(path, parent_ids, child_ids)
+
+    def flush(limit):
+        while pending and (len(pending) >= limit):
+            batch, pending[:] = pending[:batch_size], pending[batch_size:]
+            start = time.perf_counter()
+            ids = [str(uuid.uuid4()) for _ in batch]
+            children = retriever.add_documents([doc for _, doc in batch], ids=ids) or {}
+            stats.embed_seconds += time.perf_counter() - start
+            stats.batches += 1
+            for (path, _), doc_id in zip(batch, ids):
+                parent_ids, child_ids = file_ids[path]
+                parent_ids.append(doc_id)
+                child_ids.extend(children.get(doc_id, []))
+                remaining[path] -= 1
+                if remaining[path] == 0 and path in finished:
+                    file_done(path)
+
+    def fail(path, error):
+        # Undo what a file that broke half-way already wrote
+        stats.failed += 1
+        print(f"   ❌ Extraction failed for {os.path.basename(path)}: {error}")
+        pending[:] = [(p, d) for p, d in pending if p != path]
+        parent_ids, child_ids = file_ids.pop(path, ([], []))
+        remaining.pop(path, None)
+        counts.pop(path, None)
+        finished.discard(path)
+        if parent_ids:
+            retriever.delete_documents(parent_ids, child_ids)
+        # Not reported to on_file_done: the failure may be transient, so the next sync retries it
+
+    def consume(message):
+        kind, path = message[0], message[1]
+        if kind == "sections":
+            docs = message[2]
+            stats.sections += len(docs)
+            stats.chars += sum(len(d.page_content) for d in docs)
+            pending.extend((path, d) for d in docs)
+            remaining[path] = remaining.get(path, 0) + len(docs)
+            counts[path] = counts.get(path, 0) + len(docs)
+            file_ids.setdefault(path, ([], []))
+            flush(batch_size)
+            return
+
+        _, _, elapsed, ocr_stats, error, trace = message
+        tracing.merge(trace)
+        stats.files += 1
+        stats.extract_seconds += elapsed
+        if stats.ocr is None:
+            stats.ocr = ocr_stats
+        else:
+            stats.ocr.merge(ocr_stats)
+        name = os.path.basename(path)
+        if error:
+            fail(path, error)
+        elif not counts.get(path):
+            stats.failed += 1
+            print(f"      ⚠️ Skipped (Empty): {name}")
+            # Recorded with nothing indexed, so an unchanged empty file is not re-read every sync
+            if on_file_done:
+                on_file_done(path, [], [])
+        else:
+            print(f"      ✅ Extracted {counts[path]} sections from {name}.")
+            finished.add(path)
+            if remaining[path] == 0:
+                file_done(path)
+
+    print(f"🚀 Pipeline: {len(files)} files | {jobs} workers | batch {batch_size} | queue {queue_depth}")
+
+    if jobs <= 1:
+        for path in files:
+            # In-process: each file may spread its OCR pages over Config.OCR_JOBS processes
+            _extract(path, consume, batch_size)
+    else:
+        # Bounded queue: workers block once `queue_depth` chunks wait for the embedder
+        ctx = multiprocessing.get_context()
+        queue = ctx.Queue(maxsize=queue_depth)
+        pool = ProcessPoolExecutor(max_workers=jobs, mp_context=ctx,
+                                   initializer=_init_worker, initargs=(queue,))
+        try:
+            futures = {pool.submit(_extract_task, path, batch_size): path for path in files}
+            open_files = set(files)
+            while open_files:
+                try:
+                    message = queue.get(timeout=1.0)
+                except Empty:
+                    # A worker that died without reporting (e.g. killed) never sends "done"
+                    for future, path in futures.items():
+                        if path in open_files and future.done() and future.exception() is not None:
+                            open_files.discard(path)
+                            stats.files += 1
+                            fail(path, future.exception())
+                    continue
+                if message[0] == "done":
+                    open_files.discard(message[1])
+                consume(message)
+        except BaseException:
+            # Embedder / vector store failure (or Ctrl+C): fail the run instead of hanging
+            _stop_pool(pool, queue)
+            raise
+        pool.shutdown()
+
+    flush(1)
+    stats.wall_seconds = time.perf_counter() - wall_start
+    stats.stages = {name: seconds - stages_before.get(name, (0, 0.0))[1]
+                    for name, (_, seconds) in tracing.totals().items()
+                    if name.startswith(("extract.", "index.")) and seconds > stages_before.get(name, (0, 0.0))[1]}
+    stats.report()
+    return stats
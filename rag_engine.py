@@ -1,18 +1,173 @@
 import os
+import time
+import asyncio
+import contextlib
 import pickle
-from typing import List, Optional, Any
-from langchain_chroma import Chroma
-from langchain_classic.storage import LocalFileStore
-from langchain.storage import InMemoryStore
+import threading
+from typing import List, Optional, Any, Dict
 # from langchain.retrievers import ParentDocumentRetriever # Removed standard import
+# Chroma (chromadb) is imported where first used: it dominates
+# import time and the UI should render before they load (see startup.py).
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_classic.chains import RetrievalQA
 from langchain_core.prompts import PromptTemplate
 from config import Config
-from text_utils import load_file_structured
+from pipeline import list_data_files, run_pipeline
+from manifest import Manifest, MANIFEST_NAME
+from docstore import open_docstore
+from answer_cache import AnswerCache
+from lexical_index import LexicalIndex, INDEX_NAME as LEXICAL_INDEX_NAME
+from article_index import ArticleIndex, INDEX_NAME as ARTICLE_INDEX_NAME
+from law_router import LawRouter, ROUTER_NAME, subject_of
+from arabic_norm import NORMALIZATION
+import tracing
 from langchain_core.retrievers import BaseRetriever
 from langchain_core.documents import Document
 
+QA_TEMPLATE = """
+        You are a strict technical translator.
+        
+        **INPUT DATA:**
+        Context: {context}
+        User Question: {question}
+        
+        **INSTRUCTIONS:**
+        1. You must answer ONLY using the "Context" provided above.
+        2. **IF CONTEXT IS ENGLISH:** You must TRANSLATE it into Arabic sentence-by-sentence.
+        3. **DO NOT SUMMARIZE.** Do not change the list structure. If the source has (A, B, C, D, E, F), your answer MUST have (A, B, C, D, E, F).
+        4. **BAN:** Do not use the word "доходات" or any non-Arabic words.
+        5. **CITATION:** You must cite the source file at the end.
+        
+        **ANSWER (ARABIC):**
+        """
+
+
+class ThinkFilter:
+    """
+    Drops <think>...</think> spans from a token stream as it arrives.
+    Text that might be the start of a tag split across chunks is held back
+    until the next chunk decides it.
+    """
+    OPEN, CLOSE = "<think>", "</think>"
+
+    def __init__(self):
+        self.buffer = ""
+        self.inside = False
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        out = []
+        while True:
+            tag = self.CLOSE if self.inside else self.OPEN
+            idx = self.buffer.find(tag)
+            if idx >= 0:
+                if not self.inside:
+                    out.append(self.buffer[:idx])
+                self.buffer = self.buffer[idx + len(tag):]
+                self.inside = not self.inside
+                continue
+            # Keep the longest suffix that is a prefix of the tag
+            keep = 0
+            for n in range(min(len(tag) - 1, len(self.buffer)), 0, -1):
+                if tag.startswith(self.buffer[-n:]):
+                    keep = n
+                    break
+            if not self.inside:
+                out.append(self.buffer[:len(self.buffer) - keep])
+            self.buffer = self.buffer[len(self.buffer) - keep:]
+            return "".join(out)
+
+    def flush(self):
+        tail, self.buffer = ("" if self.inside else self.buffer), ""
+        return tail
+
+
+class _Answer:
+    """
+    One answer, shared by RAGEngine.answer(), stream_answer() and
+    astream_answer(): the packed prompt, LLM chunks through feed() (<think>
+    removal, time to first token, prompt usage) and the "done" event. Only the
+    loop that drives the LLM (invoke, stream, astream) differs per path.
+    """
+
+    def __init__(self, engine, start, overhead=0.0):
+        self.engine = engine
+        self.start = start
+        self.overhead = overhead
+        self.stats = None   # Context packing stats
+        self.usage = None   # LLM response metadata carrying the prompt counts
+        self.ttft = None
+        self.parts = []
+        self._think = ThinkFilter()
+
+    def prompt(self, query, docs):
+        prompt, self.stats = self.engine._build_prompt(query, docs)
+        return prompt
+
+    def feed(self, message):
+        """
+        One LLM chunk (or the whole message); returns its visible text.
+        """
+        if message.response_metadata.get("prompt_eval_count") is not None:
+            self.usage = message.response_metadata
+        text = self._think.feed(message.content)
+        if text:
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - self.start
+            self.parts.append(text)
+        return text
+
+    def flush(self):
+        tail = self._think.flush()
+        if tail:
+            self.parts.append(tail)
+        return tail
+
+    @property
+    def text(self):
+        return "".join(self.parts).strip()
+
+    def cached(self, hit, trace):
+        """
+        The "done" event of an answer cache hit.
+        """
+        total = time.perf_counter() - self.start
+        print(f"⚡ Answer cache hit ({total * 1000:.0f}ms), matched: {hit['query'][:60]}")
+        tracing.observe("query.total", total, cached=True)
+        return {"type": "done", "ttft": total, "total": total, "overhead": self.overhead, "cached": True,
+                "trace": trace.breakdown()}
+
+    def done(self, trace, generate=None):
+        """
+        The "done" event of a generated answer. `generate` is the LLM time of a
+        streamed answer (answer() times its single call with a span instead).
+        """
+        total = time.perf_counter() - self.start
+        ttft = self.ttft if self.ttft is not None else total
+        if generate is not None:
+            tracing.observe("query.generate", generate)
+            tracing.observe("query.first_token", ttft)
+            print(f"⏱️ Answer streamed: TTFT {ttft:.2f}s, total {total:.2f}s, setup {self.overhead * 1000:.2f}ms")
+        tracing.observe("query.total", total, cached=False)
+        tracing.count("query.answers")
+        return {"type": "done", "ttft": ttft, "total": total, "overhead": self.overhead, "cached": False,
+                "trace": trace.breakdown(), **self.engine._log_prompt(self.stats, self.usage)}
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """
+    Fuses ranked id lists: score(id) = sum(1 / (k + rank)). Duplicates inside
+    one list only count at their best rank. Returns ids, best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        seen = set()
+        for rank, doc_id in enumerate(ranking):
+            if doc_id is None or doc_id in seen:
+                continue
+            seen.add(doc_id)
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
 # --- POLYFILL CLASS (MUST MATCH INGEST.PY) ---
 class ParentDocumentRetriever(BaseRetriever):
     """
@@ -23,76 +178,296 @@ class ParentDocumentRetriever(BaseRetriever):
     docstore: Any
     child_splitter: Any
     id_key: str = "doc_id"
+    lexical_index: Any = None  # Optional BM25 index, kept in sync on add/delete
+    hybrid: bool = True        # Fuse lexical hits with the dense hits at query time
+    article_index: Any = None  # Optional (law, article number) -> parent ids, kept in sync
+    article_lookup: bool = True  # Answer citation queries from the article index
+    write_batch_size: int = 128  # Children embedded + upserted per vectorstore write
+    k: int = 5                 # Parents returned
+    fetch_k: int = 20          # Children fetched per search side before fusion
+    rrf_k: int = 60
+    reranker: Any = None       # Optional cross-encoder: rerank `rerank_candidates` parents down to k
+    rerank_candidates: int = 20
     
-    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None):
+    @tracing.traced("index.add_documents")
+    def add_documents(self, documents: List[Document], ids: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """
+        Stores parents in the docstore and their children in the vectorstore.
+        Children are embedded and written `write_batch_size` at a time, the next
+        batch embedding while the current one is upserted, so memory is bounded
+        by two batches. All or nothing: the parents are committed (one docstore
+        transaction) only after every child is written, and the children already
+        written are deleted again if anything fails.
+        Returns {parent_id: [child_vector_ids]} so callers can track what was written.
+        """
         import uuid
         if not documents:
-            return
+            return {}
         
         if ids is None:
             ids = [str(uuid.uuid4()) for _ in documents]
             
         full_docs = []
-        for i, doc in enumerate(documents):
-            doc_id = ids[i]
-            # Split into children
-            sub_docs = self.child_splitter.split_documents([doc])
-            for sub_doc in sub_docs:
-                sub_doc.metadata[self.id_key] = doc_id
-            full_docs.extend(sub_docs)
-            
-            # Add to docstore
-            self.docstore.mset([(doc_id, doc)])
+        child_ids = []
+        written = {}
+        with tracing.span("index.split", parents=len(documents)):
+            for i, doc in enumerate(documents):
+                doc_id = ids[i]
+                # Split into children
+                sub_docs = self.child_splitter.split_documents([doc])
+                written[doc_id] = []
+                for n, sub_doc in enumerate(sub_docs):
+                    sub_doc.metadata[self.id_key] = doc_id
+                    written[doc_id].append(f"{doc_id}-{n}")
+                full_docs.extend(sub_docs)
+                child_ids.extend(written[doc_id])
+        tracing.count("index.parents", len(documents))
+        tracing.count("index.children", len(child_ids))
             
-        # Add to vectorstore
-        self.vectorstore.add_documents(full_docs) 
+        # Add to vectorstore, batch by batch
+        stored = []
+        try:
+            for docs, batch_ids in self._write_children(full_docs, child_ids):
+                stored.extend(batch_ids)
+            # Add to docstore: every parent in one transaction
+            with tracing.span("index.docstore", parents=len(documents)):
+                self.docstore.mset(list(zip(ids, documents)))
+        except BaseException:
+            if stored:
+                self.vectorstore.delete(ids=stored)
+            raise
+
+        with tracing.span("index.keyword"):
+            if self.lexical_index is not None:
+                self.lexical_index.add(child_ids, [d.metadata[self.id_key] for d in full_docs],
+                                       [d.page_content for d in full_docs])
+            if self.article_index is not None:
+                self.article_index.add(ids, documents)
+        return written
+
+    def _write_children(self, docs, ids):
+        """
+        Embeds and upserts children in batches, embedding batch n+1 on a helper
+        thread while batch n is written. Yields (docs, ids) of each stored batch.
+        Vector stores without a raw upsert embed inside add_documents instead.
+        """
+        size = max(1, self.write_batch_size)
+        batches = [(docs[i:i + size], ids[i:i + size]) for i in range(0, len(docs), size)]
+        embedder = getattr(self.vectorstore, "embeddings", None)
+        collection = getattr(self.vectorstore, "_collection", None)
+        if embedder is None or not (collection is not None or hasattr(self.vectorstore, "upsert_embedded")):
+            for batch_docs, batch_ids in batches:
+                with tracing.span("index.write", children=len(batch_ids)):
+                    self.vectorstore.add_documents(batch_docs, ids=batch_ids)
+                yield batch_docs, batch_ids
+            return
+
+        def embed(batch):
+            with tracing.span("index.embed", children=len(batch[0])):
+                return embedder.embed_documents([d.page_content for d in batch[0]])
+
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed-ahead") as pool:
+            future = pool.submit(embed, batches[0]) if batches else None
+            for n, (batch_docs, batch_ids) in enumerate(batches):
+                vectors = future.result()
+                if n + 1 < len(batches):
+                    future = pool.submit(embed, batches[n + 1])
+                with tracing.span("index.write", children=len(batch_ids)):
+                    if hasattr(self.vectorstore, "upsert_embedded"):
+                        self.vectorstore.upsert_embedded(batch_docs, batch_ids, vectors)
+                    else:
+                        collection.upsert(ids=batch_ids, embeddings=vectors,
+                                          documents=[d.page_content for d in batch_docs],
+                                          metadatas=[d.metadata for d in batch_docs])
+                yield batch_docs, batch_ids
 
-    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
-        """Retrieve documents relevant to the query."""
-        # 1. Search vectorstore for children
-        sub_docs = self.vectorstore.similarity_search(query, k=5)
+    def delete_documents(self, parent_ids: List[str], child_ids: List[str]):
+        """
+        Removes parents from the docstore and their children from the vectorstore.
+        """
+        if child_ids:
+            self.vectorstore.delete(ids=list(child_ids))
+            if self.lexical_index is not None:
+                self.lexical_index.remove(child_ids)
+        if parent_ids:
+            self.docstore.mdelete(list(parent_ids))
+            if self.article_index is not None:
+                self.article_index.remove(parent_ids)
+
+    def article_ids(self, query: str, parent_ids: Optional[set] = None) -> List[str]:
+        """
+        Parents of the articles a citation query names ("المادة الخامسة من ..."),
+        within `parent_ids` if given; [] when it names none.
+        """
+        if not self.article_lookup or self.article_index is None:
+            return []
+        with tracing.span("query.article_lookup"):
+            ids = self.article_index.lookup(query)
+        if ids and parent_ids is not None:
+            ids = [i for i in ids if i in parent_ids]
+        return ids[:self.k] if ids else []
+
+    def _search_ids(self, query: str, where: Optional[dict] = None, parent_ids: Optional[set] = None,
+                    limit: Optional[int] = None, spans: Optional[dict] = None,
+                    vector: Optional[List[float]] = None, articles: Optional[List[str]] = None) -> List[str]:
+        """
+        Ranked parent ids for the query (at most `limit`, default k).
+        spans      -- optional dict filled with {parent id: [matched child texts]}
+        vector     -- the query's embedding, if the caller already has it
+        articles   -- article_ids(query, parent_ids), if the caller already ran it
+        where      -- Chroma metadata filter, applied inside the vector search
+        parent_ids -- the parents `where` selects, to restrict the other indexes alike
+        """
+        # 0. Citation queries resolve directly, no embedding
+        if articles is None:
+            articles = self.article_ids(query, parent_ids)
+        if articles:
+            tracing.count("query.article_lookups")
+            return articles
+        
+        # 1. Search vectorstore for children (dense), pre-filtered by metadata.
+        # The query is embedded here rather than inside the store, so the two are timed apart
+        embedder = getattr(self.vectorstore, "embeddings", None) if vector is None else None
+        if embedder is not None:
+            with tracing.span("query.embed"):
+                vector = embedder.embed_query(query)
+        with tracing.span("query.vector_search"):
+            if vector is not None:
+                sub_docs = self.vectorstore.similarity_search_by_vector(vector, k=self.fetch_k, filter=where)
+            else:
+                sub_docs = self.vectorstore.similarity_search(query, k=self.fetch_k, filter=where)
+        rankings = [[d.metadata.get(self.id_key) for d in sub_docs]]
+        if spans is not None:
+            for d in sub_docs:
+                spans.setdefault(d.metadata.get(self.id_key), []).append(d.page_content)
         
-        # 2. Extract unique Parent IDs
-        ids = []
-        for d in sub_docs:
-            if self.id_key in d.metadata:
-                ids.append(d.metadata[self.id_key])
-        ids = list(set(ids))
+        # 2. Search the lexical index (exact article numbers / legal terms)
+        if self.hybrid and self.lexical_index is not None:
+            with tracing.span("query.lexical_search"):
+                rankings.append([parent_id for _, parent_id, _ in
+                                 self.lexical_index.search(query, k=self.fetch_k, parents=parent_ids)])
+        
+        # Fuse into one parent ranking (keeps order, unlike a set)
+        return reciprocal_rank_fusion(rankings, self.rrf_k)[:limit or self.k]
+
+    @tracing.traced("query.retrieve")
+    def _get_relevant_documents(self, query: str, *, run_manager=None, where: Optional[dict] = None,
+                                parent_ids: Optional[set] = None,
+                                vector: Optional[List[float]] = None,
+                                articles: Optional[List[str]] = None) -> List[Document]:
+        """Retrieve documents relevant to the query (optionally within a metadata filter)."""
+        if parent_ids is not None and not parent_ids:
+            return []  # Empty scope: nothing can match
+        rerank = self.reranker is not None and self.rerank_candidates > self.k
+        spans = {}
+        ids = self._search_ids(query, where=where, parent_ids=parent_ids,
+                               limit=self.rerank_candidates if rerank else self.k, spans=spans,
+                               vector=vector, articles=articles)
         
         # 3. Fetch Parents from docstore
         if not ids:
             return []
             
-        raw_docs = self.docstore.mget(ids)
-        final_docs = []
-        for d in raw_docs:
-            if d is not None:
-                try:
-                    # CRITICAL: Only unpickle if it's bytes (Standard ParentDocumentRetriever stores Documents directly usually)
-                    if isinstance(d, bytes):
-                        final_docs.append(pickle.loads(d))
-                    else:
+        with tracing.span("query.docstore", parents=len(ids)):
+            raw_docs = self.docstore.mget(ids)
+            final_docs = []
+            for doc_id, d in zip(ids, raw_docs):
+                if d is not None:
+                    try:
+                        # CRITICAL: Only unpickle if it's bytes (Standard ParentDocumentRetriever stores Documents directly usually)
+                        if isinstance(d, bytes):
+                            d = pickle.loads(d)
+                        # Callers (answer cache, citations) need to know which parent this is
+                        d.metadata[self.id_key] = doc_id
+                        # Child chunks that matched, for trimming the parent to its relevant part
+                        d.metadata["matched_spans"] = spans.get(doc_id, [])
                         final_docs.append(d)
-                except Exception as e:
-                    print(f"Error processing doc: {e}")
+                    except Exception as e:
+                        print(f"Error processing doc: {e}")
+        if rerank and len(final_docs) > self.k:
+            # 4. Cross-encoder picks the best k of the over-fetched candidates
+            with tracing.span("query.rerank", candidates=len(final_docs)):
+                final_docs = self.reranker.rerank(query, final_docs, self.k)
         return final_docs
 
 class RAGEngine:
-    def __init__(self):
-        self.db_path = Config.CHROMA_PATH
+    def __init__(self, db_path=None, embed_device=None):
+        self.db_path = db_path or Config.CHROMA_PATH
+        self.embed_device = embed_device  # None: Config.get_base_embeddings picks by MODE
         self.store_path = os.path.join(self.db_path, "doc_store")
         self._embeddings = None
         self._vectorstore = None
         self._retriever = None
         self._store = None
         self._child_splitter = None
+        self._manifest = None
+        self._lexical_index = None
+        self._article_index = None
+        self._law_router = None
+        self._reranker = None
+        self._context_packer = None
+        self._llm = None
+        self._llm_settings = None
+        self._prompt = None
+        self.last_trace = None  # Stage breakdown of the latest answer (tracing.Trace.breakdown())
+        self._answer_cache = None
+        # One sync at a time (upload, re-index button, watcher); queries keep running
+        self._sync_lock = threading.RLock()
+        self._loaded_stamp = self._index_stamp()
 
     @property
     def embeddings(self):
         if self._embeddings is None:
-            self._embeddings = Config.get_embeddings()
+            self._embeddings = Config.get_embeddings(device=self.embed_device)
         return self._embeddings
 
+    def embedding_stats(self):
+        """
+        Metrics of every embedding wrapper layer (cache, batcher), keyed by class name.
+        """
+        stats = {}
+        layer = self._embeddings
+        while layer is not None:
+            if hasattr(layer, "stats"):
+                stats[type(layer).__name__] = layer.stats()
+            layer = getattr(layer, "inner", None)
+        return stats
+
+    def warm_up(self, timer=None):
+        """
+        Loads everything the first question needs, one timed phase each
+        (see startup.py). Safe to call again: loaded parts are skipped.
+        """
+        from startup import StartupTimer
+        timer = timer or StartupTimer()
+        with timer.phase("embeddings"):
+            self.embeddings
+        with timer.phase("embed_probe"):
+            # First forward pass allocates buffers; run it on the bare model so the
+            # embedding cache cannot short-circuit it
+            model = self.embeddings
+            while getattr(model, "inner", None) is not None:
+                model = model.inner
+            model.embed_query("تهيئة")
+        with timer.phase("vectorstore"):
+            self.vectorstore
+        with timer.phase("docstore"):
+            self.store
+        with timer.phase("indexes"):
+            self.lexical_index
+            self.article_index
+            self.retriever
+        if self.reranker is not None:
+            with timer.phase("reranker"):
+                self.reranker.warm_up()
+        with timer.phase("answer_cache"):
+            self.answer_cache
+        with timer.phase("llm_client"):
+            self.llm
+            self.prompt
+        return timer
+
     @property
     def vectorstore(self):
         if self._vectorstore is None:
@@ -100,15 +475,28 @@ class RAGEngine:
                 # 1. Vector Database
                 # The folder structure is:
                 # Root/
-                #   chroma_vectors/ (Actual DB)
-                #   docstore.pkl    (Docs)
+                #   chroma_vectors/  (Actual DB)
+                #   docstore.sqlite  (Docs)
+                #   manifest.json    (Per-file ids/hashes)
+                # HNSW parameters only apply to collections created from here on
                 vector_path = os.path.join(self.db_path, "chroma_vectors")
-                
-                self._vectorstore = Chroma(
-                    collection_name="saudi_legal_docs",
-                    embedding_function=self.embeddings,
-                    persist_directory=vector_path
-                )
+                if Config.vector_layout() == "subject":
+                    from vector_shards import ShardedChroma
+                    self._vectorstore = ShardedChroma(
+                        Config.VECTOR_COLLECTION,
+                        embedding_function=self.embeddings,
+                        persist_directory=vector_path,
+                        collection_metadata=Config.hnsw_metadata(),
+                        threads=Config.VECTOR_SHARD_THREADS,
+                    )
+                else:
+                    from langchain_chroma import Chroma
+                    self._vectorstore = Chroma(
+                        collection_name=Config.VECTOR_COLLECTION,
+                        embedding_function=self.embeddings,
+                        persist_directory=vector_path,
+                        collection_metadata=Config.hnsw_metadata(),
+                    )
             except Exception as e:
                 print(f"❌ Error loading ChromaDB: {e}")
                 raise e
@@ -117,19 +505,9 @@ class RAGEngine:
     @property
     def store(self):
         if self._store is None:
-             # 2. Doc Store (Pickled InMemoryStore)
-            pkl_path = os.path.join(self.db_path, "docstore.pkl")
-            if os.path.exists(pkl_path):
-                try:
-                    with open(pkl_path, "rb") as f:
-                        self._store = pickle.load(f)
-                    print(f"✅ Loaded DocStore from {pkl_path}")
-                except Exception as e:
-                    print(f"❌ Error loading DocStore pickle: {e}")
-                    self._store = None 
-            else:
-                print(f"⚠️ DocStore pickle not found at {pkl_path}. Creating new empty store.")
-                self._store = InMemoryStore()
+            # 2. Doc Store (SQLite, random access; migrates a legacy docstore.pkl once)
+            self._store = open_docstore(self.db_path)
+            print(f"✅ Opened DocStore at {self._store.path}")
         return self._store
 
     @property
@@ -144,34 +522,271 @@ class RAGEngine:
     @property
     def retriever(self):
         if self._retriever is None:
+             if self.manifest.embedding_changed(Config.embedding_fingerprint()):
+                 print(f"⚠️ Index was embedded with {self.manifest.embedding}, but the current backend is "
+                       f"{Config.embedding_fingerprint()}. Run a re-index to re-embed it.")
+             if self.manifest.layout_changed(Config.vector_layout()):
+                 print(f"⚠️ Index uses the '{self.manifest.layout}' vector layout, but VECTOR_SHARDING selects "
+                       f"'{Config.vector_layout()}'. Run a re-index to move the vectors.")
+             if self.manifest.text_changed(NORMALIZATION):
+                 print(f"⚠️ Index text was prepared as '{self.manifest.text}', this version expects '{NORMALIZATION}'. "
+                       f"Run a re-index to re-extract it.")
              # 4. Retriever (Using Polyfill Class)
              self._retriever = ParentDocumentRetriever(
                 vectorstore=self.vectorstore,
                 docstore=self.store,
                 child_splitter=self.child_splitter,
+                lexical_index=self.lexical_index,
+                hybrid=Config.HYBRID_SEARCH,
+                article_index=self.article_index,
+                article_lookup=Config.ARTICLE_LOOKUP,
+                k=Config.RETRIEVAL_K,
+                fetch_k=Config.RETRIEVAL_FETCH_K,
+                write_batch_size=Config.VECTOR_WRITE_BATCH,
+                reranker=self.reranker,
+                rerank_candidates=Config.RERANK_CANDIDATES,
             )
         return self._retriever
 
+    @property
+    def lexical_index(self):
+        if self._lexical_index is None:
+            # 3. Sparse index, persisted next to chroma_vectors
+            index = LexicalIndex(os.path.join(self.db_path, LEXICAL_INDEX_NAME))
+            if not len(index):
+                self._backfill_lexical_index(index)
+            self._lexical_index = index
+        return self._lexical_index
+
+    def _backfill_lexical_index(self, index, page_size=5000):
+        """
+        Builds the lexical index from the children already in Chroma (DBs created
+        before the index existed).
+        """
+        offset = 0
+        while True:
+            batch = self.vectorstore.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not batch["ids"]:
+                break
+            index.add(batch["ids"], [m.get("doc_id") for m in batch["metadatas"]], batch["documents"])
+            offset += len(batch["ids"])
+        if offset:
+            print(f"✅ Built lexical index from {offset} existing chunks.")
+            index.save()
+
+    @property
+    def article_index(self):
+        if self._article_index is None:
+            index = ArticleIndex(os.path.join(self.db_path, ARTICLE_INDEX_NAME))
+            if not len(index) and len(self.store):
+                # DBs created before the index existed: rebuild from the parents
+                keys = list(self.store.yield_keys())
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    pairs = [(k, d) for k, d in zip(chunk, self.store.mget(chunk)) if d is not None]
+                    index.add([k for k, _ in pairs], [d for _, d in pairs])
+                index.save()
+                print(f"✅ Built article index from {len(keys)} existing sections.")
+            self._article_index = index
+        return self._article_index
+
+    @property
+    def reranker(self):
+        if self._reranker is None and Config.RERANK:
+            from reranker import CrossEncoderReranker
+            self._reranker = CrossEncoderReranker(
+                Config.RERANK_MODEL,
+                budget_ms=Config.RERANK_BUDGET_MS,
+                batch_size=Config.RERANK_BATCH_SIZE,
+                max_length=Config.RERANK_MAX_LENGTH,
+            )
+        return self._reranker
+
+    @property
+    def law_router(self):
+        if self._law_router is None:
+            router = LawRouter(os.path.join(self.db_path, ROUTER_NAME))
+            router.refresh(self.manifest, self.vectorstore)
+            router.save()
+            self._law_router = router
+        return self._law_router
+
+    def subjects(self):
+        """
+        [{"source", "subject"}] of every indexed law, for filter pickers.
+        """
+        return [{"source": name, "subject": subject_of(name)} for name in self._indexed_sources()]
+
+    def _indexed_sources(self):
+        # Empty / unreadable files stay in the manifest (so they are not re-read) with no parents
+        return [name for name, entry in sorted(self.manifest.entries.items()) if entry["parent_ids"]]
+
+    def resolve_scope(self, subjects=None, sources=None):
+        """
+        Source names selected by subject and/or file name (None: no filter).
+        """
+        if not subjects and not sources:
+            return None
+        subjects, sources = set(subjects or ()), set(sources or ())
+        return [name for name in self._indexed_sources()
+                if name in sources or subject_of(name) in subjects]
+
+    def _scope_filter(self, scope):
+        """
+        Retriever kwargs for a list of sources: a Chroma `where` clause, pushed
+        into the vector search, and the matching parent ids for the other indexes.
+        """
+        if scope is None:
+            return {}
+        where = {"source": scope[0]} if len(scope) == 1 else {"source": {"$in": list(scope)}}
+        parent_ids = set()
+        for name in scope:
+            parent_ids.update(self.manifest.entries[name]["parent_ids"])
+        return {"where": where, "parent_ids": parent_ids}
+
+    @property
+    def answer_cache(self):
+        if self._answer_cache is None and Config.ANSWER_CACHE:
+            self._answer_cache = AnswerCache(
+                self.db_path,
+                threshold=Config.ANSWER_CACHE_THRESHOLD,
+                ttl=Config.ANSWER_CACHE_TTL_HOURS * 3600,
+                max_entries=Config.ANSWER_CACHE_MAX_ENTRIES,
+            )
+        return self._answer_cache
+
+    def _index_stamp(self):
+        # The manifest is saved last by every sync, so its mtime marks index updates
+        try:
+            return os.stat(os.path.join(self.db_path, MANIFEST_NAME)).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh_if_stale(self):
+        """
+        Picks up index changes written by another process (watcher daemon,
+        ingest.py): reloads the manifest, lexical/article indexes and reopens
+        this engine's vector store. One stat() when nothing changed.
+        """
+        if self._index_stamp() == self._loaded_stamp:
+            return False
+        with self._sync_lock:
+            stamp = self._index_stamp()
+            if stamp == self._loaded_stamp:
+                return False
+            print("🔄 Index changed on disk, reloading...")
+            self._manifest = None
+            self._lexical_index = None
+            self._article_index = None
+            self._law_router = None
+            self._retriever = None
+            if self._vectorstore is not None:
+                self._reopen_vectorstore()
+            if self._answer_cache is not None:
+                self._answer_cache.reload()
+            self._loaded_stamp = stamp
+        return True
+
+    def _reopen_vectorstore(self):
+        """
+        Swaps in a new vector store handle that re-reads the segments on disk.
+        Chroma keeps one in-memory system per path while any client holds it, so
+        this engine's client is released first; other clients in the process
+        (other engines, other paths) are left alone. Called under _sync_lock.
+        """
+        store, self._vectorstore = self._vectorstore, None
+        with contextlib.suppress(Exception):
+            if hasattr(store, "close"):
+                store.close()
+            else:
+                store._client.close()
+        self.vectorstore
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            self._manifest = Manifest(self.db_path)
+        return self._manifest
+
+    def _forget_source(self, name):
+        """
+        Removes everything a source file previously contributed.
+        Files unknown to the manifest (older DBs, or a crash before the manifest
+        was saved) are purged from the vectorstore by their `source` metadata.
+        """
+        entry = self.manifest.remove(name)
+        if entry:
+            self.retriever.delete_documents(entry["parent_ids"], entry["child_ids"])
+        else:
+            self.vectorstore.delete(where={"source": name})
+            self.store.delete_source(name)
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate_source(name)
+
+    def _drop_other_layout(self, layout):
+        """
+        Deletes the Chroma collection(s) of the previous vector layout; every
+        file is re-indexed into the new one right after.
+        """
+        client = getattr(self.vectorstore, "_client", None)
+        if client is None:
+            return
+        for collection in client.list_collections():
+            name = getattr(collection, "name", collection)
+            single = name == Config.VECTOR_COLLECTION
+            shard = name.startswith(Config.VECTOR_COLLECTION + "__")
+            if (layout == "subject" and single) or (layout == "single" and shard):
+                client.delete_collection(name)
+                print(f"   🗑️ Dropped collection {name}")
+
+    def sync(self, files, removed=(), jobs=None, **pipeline_opts):
+        """
+        Incremental re-index: drops the vectors/parents of `removed` names and of
+        changed `files`, embeds `files` through the pipeline, then saves the
+        manifest. DocStore writes are committed as they happen.
+        """
+        with self._sync_lock:
+            return self._sync(files, removed, jobs=jobs, **pipeline_opts)
+
+    def _sync(self, files, removed, jobs=None, **pipeline_opts):
+        for name in removed:
+            print(f"   🗑️ Removing {name} from the index...")
+            self._forget_source(name)
+        for path in files:
+            self._forget_source(os.path.basename(path))
+
+        def record(path, parent_ids, child_ids):
+            self.manifest.record(path, parent_ids, child_ids)
+
+        try:
+            stats = run_pipeline(files, self.retriever, jobs=jobs, on_file_done=record, **pipeline_opts) if files else None
+        finally:
+            # Also after a failed run: the files already purged must not stay listed as indexed
+            if self.manifest.embedding is None:
+                self.manifest.embedding = Config.embedding_fingerprint()
+            if self.manifest.layout is None:
+                self.manifest.layout = Config.vector_layout()
+            if self.manifest.text is None:
+                self.manifest.text = NORMALIZATION
+            self.lexical_index.save()
+            self.article_index.save()
+            self.manifest.save()
+        if Config.LAW_ROUTER or self._law_router is not None:
+            self.law_router.refresh(self.manifest, self.vectorstore)
+            self.law_router.save()
+        self._loaded_stamp = self._index_stamp()
+        if files and hasattr(self.embeddings, "report"):
+            self.embeddings.report()
+        return stats
+
     def ingest_file(self, file_path):
         try:
-            # Lazy import from ingest.py to reuse logic
-            from ingest import load_file
-            
             print(f"Processing {file_path}...")
-            docs = load_file(file_path)
+            stats = self.sync([file_path], jobs=1)
             
-            if not docs:
+            if not stats.sections:
                 print(f"⚠️ Processed file {file_path} resulted in 0 documents.")
                 return False
-                
-            # Add to Retriever
-            self.retriever.add_documents(docs)
-            
-            # Persist DocStore
-            pkl_path = os.path.join(self.db_path, "docstore.pkl")
-            with open(pkl_path, "wb") as f:
-                pickle.dump(self.store, f)
-            print(f"✅ DocStore saved to {pkl_path}")
             
             return True
         except Exception as e:
@@ -180,48 +795,258 @@ class RAGEngine:
             traceback.print_exc()
             return False
 
-    def ingest_all_data(self):
+    def ingest_all_data(self, jobs=None, data_path=None, **pipeline_opts):
         """
-        Iterates over all files in the data folder and ingests them.
+        Brings the index in line with the data folder: new/changed files are
+        embedded through the staged pipeline, deleted files are removed and
+        unchanged files are skipped.
         """
-        if not os.path.exists(Config.DATA_PATH):
-            print(f"⚠️ Data path {Config.DATA_PATH} does not exist.")
+        data_path = data_path or Config.DATA_PATH
+        if not os.path.exists(data_path):
+            print(f"⚠️ Data path {data_path} does not exist.")
             return
 
-        print(f"🔄 Starting Re-Index of folder: {Config.DATA_PATH}")
-        files = os.listdir(Config.DATA_PATH)
-        for f in files:
-            file_path = os.path.join(Config.DATA_PATH, f)
-            if os.path.isfile(file_path):
-                self.ingest_file(file_path)
+        with self._sync_lock:
+            print(f"🔄 Starting Re-Index of folder: {data_path}")
+            files = list_data_files(data_path)
+            fingerprint = Config.embedding_fingerprint()
+            if self.manifest.embedding_changed(fingerprint):
+                print(f"   🔁 Embedding backend changed ({self.manifest.embedding} -> {fingerprint}): re-embedding everything.")
+                if self.answer_cache is not None:
+                    self.answer_cache.clear()
+            layout = Config.vector_layout()
+            if self.manifest.layout_changed(layout):
+                print(f"   🔁 Vector layout changed ({self.manifest.layout} -> {layout}): re-indexing everything.")
+                self._drop_other_layout(layout)
+            if self.manifest.text_changed(NORMALIZATION):
+                print(f"   🔁 Text normalization changed ({self.manifest.text} -> {NORMALIZATION}): re-indexing everything.")
+                if self.answer_cache is not None:
+                    self.answer_cache.clear()
+            to_index, removed = self.manifest.plan(files, embedding=fingerprint, layout=layout, text=NORMALIZATION)
+            print(f"   📋 {len(to_index)} new/changed, {len(removed)} removed, "
+                  f"{len(files) - len(to_index)} unchanged.")
+            stats = self.sync(to_index, removed, jobs=jobs, **pipeline_opts)
+            self.manifest.embedding = fingerprint
+            self.manifest.layout = layout
+            self.manifest.text = NORMALIZATION
+            self.manifest.save()
+            self._loaded_stamp = self._index_stamp()
         print("✅ Re-Index Complete.")
+        return stats
 
-    def get_qa_chain(self):
-        llm = Config.get_llm()
-        
-        template = """
-        You are a strict technical translator.
-        
-        **INPUT DATA:**
-        Context: {context}
-        User Question: {question}
-        
-        **INSTRUCTIONS:**
-        1. You must answer ONLY using the "Context" provided above.
-        2. **IF CONTEXT IS ENGLISH:** You must TRANSLATE it into Arabic sentence-by-sentence.
-        3. **DO NOT SUMMARIZE.** Do not change the list structure. If the source has (A, B, C, D, E, F), your answer MUST have (A, B, C, D, E, F).
-        4. **BAN:** Do not use the word "доходات" or any non-Arabic words.
-        5. **CITATION:** You must cite the source file at the end.
-        
-        **ANSWER (ARABIC):**
+    @property
+    def llm(self):
         """
-        
-        prompt = PromptTemplate.from_template(template)
-        
-        return RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=self.retriever,
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": prompt}
-        )
\ No newline at end of file
+        Long-lived LLM client (pooled keep-alive HTTP session to Ollama).
+        Rebuilt only when the model/URL config changes.
+        """
+        settings = Config.llm_settings()
+        if self._llm is None or settings != self._llm_settings:
+            self._llm = Config.get_llm()
+            self._llm_settings = settings
+        return self._llm
+
+    @property
+    def prompt(self):
+        if self._prompt is None:
+            self._prompt = PromptTemplate.from_template(QA_TEMPLATE)
+        return self._prompt
+
+    def _retrieve_with_cache(self, query, subjects=None, sources=None, route=None):
+        """
+        Retrieval plus semantic cache probe.
+        subjects / sources -- restrict the search to these laws
+        route              -- without an explicit filter, let the law router pick
+                              the likely laws (default: Config.LAW_ROUTER)
+        Returns (docs, query_vector, cached_entry_or_None, scope), where scope is
+        the list of searched sources (None: all). Citation queries answered from
+        the article index are never embedded: they skip routing (the law is
+        named) and the answer cache (query_vector is None, so nothing is stored).
+        """
+        self.refresh_if_stale()
+        cache = self.answer_cache
+        scope = self.resolve_scope(subjects, sources)
+        filters = self._scope_filter(scope)
+        articles = self.retriever.article_ids(query, filters.get("parent_ids"))
+        if articles:
+            return self.retriever.invoke(query, articles=articles, **filters), None, None, scope
+
+        route = Config.LAW_ROUTER if route is None else route
+        routed = scope is None and route
+        # The embedder normalizes the query like the indexed chunks; the prompt keeps the original
+        vector = None
+        if cache is not None or routed:
+            with tracing.span("query.embed"):
+                vector = self.embeddings.embed_query(query)
+        if routed:
+            with tracing.span("query.route"):
+                scope = self.law_router.route(vector, top_n=Config.ROUTER_TOP_N, margin=Config.ROUTER_MARGIN)
+            if scope:
+                print(f"🧭 Routed to: {', '.join(scope)}")
+                filters = self._scope_filter(scope)
+        # Reuse the cache/router embedding for the vector search; the article lookup already missed
+        docs = self.retriever.invoke(query, vector=vector, articles=[], **filters)
+        if cache is None:
+            return docs, None, None, scope
+        parent_ids = [d.metadata.get(self.retriever.id_key) for d in docs]
+        with tracing.span("query.cache_lookup"):
+            hit = cache.lookup(vector, parent_ids)
+        if hit:
+            tracing.count("query.cache_hits")
+        return docs, vector, hit, scope
+
+    def _remember(self, query, vector, docs, answer):
+        if self.answer_cache is not None and vector is not None:
+            parent_ids = [d.metadata.get(self.retriever.id_key) for d in docs]
+            self.answer_cache.put(query, vector, parent_ids, answer, docs)
+
+    @property
+    def context_packer(self):
+        if self._context_packer is None and Config.CONTEXT_PACKING:
+            from context_packer import ContextPacker, TokenCounter
+            self._context_packer = ContextPacker(
+                TokenCounter(Config.CONTEXT_TOKENIZER),
+                max_tokens=Config.CONTEXT_MAX_TOKENS,
+                doc_max_tokens=Config.CONTEXT_DOC_MAX_TOKENS,
+            )
+        return self._context_packer
+
+    def _build_prompt(self, query, docs):
+        """
+        The "stuff" prompt: parents joined by blank lines, packed to the token
+        budget first (see context_packer.py). Returns (prompt, packing stats or None).
+        """
+        packer = self.context_packer
+        stats = None
+        if packer is not None:
+            with tracing.span("query.pack"):
+                docs, stats = packer.pack(query, docs)
+            print(f"🧾 Context: {stats['docs_in']} -> {stats['docs_out']} parents, "
+                  f"{stats['tokens_in']} -> {stats['tokens']} tokens "
+                  f"({stats['trimmed']} trimmed, {stats['duplicates']} duplicate sentences)")
+        context = "\n\n".join(d.page_content for d in docs)
+        return self.prompt.format(context=context, question=query), stats
+
+    def _log_prompt(self, stats, usage):
+        """
+        Logs prompt size and prefill time. `usage` is the LLM's response metadata
+        (Ollama reports prompt_eval_count / prompt_eval_duration in ns).
+        Returns the fields added to the "done" event.
+        """
+        info = {"prompt_tokens": (stats or {}).get("tokens"), "prefill": None}
+        if usage and usage.get("prompt_eval_count") is not None:
+            info["prompt_tokens"] = usage["prompt_eval_count"]
+        if usage and usage.get("prompt_eval_duration") is not None:
+            info["prefill"] = usage["prompt_eval_duration"] / 1e9
+        if info["prompt_tokens"] is not None:
+            prefill = f", prefill {info['prefill']:.2f}s" if info["prefill"] is not None else ""
+            print(f"🧾 Prompt: {info['prompt_tokens']} tokens{prefill}")
+        return info
+
+    def answer(self, query, subjects=None, sources=None, route=None):
+        """
+        Retrieval (answer cache first), the packed "stuff" prompt and one LLM
+        call. Returns {"query", "result", "source_documents"} plus "cached",
+        "scope" (searched sources, None for all), "trace" (stage breakdown, see
+        tracing.py) and the prompt size / prefill time when known.
+        Filters as in _retrieve_with_cache().
+        """
+        start = time.perf_counter()
+        with tracing.collect() as trace:
+            docs, vector, hit, scope = self._retrieve_with_cache(query, subjects, sources, route)
+            run = _Answer(self, start)
+            if hit:
+                answer, done = hit["answer"], run.cached(hit, trace)
+            else:
+                prompt = run.prompt(query, docs)
+                with tracing.span("query.generate"):
+                    run.feed(self.llm.invoke(prompt))
+                run.flush()
+                answer, done = run.text, run.done(trace)
+                self._remember(query, vector, docs, answer)
+        self.last_trace = done["trace"]
+        usage = {k: done[k] for k in ("prompt_tokens", "prefill") if k in done}
+        return {"query": query, "result": answer, "source_documents": docs, "cached": done["cached"],
+                "scope": scope, "trace": self.last_trace, **usage}
+
+    def stream_answer(self, query, subjects=None, sources=None, route=None):
+        """
+        Streaming counterpart of answer(). Yields events:
+          {"type": "sources", "documents": [...], "scope": [...]}
+                                                    once, right after retrieval
+          {"type": "token", "text": "..."}          LLM output, <think> blocks removed
+          {"type": "done", "ttft": s, "total": s, "overhead": s, "cached": bool,
+           "prompt_tokens": n, "prefill": s, "trace": [...]}
+              time-to-first-token, total, setup time before retrieval, the
+              prompt size / LLM prefill time (None when unknown) and the stage
+              breakdown (tracing.Trace.breakdown())
+        A semantic-cache hit yields the whole stored answer as one token.
+        """
+        with tracing.collect() as trace:
+            yield from self._stream_answer(trace, query, subjects, sources, route)
+
+    def _stream_answer(self, trace, query, subjects, sources, route):
+        start = time.perf_counter()
+        llm = self.llm
+        run = _Answer(self, start, overhead=time.perf_counter() - start)
+        docs, vector, hit, scope = self._retrieve_with_cache(query, subjects, sources, route)
+        yield {"type": "sources", "documents": docs, "scope": scope}
+
+        if hit:
+            yield {"type": "token", "text": hit["answer"]}
+            done = run.cached(hit, trace)
+        else:
+            prompt = run.prompt(query, docs)
+            # Times the model only, not the consumer rendering tokens between chunks
+            stream = tracing.IterTimer(llm.stream(prompt))
+            for chunk in stream:
+                text = run.feed(chunk)
+                if text:
+                    yield {"type": "token", "text": text}
+            tail = run.flush()
+            if tail:
+                yield {"type": "token", "text": tail}
+            done = run.done(trace, generate=stream.seconds)
+            self._remember(query, vector, docs, run.text)
+        self.last_trace = done["trace"]
+        yield done
+
+    async def astream_answer(self, query, llm_slots=None, subjects=None, sources=None, route=None):
+        """
+        Async stream_answer() for the query service. Retrieval runs in a worker
+        thread; generation uses the LLM's native async stream. `llm_slots`
+        (an asyncio.Semaphore) caps concurrent generations; cache hits skip it.
+        """
+        with tracing.collect() as trace:
+            async for event in self._astream_answer(trace, query, llm_slots, subjects, sources, route):
+                yield event
+
+    async def _astream_answer(self, trace, query, llm_slots, subjects, sources, route):
+        start = time.perf_counter()
+        llm = self.llm
+        run = _Answer(self, start, overhead=time.perf_counter() - start)
+        # to_thread copies the context, so the thread's spans land in `trace`
+        docs, vector, hit, scope = await asyncio.to_thread(
+            self._retrieve_with_cache, query, subjects, sources, route)
+        yield {"type": "sources", "documents": docs, "scope": scope}
+
+        if hit:
+            yield {"type": "token", "text": hit["answer"]}
+            yield run.cached(hit, trace)
+            return
+
+        prompt = await asyncio.to_thread(run.prompt, query, docs)
+        async with (llm_slots or contextlib.nullcontext()):
+            # Wall time once a slot is free (includes the client writing each token)
+            generate_start = time.perf_counter()
+            async for chunk in llm.astream(prompt):
+                text = run.feed(chunk)
+                if text:
+                    yield {"type": "token", "text": text}
+            generate = time.perf_counter() - generate_start
+        tail = run.flush()
+        if tail:
+            yield {"type": "token", "text": tail}
+        done = run.done(trace, generate=generate)
+        await asyncio.to_thread(self._remember, query, vector, docs, run.text)
+        yield done
@@ -0,0 +1,70 @@
+import time
+from typing import List
+from langchain_core.documents import Document
+
+# --- CROSS-ENCODER RERANKING ---
+# The retriever over-fetches RERANK_CANDIDATES parents (fused dense + BM25
+# order); a multilingual cross-encoder scores each (question, parent) pair in
+# small CPU batches and only the best `top_n` reach the prompt. Scoring stops
+# when the next batch would overrun RERANK_BUDGET_MS; the candidates then keep
+# their retrieval order, so a slow machine degrades to plain retrieval instead
+# of a slow answer. sentence-transformers is imported on first use.
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name, budget_ms=800, batch_size=8, max_length=512, max_chars=2000, device="cpu"):
+        self.model_name = model_name
+        self.budget = budget_ms / 1000.0
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.max_chars = max_chars  # Parents can be whole articles; the model only reads max_length tokens
+        self.device = device
+        self.last = None            # Outcome of the latest rerank(), for logs and the UI
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            print(f"🎯 Loading reranker {self.model_name}...")
+            self._model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+        return self._model
+
+    def warm_up(self):
+        self.model.predict([("تهيئة", "تهيئة")])
+
+    def rerank(self, query: str, documents: List[Document], top_n: int) -> List[Document]:
+        """
+        Returns the `top_n` documents by cross-encoder score, best first. Falls
+        back to the incoming order when the time budget runs out.
+        """
+        start = time.perf_counter()
+        if len(documents) <= 1:
+            self.last = {"reranked": False, "candidates": len(documents), "seconds": 0.0}
+            return documents[:top_n]
+
+        model = self.model
+        pairs = [(query, d.page_content[:self.max_chars]) for d in documents]
+        scores = []
+        batch_seconds = 0.0
+        for i in range(0, len(pairs), self.batch_size):
+            elapsed = time.perf_counter() - start
+            if elapsed + batch_seconds > self.budget:
+                self.last = {"reranked": False, "candidates": len(documents), "scored": len(scores),
+                             "seconds": elapsed}
+                print(f"⏱️ Rerank budget ({self.budget * 1000:.0f}ms) exhausted after {len(scores)}/"
+                      f"{len(pairs)} candidates; keeping retrieval order.")
+                return documents[:top_n]
+            batch_start = time.perf_counter()
+            scores.extend(float(s) for s in model.predict(pairs[i:i + self.batch_size],
+                                                          batch_size=self.batch_size, show_progress_bar=False))
+            batch_seconds = max(batch_seconds, time.perf_counter() - batch_start)
+
+        # Stable sort: ties keep retrieval order
+        order = sorted(range(len(documents)), key=lambda n: -scores[n])[:top_n]
+        seconds = time.perf_counter() - start
+        self.last = {"reranked": True, "candidates": len(documents), "scored": len(scores), "seconds": seconds}
+        print(f"🎯 Reranked {len(documents)} -> {len(order)} in {seconds * 1000:.0f}ms")
+        for n in order:
+            documents[n].metadata["rerank_score"] = round(scores[n], 4)
+        return [documents[n] for n in order]
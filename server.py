@@ -0,0 +1,239 @@
+import os
+import json
+import asyncio
+import argparse
+from aiohttp import web
+from config import Config
+from rag_engine import RAGEngine
+from startup import Warmup
+from watcher import FolderWatcher
+import tracing
+
+# --- ASYNC QUERY SERVICE ---
+# One RAGEngine (one embedding model, one vector store) shared by all requests.
+#   POST /query         {"query": "..."}  -> {"answer", "sources", "scope", "cached", "timings", "prompt_tokens", "trace"}
+#   POST /query/stream  {"query": "..."}  -> NDJSON events: sources, token..., done
+#                       Optional in both: "subjects" / "sources" (lists) restrict the
+#                       search to those laws; "route": true/false toggles the law router
+#   GET  /subjects      indexed laws, for building filters
+#   POST /ingest        {"path": "data/x.pdf"} or multipart upload (field "file")
+#   GET  /health        status ("warming" until the model is loaded), startup timings
+#                       + embedding cache/batcher metrics
+#   GET  /metrics       stage timings and counters, Prometheus text format (see tracing.py)
+# Try it offline with LLM_BACKEND=stub. --watch also ingests changes to the data
+# folder as they happen (see watcher.py).
+
+ENGINE = web.AppKey("engine", RAGEngine)
+LLM_SLOTS = web.AppKey("llm_slots", asyncio.Semaphore)
+INGEST_LOCK = web.AppKey("ingest_lock", asyncio.Lock)
+WARMUP = web.AppKey("warmup", Warmup)
+WATCHER = web.AppKey("watcher", FolderWatcher)
+
+
+def serialize_sources(docs):
+    return [
+        {
+            "doc_id": d.metadata.get("doc_id"),
+            "source": d.metadata.get("source"),
+            "subject": d.metadata.get("subject"),
+            "article": d.metadata.get("article"),
+            "preview": d.page_content[:300],
+        }
+        for d in docs
+    ]
+
+
+def encode_event(event):
+    if event["type"] == "sources":
+        event = {"type": "sources", "sources": serialize_sources(event["documents"]), "scope": event.get("scope")}
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def engine_ready(request):
+    # Requests that need the engine wait for a background warm-up instead of
+    # racing it to load the same model and indexes; /health does not wait
+    warmup = request.app[WARMUP]
+    if warmup.state == "warming":
+        await asyncio.to_thread(warmup.wait)
+    return request.app[ENGINE]
+
+
+async def read_query(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Body must be JSON: {\"query\": \"...\"}")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Body must be a JSON object: {\"query\": \"...\"}")
+    query = body.get("query")
+    query = query.strip() if isinstance(query, str) else ""
+    if not query:
+        raise web.HTTPBadRequest(text="Missing 'query'")
+    route = body.get("route")
+    if route is not None and not isinstance(route, bool):
+        raise web.HTTPBadRequest(text="'route' must be true or false")
+    filters = {"subjects": body.get("subjects"), "sources": body.get("sources"), "route": route}
+    indexed = (await engine_ready(request)).subjects()
+    for key, field in (("subjects", "subject"), ("sources", "source")):
+        value = filters[key]
+        if isinstance(value, str):
+            value = filters[key] = [value]
+        if value is None:
+            continue
+        if not isinstance(value, list):
+            raise web.HTTPBadRequest(text=f"'{key}' must be a list of names")
+        known = {s[field] for s in indexed}
+        unknown = [v for v in value if v not in known]
+        if unknown:
+            raise web.HTTPBadRequest(text=f"Unknown {key}: {', '.join(map(str, unknown))}")
+    return query, filters
+
+
+async def handle_query(request):
+    query, filters = await read_query(request)
+    engine = request.app[ENGINE]
+    parts, sources, scope, done = [], [], None, {}
+    async for event in engine.astream_answer(query, llm_slots=request.app[LLM_SLOTS], **filters):
+        if event["type"] == "sources":
+            sources = serialize_sources(event["documents"])
+            scope = event.get("scope")
+        elif event["type"] == "token":
+            parts.append(event["text"])
+        elif event["type"] == "done":
+            done = event
+    return web.json_response({
+        "query": query,
+        "answer": "".join(parts).strip(),
+        "sources": sources,
+        "scope": scope,
+        "cached": done.get("cached", False),
+        "timings": {k: done[k] for k in ("ttft", "total", "overhead", "prefill") if k in done},
+        "prompt_tokens": done.get("prompt_tokens"),
+        "trace": done.get("trace"),
+    }, dumps=lambda o: json.dumps(o, ensure_ascii=False))
+
+
+async def handle_query_stream(request):
+    query, filters = await read_query(request)
+    engine = request.app[ENGINE]
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson; charset=utf-8"})
+    await response.prepare(request)
+    async for event in engine.astream_answer(query, llm_slots=request.app[LLM_SLOTS], **filters):
+        await response.write(encode_event(event))
+    await response.write_eof()
+    return response
+
+
+def data_file_path(path):
+    """
+    `path` resolved (symlinks included); 400 unless it lies inside Config.DATA_PATH.
+    """
+    root = os.path.realpath(Config.DATA_PATH)
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([root, resolved]) != root or resolved == root:
+        raise web.HTTPBadRequest(text=f"Path must be inside {Config.DATA_PATH}: {path}")
+    return resolved
+
+
+async def handle_ingest(request):
+    engine = await engine_ready(request)
+    if request.content_type.startswith("multipart/"):
+        reader = await request.multipart()
+        field = await reader.next()
+        if field is None or field.name != "file" or not field.filename:
+            raise web.HTTPBadRequest(text="Expected a multipart field 'file'")
+        os.makedirs(Config.DATA_PATH, exist_ok=True)
+        path = data_file_path(os.path.join(Config.DATA_PATH, os.path.basename(field.filename)))
+        with open(path, "wb") as f:
+            while chunk := await field.read_chunk():
+                f.write(chunk)
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="Body must be JSON: {\"path\": \"...\"}")
+        path = body.get("path") if isinstance(body, dict) else None
+        if not path or not isinstance(path, str):
+            raise web.HTTPBadRequest(text="Missing 'path'")
+        path = data_file_path(path)
+        if not os.path.isfile(path):
+            raise web.HTTPNotFound(text=f"No such file: {path}")
+
+    # One ingest at a time; queries keep being served meanwhile
+    async with request.app[INGEST_LOCK]:
+        ok = await asyncio.to_thread(engine.ingest_file, path)
+    return web.json_response({"ok": ok, "path": path}, status=200 if ok else 422)
+
+
+async def handle_subjects(request):
+    engine = await engine_ready(request)
+    return web.json_response({"subjects": engine.subjects()},
+                             dumps=lambda o: json.dumps(o, ensure_ascii=False))
+
+
+async def handle_health(request):
+    warmup = request.app[WARMUP]
+    return web.json_response({
+        "status": "warming" if warmup.state == "warming" else "ok",
+        "mode": Config.MODE,
+        "startup": warmup.status(),
+        "watcher": request.app[WATCHER].status() if request.app.get(WATCHER) else None,
+        "embeddings": request.app[ENGINE].embedding_stats(),
+    })
+
+
+async def handle_metrics(request):
+    return web.Response(text=tracing.render_metrics(),
+                        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+async def warm_up(app):
+    # Load the model, vector store and indexes before the first request arrives.
+    # In the background by default, so /health answers ("warming") meanwhile
+    if Config.WARMUP == "blocking":
+        await asyncio.to_thread(app[WARMUP].run)
+    elif Config.WARMUP != "off":
+        app[WARMUP].start()
+
+
+async def start_watcher(app):
+    # The initial catch-up sync runs in a thread; queries are served meanwhile
+    asyncio.get_running_loop().run_in_executor(None, app[WATCHER].start)
+
+
+async def stop_watcher(app):
+    await asyncio.to_thread(app[WATCHER].stop)
+
+
+def create_app(engine=None, watch=False):
+    app = web.Application()
+    app[ENGINE] = engine or RAGEngine()
+    app[LLM_SLOTS] = asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY)
+    app[INGEST_LOCK] = asyncio.Lock()
+    app[WARMUP] = Warmup(app[ENGINE])
+    app.router.add_post("/query", handle_query)
+    app.router.add_post("/query/stream", handle_query_stream)
+    app.router.add_post("/ingest", handle_ingest)
+    app.router.add_get("/subjects", handle_subjects)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    app.on_startup.append(warm_up)
+    if watch:
+        app[WATCHER] = FolderWatcher(app[ENGINE])
+        app.on_startup.append(start_watcher)
+        app.on_cleanup.append(stop_watcher)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async HTTP query service for the legal RAG engine.")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--watch", action="store_true", help="Ingest changes to the data folder automatically")
+    args = parser.parse_args()
+    print(f"🌐 Query service on http://{args.host}:{args.port} (LLM concurrency {Config.LLM_MAX_CONCURRENCY})")
+    web.run_app(create_app(watch=args.watch), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import time
+import threading
+import contextlib
+
+# --- STARTUP WARM-UP ---
+# Heavy dependencies (torch, sentence-transformers, chromadb) are imported
+# lazily, so the UI renders immediately. Warmup then loads the embedding model,
+# vector store, docstore and indexes on a background thread, timing each phase.
+# The phase timings are printed, shown in the UI and returned by /health, so a
+# slower startup shows up as a bigger number in one named phase.
+
+
+class StartupTimer:
+    def __init__(self):
+        self.phases = []   # [(name, seconds)] in order
+        self.current = None
+        self._start = time.perf_counter()
+
+    def add(self, name, seconds):
+        self.phases.append((name, seconds))
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self.current = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+            self.current = None
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def as_dict(self):
+        timings = {name: round(seconds, 3) for name, seconds in self.phases}
+        timings["total"] = round(sum(seconds for _, seconds in self.phases), 3)
+        return timings
+
+    def report(self):
+        print("⏱️ Startup timings:")
+        for name, seconds in self.phases:
+            print(f"   {name:<14} {seconds:7.2f}s")
+        print(f"   {'total':<14} {sum(s for _, s in self.phases):7.2f}s")
+
+
+class Warmup:
+    """
+    Runs engine.warm_up() once on a daemon thread.
+    state: "pending" -> "warming" -> "ready" | "failed"
+    """
+
+    def __init__(self, engine, timer=None):
+        self.engine = engine
+        self.timer = timer or StartupTimer()
+        self.state = "pending"
+        self.error = None
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self.state = "warming"
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def run(self):
+        """
+        Blocking variant (WARMUP=blocking, CLI tools).
+        """
+        self.state = "warming"
+        self._run()
+        return self
+
+    def _run(self):
+        try:
+            self.engine.warm_up(self.timer)
+            self.state = "ready"
+            print(f"✅ Warm-up complete in {self.timer.as_dict()['total']:.2f}s")
+        except Exception as e:
+            # The engine still loads lazily on first use; keep the error for the UI
+            self.state = "failed"
+            self.error = str(e)
+            print(f"❌ Warm-up failed: {e}")
+        finally:
+            self.timer.report()
+            self._done.set()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until warm-up finished. Returns True when it succeeded.
+        """
+        if self._thread is None and self.state == "pending":
+            return False
+        self._done.wait(timeout)
+        return self.state == "ready"
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def status(self):
+        return {
+            "state": self.state,
+            "phase": self.timer.current,
+            "elapsed": round(self.timer.elapsed, 2),
+            "timings": self.timer.as_dict(),
+            "error": self.error,
+        }
@@ -0,0 +1,42 @@
+import re
+from typing import Any, Iterator, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# --- DETERMINISTIC STUB LLM ---
+# Stands in for Ollama (LLM_BACKEND=stub) so the API, benchmarks and CI-like
+# runs work offline. The answer is a fixed sentence plus the citations found
+# in the prompt's "Source: ... / Section: ..." headers, streamed word by word.
+
+_CITATION_RE = re.compile(r'Source:\s*(.+?)\n(?:Section|Part):\s*(.+?)\n')
+
+
+class StubChatModel(BaseChatModel):
+    answer_prefix: str = "إجابة تجريبية مبنية على المصادر التالية:"
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _answer(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(m.content) for m in messages)
+        citations = []
+        for source, section in _CITATION_RE.findall(prompt):
+            cite = f"{source.strip()} - {section.strip()}"
+            if cite not in citations:
+                citations.append(cite)
+        return "\n".join([self.answer_prefix] + [f"- {c}" for c in citations])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for piece in re.findall(r'\S+\s*', self._answer(messages)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
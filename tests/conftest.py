@@ -0,0 +1,72 @@
+import os
+import sys
+import hashlib
+import pytest
+
+# Tests import the flat modules of the project root, like the scripts do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words vectors, so indexing and search run without the model.
+    """
+
+    def __init__(self, dims=32):
+        self.dims = dims
+        self.calls = []
+
+    def embed_query(self, text):
+        self.calls.append(text)
+        vec = [0.0] * self.dims
+        for word in text.split():
+            vec[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dims] += 1.0
+        norm = sum(v * v for v in vec) ** 0.5 or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+def write_pdf(path, articles, word="controller", pages=4):
+    """
+    A PDF with `articles` numbered 'Article n:' sections spread over `pages` pages.
+    """
+    import fitz
+    doc = fitz.open()
+    per_page = max(1, articles // pages)
+    for first in range(1, articles + 1, per_page):
+        page = doc.new_page()
+        lines = []
+        for n in range(first, min(first + per_page, articles + 1)):
+            lines += [f"Article {n}:", f"The provisions of this article number {n} apply to every {word}."]
+        page.insert_text((40, 40), "\n".join(lines), fontsize=8)
+    if not articles:
+        doc.new_page()
+    doc.save(str(path))
+    return str(path)
+
+
+@pytest.fixture
+def no_ocr(monkeypatch):
+    from config import Config
+    monkeypatch.setattr(Config, "OCR_ENABLED", False)
+    monkeypatch.setattr(Config, "PDF_BACKEND", "pymupdf", raising=False)
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch, no_ocr):
+    """
+    A RAGEngine on a scratch database with FakeEmbeddings and no answer cache.
+    """
+    from config import Config
+    embeddings = FakeEmbeddings()
+    monkeypatch.setattr(Config, "get_embeddings", staticmethod(lambda *args, **kwargs: embeddings))
+    monkeypatch.setattr(Config, "ANSWER_CACHE", False)
+    monkeypatch.setattr(Config, "LAW_ROUTER", False)
+    monkeypatch.setattr(Config, "RERANK", False)
+    monkeypatch.setattr(Config, "VECTOR_SHARDING", "off")
+    from rag_engine import RAGEngine
+    return RAGEngine(db_path=str(tmp_path / "db"))
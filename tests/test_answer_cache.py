@@ -0,0 +1,64 @@
+import pytest
+from langchain_core.documents import Document
+from answer_cache import AnswerCache
+
+DOCS = [Document(page_content="نص", metadata={"source": "A.pdf"})]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(str(tmp_path), threshold=0.9, ttl=100)
+
+
+def _age(cache, query, seconds):
+    cache._conn.execute("UPDATE answers SET created = created - ? WHERE query = ?", (seconds, query))
+    cache._conn.commit()
+
+
+def test_hit_above_threshold(cache):
+    cache.put("q", [1.0, 0.0], ["p1", "p2"], "answer", DOCS)
+    hit = cache.lookup([0.99, 0.1], ["p2", "p1"])
+    assert hit["answer"] == "answer" and hit["query"] == "q"
+    assert hit["documents"][0].page_content == "نص"
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_miss_below_threshold(cache):
+    cache.put("q", [1.0, 0.0], ["p1"], "answer", DOCS)
+    assert cache.lookup([0.7, 0.7], ["p1"]) is None
+    assert cache.misses == 1
+
+
+def test_miss_on_other_parents(cache):
+    cache.put("q", [1.0, 0.0], ["p1"], "answer", DOCS)
+    assert cache.lookup([1.0, 0.0], ["p1", "p2"]) is None
+    assert cache.lookup([1.0, 0.0], []) is None
+
+
+def test_expired_entry_is_dropped(cache):
+    cache.put("q", [1.0, 0.0], ["p1"], "answer", DOCS)
+    _age(cache, "q", 1000)
+    assert cache.lookup([1.0, 0.0], ["p1"]) is None
+    assert cache._ids == []
+
+
+def test_expired_entry_does_not_hide_a_fresh_one(cache):
+    cache.put("old", [1.0, 0.0], ["p1"], "stale", DOCS)
+    cache.put("new", [0.95, 0.3], ["p1"], "fresh", DOCS)
+    _age(cache, "old", 1000)
+    assert cache.lookup([1.0, 0.0], ["p1"])["answer"] == "fresh"
+    assert len(cache._ids) == 1
+
+
+def test_invalidate_source(cache):
+    cache.put("q", [1.0, 0.0], ["p1"], "answer", DOCS)
+    assert cache.invalidate_source("A.pdf") == 1
+    assert cache.lookup([1.0, 0.0], ["p1"]) is None
+
+
+def test_evicts_past_max_entries(tmp_path):
+    cache = AnswerCache(str(tmp_path), threshold=0.9, max_entries=2)
+    for n in range(3):
+        cache.put(f"q{n}", [1.0, float(n)], [f"p{n}"], f"a{n}", DOCS)
+    assert len(cache._ids) == 2
+    assert cache.lookup([1.0, 0.0], ["p0"]) is None
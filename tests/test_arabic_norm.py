@@ -0,0 +1,79 @@
+import pytest
+from conftest import FakeEmbeddings
+from arabic_norm import (
+    DISPLAY_TABLE, NORMALIZE_TABLE, PAGE_SEPARATOR, SEARCH_TABLE, NormalizedEmbeddings,
+    display_text, fold_for_search, iter_normalized, normalize_batch, normalize_text, tokenize,
+)
+
+# "Article 5 of the personal data protection law": diacritics, hamza, Arabic-Indic digit
+CLEAN = "المَادَّةُ ٥ مِنْ نِظَامِ حِمَايَةِ البَيَانَاتِ الشَّخْصِيَّةِ، إِذَا أُلْغِيَ"
+
+
+@pytest.mark.parametrize("raw, shown", [
+    ("اﻟﻤﺎدة", "المادة"),              # Presentation forms -> base letters
+    ("ﻻ", "لا"),                       # Ligatures expand
+    ("الم\u0640\u0640ادة", "المادة"),  # Tatweel
+    ("الما\u200fدة\u200b", "المادة"),  # Bidi and zero-width marks
+    ("نص\u00a0المادة", "نص المادة"),  # No-break space
+])
+def test_display_folds(raw, shown):
+    assert display_text(raw) == shown
+
+
+def test_display_is_lossless_for_clean_text():
+    # Diacritics, hamza spelling, alef maqsura, ta marbuta and digits are what users read
+    assert display_text(CLEAN) == CLEAN
+    assert display_text("على مسؤولية المنشأة ١٢") == "على مسؤولية المنشأة ١٢"
+
+
+def test_normalize_folds_what_display_keeps():
+    assert normalize_text(CLEAN) == "المادة 5 من نظام حماية البيانات الشخصية، اذا الغي"
+    assert normalize_text("أإآٱ") == "اااا"
+    assert normalize_text("على مسؤولية شاطئ") == "علي مسوولية شاطي"
+    assert normalize_text("۱۲ و ١٢") == "12 و 12"
+    assert normalize_text("ﺃ") == "ا"  # Presentation form of a hamza letter folds all the way
+
+
+def test_normalize_extends_display():
+    assert set(DISPLAY_TABLE) <= set(NORMALIZE_TABLE) <= set(SEARCH_TABLE)
+    for code in NORMALIZE_TABLE:
+        char = chr(code)
+        assert normalize_text(display_text(char)) == normalize_text(char)
+        assert normalize_text(normalize_text(char)) == normalize_text(char)
+
+
+def test_fold_for_search():
+    assert fold_for_search("المادة") == "الماده"
+    assert fold_for_search("ﺔ") == "ه"  # Presentation form of ta marbuta
+    assert fold_for_search("Article") == "article"
+    assert tokenize("المادةُ (٥) Article") == ["الماده", "5", "article"]
+
+
+def test_normalize_batch_matches_one_by_one():
+    pages = [CLEAN, "", "اﻟﻤﺎدة", "plain ascii", "ﻻ" + PAGE_SEPARATOR + "x"]
+    assert normalize_batch(pages) == [normalize_text(p.replace(PAGE_SEPARATOR, "")) for p in pages]
+    assert normalize_batch(pages, DISPLAY_TABLE) == [display_text(p.replace(PAGE_SEPARATOR, "")) for p in pages]
+    assert normalize_batch([]) == []
+
+
+def test_text_without_foldable_characters_is_returned_as_is():
+    text = "plain ascii and كلمات"
+    assert display_text(text) is text
+    assert normalize_batch(["a", "b"], DISPLAY_TABLE) == ["a", "b"]
+
+
+@pytest.mark.parametrize("batch_chars", [1, 10, 10_000])
+def test_iter_normalized_streams_like_normalize_batch(batch_chars):
+    pages = [CLEAN, "اﻟﻤﺎدة", "", "page four"] * 3
+    assert list(iter_normalized(iter(pages), batch_chars=batch_chars)) == normalize_batch(pages)
+    assert list(iter_normalized(pages, batch_chars=batch_chars, table=DISPLAY_TABLE)) == \
+        normalize_batch(pages, DISPLAY_TABLE)
+
+
+def test_normalized_embeddings_fold_documents_and_queries_alike():
+    inner = FakeEmbeddings()
+    embeddings = NormalizedEmbeddings(inner)
+    documents = embeddings.embed_documents(["إِذَا أُلْغِيَ", "اﻟﻤﺎدة"])
+    query = embeddings.embed_query("اذا الغي")
+    assert inner.calls == ["اذا الغي", "المادة", "اذا الغي"]
+    assert documents[0] == query
@@ -0,0 +1,66 @@
+import pytest
+from langchain_core.documents import Document
+from article_index import ArticleIndex, article_number, parse_article_number
+
+
+@pytest.mark.parametrize("text, number", [
+    ("12", 12),
+    ("(12)", 12),
+    ("١٢", 12),
+    ("الأولى", 1),
+    ("الخامسة", 5),
+    ("الخامسة عشرة", 15),
+    ("العشرون", 20),
+    ("الحادية والعشرون", 21),
+    ("الثالثة والأربعون", 43),
+    ("الحادية بعد المائة", 101),
+    ("السابعة بعد المائتين", 207),
+])
+def test_parse_article_number(text, number):
+    assert parse_article_number(text) == number
+
+
+def test_parse_article_number_without_number():
+    assert parse_article_number("مقدمة") is None
+
+
+@pytest.mark.parametrize("title, number", [
+    ("المادة الخامسة", 5),
+    ("المادة ٣٤", 34),
+    ("المَادَّةُ الأُولَى", 1),
+    ("Article 7", 7),
+])
+def test_article_number_of_titles(title, number):
+    assert article_number(title) == number
+
+
+def test_article_number_needs_the_keyword():
+    assert article_number("Introduction") is None
+    assert article_number("الخامسة") is None
+
+
+def _section(source, title):
+    return Document(page_content=f"Source: {source}\nSection: {title}\n\nنص", metadata={
+        "source": source, "subject": source.split(".")[0], "article": title})
+
+
+def test_lookup_by_article_and_law():
+    index = ArticleIndex()
+    index.add(["a5", "b5"], [_section("PersonalData.pdf", "المادة الخامسة"),
+                             _section("Bankruptcy.pdf", "المادة 5")])
+    assert index.lookup("ما نص المادة الخامسة من نظام personal data") == ["a5"]
+    assert index.lookup("Article 5 of the bankruptcy law") == ["b5"]
+    # Two laws have an article 5 and the query names neither
+    assert index.lookup("المادة الخامسة") is None
+    assert index.lookup("ما هي حقوق صاحب البيانات") is None
+
+
+def test_lookup_rejects_a_law_that_is_not_indexed():
+    index = ArticleIndex()
+    index.add(["a12"], [_section("PersonalData.pdf", "المادة 12")])
+    # Only one law has an article 12, but the query names another one
+    assert index.lookup("المادة 12 من قانون العمل") is None
+    assert index.lookup("Article 12 of the labour law") is None
+    assert index.lookup("المادة 12 من نظام personal data") == ["a12"]
+    # No law named: the only candidate answers
+    assert index.lookup("ما نص المادة 12") == ["a12"]
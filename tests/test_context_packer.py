@@ -0,0 +1,108 @@
+import pytest
+from langchain_core.documents import Document
+from context_packer import GAP, ContextPacker, TokenCounter, split_header, split_sentences
+
+
+class WordCounter:
+    """
+    One token per whitespace-separated word, so budgets are easy to reason about.
+    """
+
+    def count(self, text):
+        return len(text.split())
+
+
+def _doc(source, sentences, **metadata):
+    body = " ".join(sentences)
+    return Document(page_content=f"Source: {source}\nSection: Article 1\n\n{body}",
+                    metadata={"source": source, **metadata})
+
+
+def _filler(n, words=8):
+    return f"Filler sentence {n} " + " ".join(f"w{n}x{i}" for i in range(words - 3)) + "."
+
+
+def test_split_header_and_sentences():
+    header, body = split_header("Source: a.pdf\nSection: Article 1\n\nFirst one. Second one؟ Third")
+    assert header == "Source: a.pdf\nSection: Article 1\n\n"
+    assert split_sentences(body) == ["First one.", " Second one؟", " Third"]
+    assert split_header("no header") == ("", "no header")
+
+
+def test_estimated_token_count_without_tokenizer():
+    counter = TokenCounter(None)
+    assert not counter.exact
+    assert counter.count("") == 0
+    assert counter.count("x" * 35) == 10
+
+
+def test_document_that_fits_is_kept_verbatim():
+    doc = _doc("a.pdf", ["The controller shall notify.", "The processor shall assist."], matched_spans=["x"])
+    packed, stats = ContextPacker(WordCounter(), max_tokens=100, doc_max_tokens=50).pack("controller", [doc])
+    assert packed[0].page_content == doc.page_content
+    assert "matched_spans" not in packed[0].metadata and packed[0].metadata["source"] == "a.pdf"
+    assert stats == {"docs_in": 1, "docs_out": 1, "tokens_in": 13, "tokens": 13, "trimmed": 0, "duplicates": 0}
+
+
+def test_per_document_cap_keeps_the_header_and_best_sentences():
+    sentences = [_filler(n) for n in range(10)]
+    sentences[6] = "The controller must erase personal data on request."
+    doc = _doc("a.pdf", sentences)
+    packed, stats = ContextPacker(WordCounter(), max_tokens=1000, doc_max_tokens=30).pack(
+        "when must the controller erase data", [doc])
+    content = packed[0].page_content
+    assert content.startswith("Source: a.pdf\nSection: Article 1\n\n")
+    assert "controller must erase" in content
+    assert WordCounter().count(content) <= 30
+    assert GAP.strip() in content  # Skipped sentences are marked
+    assert stats["trimmed"] == 1
+
+
+def test_matched_spans_win_over_query_terms():
+    sentences = [_filler(n) for n in range(6)]
+    doc = _doc("a.pdf", sentences, matched_spans=[sentences[4]])
+    packed, _ = ContextPacker(WordCounter(), max_tokens=1000, doc_max_tokens=13).pack("unrelated", [doc])
+    assert sentences[4] in packed[0].page_content
+    assert sentences[0] not in packed[0].page_content
+
+
+def test_total_budget_drops_the_lowest_ranked_documents():
+    docs = [_doc(f"{n}.pdf", [_filler(n * 10 + i) for i in range(4)]) for n in range(5)]  # 37 words each
+    packed, stats = ContextPacker(WordCounter(), max_tokens=100, doc_max_tokens=60).pack("filler", docs)
+    assert [d.metadata["source"] for d in packed][:2] == ["0.pdf", "1.pdf"]
+    assert stats["tokens"] == sum(WordCounter().count(d.page_content) for d in packed)
+    assert stats["tokens"] <= 100
+    assert stats["docs_in"] == 5 and stats["docs_out"] == len(packed) < 5
+
+
+@pytest.mark.parametrize("max_tokens", range(40, 120, 7))
+def test_budget_holds_including_gap_markers(max_tokens):
+    docs = []
+    for n in range(4):
+        sentences = [_filler(n * 10 + i) for i in range(8)]
+        sentences[1] = sentences[5] = f"Every controller {n} answers here."
+        docs.append(_doc(f"{n}.pdf", sentences))
+    packed, stats = ContextPacker(WordCounter(), max_tokens=max_tokens, doc_max_tokens=35).pack(
+        "controller answers", docs)
+    for doc in packed:
+        assert WordCounter().count(doc.page_content) <= 35
+    assert stats["tokens"] <= max_tokens
+
+
+def test_sentences_packed_from_a_higher_ranked_document_are_skipped():
+    shared = "The controller shall appoint a data protection officer."
+    first = _doc("a.pdf", [shared, "Only in the first law."])
+    second = _doc("b.pdf", ["Only in the second law.", shared])
+    packed, stats = ContextPacker(WordCounter()).pack("officer", [first, second])
+    assert shared in packed[0].page_content
+    assert shared not in packed[1].page_content
+    assert packed[1].page_content.startswith("Source: b.pdf\nSection: Article 1\n\n")
+    assert "Only in the second law." in packed[1].page_content
+    assert stats["duplicates"] == 1 and stats["trimmed"] == 1
+
+
+def test_document_with_only_duplicates_is_dropped():
+    text = ["Same sentence in both laws."]
+    packed, stats = ContextPacker(WordCounter()).pack("same", [_doc("a.pdf", text), _doc("b.pdf", text)])
+    assert [d.metadata["source"] for d in packed] == ["a.pdf"]
+    assert stats["duplicates"] == 1 and stats["docs_out"] == 1
@@ -0,0 +1,69 @@
+import pytest
+from langchain_core.documents import Document
+from docstore import SQLiteDocStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteDocStore(str(tmp_path / "docstore.sqlite"))
+    yield store
+    store.close()
+
+
+def _doc(text, source="A.pdf"):
+    return Document(page_content=text, metadata={"source": source, "article": text})
+
+
+def test_mset_mget(store):
+    store.mset([("1", _doc("one")), ("2", _doc("two", "B.pdf"))])
+    docs = store.mget(["2", "missing", "1"])
+    assert [d.page_content if d else None for d in docs] == ["two", None, "one"]
+    assert docs[0].metadata == {"source": "B.pdf", "article": "two"}
+    assert store.mget([]) == []
+    assert len(store) == 2
+
+
+def test_mset_overwrites(store):
+    store.mset([("1", _doc("old"))])
+    store.mset([("1", _doc("new"))])
+    assert store.mget(["1"])[0].page_content == "new"
+    assert len(store) == 1
+
+
+def test_mdelete(store):
+    store.mset([(str(i), _doc(str(i))) for i in range(3)])
+    store.mdelete(["0", "2", "missing"])
+    assert sorted(store.yield_keys()) == ["1"]
+
+
+def test_delete_source(store):
+    store.mset([("1", _doc("a1")), ("2", _doc("a2")), ("3", _doc("b1", "B.pdf"))])
+    assert store.delete_source("A.pdf") == 2
+    assert list(store.yield_keys()) == ["3"]
+
+
+def test_many_keys(store):
+    # More keys than one IN (...) query binds
+    keys = [str(i) for i in range(1200)]
+    store.mset([(k, _doc(k)) for k in keys])
+    assert [d.page_content for d in store.mget(keys)] == keys
+
+
+def test_transaction_rolls_back(store):
+    store.mset([("1", _doc("kept"))])
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.mset([("2", _doc("lost"))])
+            store.mdelete(["1"])
+            raise RuntimeError("interrupted")
+    assert sorted(store.yield_keys()) == ["1"]
+
+
+def test_persists(tmp_path):
+    path = str(tmp_path / "docstore.sqlite")
+    store = SQLiteDocStore(path)
+    store.mset([("1", _doc("one"))])
+    store.close()
+    store = SQLiteDocStore(path)
+    assert store.mget(["1"])[0].page_content == "one"
+    store.close()
@@ -0,0 +1,94 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from conftest import FakeEmbeddings
+from embed_batcher import BatchingEmbeddings, percentile
+
+
+class RecordingEmbeddings(FakeEmbeddings):
+    def __init__(self, fail=False):
+        super().__init__()
+        self.batches = []
+        self.fail = fail
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return super().embed_documents(texts)
+
+
+def test_queries_within_the_window_share_one_forward_pass():
+    inner = RecordingEmbeddings()
+    batcher = BatchingEmbeddings(inner, window_ms=200, max_batch=16)
+    texts = [f"query {n}" for n in range(6)]
+    futures = [batcher.submit(t) for t in texts]
+    results = [f.result(timeout=5) for f in futures]
+    assert inner.batches == [texts]
+    assert results == [FakeEmbeddings().embed_query(t) for t in texts]  # Each caller gets its own vector
+    stats = batcher.stats()
+    assert stats["batches"] == 1 and stats["mean_batch_size"] == 6.0
+    assert 0 <= stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+
+
+def test_max_batch_caps_a_forward_pass():
+    inner = RecordingEmbeddings()
+    batcher = BatchingEmbeddings(inner, window_ms=200, max_batch=3)
+    texts = [f"query {n}" for n in range(8)]
+    for f in [batcher.submit(t) for t in texts]:
+        f.result(timeout=5)
+    assert [len(b) for b in inner.batches] == [3, 3, 2]
+    assert [t for b in inner.batches for t in b] == texts
+
+
+def test_window_closes_without_more_queries():
+    inner = RecordingEmbeddings()
+    batcher = BatchingEmbeddings(inner, window_ms=10, max_batch=16)
+    batcher.embed_query("alone")
+    batcher.embed_query("later")
+    assert inner.batches == [["alone"], ["later"]]
+
+
+def test_threads_calling_embed_query_get_their_own_vectors():
+    inner = FakeEmbeddings()
+    batcher = BatchingEmbeddings(inner, window_ms=20, max_batch=4)
+    texts = [f"question {n}" for n in range(20)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(batcher.embed_query, texts))
+    assert results == [FakeEmbeddings().embed_query(t) for t in texts]
+    stats = batcher.stats()
+    assert stats["batches"] * stats["mean_batch_size"] == pytest.approx(20)
+
+
+def test_a_failed_batch_fails_each_caller_and_the_worker_survives():
+    inner = RecordingEmbeddings(fail=True)
+    batcher = BatchingEmbeddings(inner, window_ms=100)
+    futures = [batcher.submit(t) for t in ("a", "b", "c")]
+    for f in futures:
+        with pytest.raises(RuntimeError, match="model crashed"):
+            f.result(timeout=5)
+    inner.fail = False
+    assert batcher.embed_query("d") == FakeEmbeddings().embed_query("d")
+
+
+def test_aembed_query():
+    batcher = BatchingEmbeddings(FakeEmbeddings(), window_ms=5)
+
+    async def run():
+        return await asyncio.gather(*(batcher.aembed_query(t) for t in ("x", "y")))
+    assert asyncio.run(run()) == [FakeEmbeddings().embed_query(t) for t in ("x", "y")]
+
+
+def test_documents_pass_straight_through():
+    inner = RecordingEmbeddings()
+    batcher = BatchingEmbeddings(inner)
+    batcher.embed_documents(["chunk 1", "chunk 2"])
+    assert inner.batches == [["chunk 1", "chunk 2"]]
+    assert batcher.stats()["batches"] == 0
+
+
+def test_percentile():
+    assert percentile([], 95) == 0.0
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile(list(range(101)), 95) == 95
+    assert percentile([7], 99) == 7
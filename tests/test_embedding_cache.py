@@ -0,0 +1,91 @@
+import sqlite3
+import pytest
+from conftest import FakeEmbeddings
+from embedding_cache import CACHE_NAME, CachedEmbeddings
+
+
+def _cache(tmp_path, inner=None, **kwargs):
+    options = {"model_name": "fake", "normalize": True, "cache_dir": str(tmp_path),
+               "max_bytes": 1 << 20, "dtype": "float32", **kwargs}
+    return CachedEmbeddings(inner or FakeEmbeddings(), **options)
+
+
+def test_documents_are_embedded_once(tmp_path):
+    inner = FakeEmbeddings()
+    cache = _cache(tmp_path, inner)
+    first = cache.embed_documents(["one two", "three"])
+    assert inner.calls == ["one two", "three"]
+    again = cache.embed_documents(["three", "one two"])
+    assert again[0] == pytest.approx(first[1]) and again[1] == pytest.approx(first[0])
+    assert inner.calls == ["one two", "three"]
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2
+
+
+def test_duplicates_in_one_batch_are_misses_embedded_once(tmp_path):
+    inner = FakeEmbeddings()
+    cache = _cache(tmp_path, inner)
+    vectors = cache.embed_documents(["same", "same", "other", "same"])
+    assert inner.calls == ["same", "other"]
+    assert vectors[0] == vectors[1] == vectors[3]
+    assert (cache.hits, cache.misses) == (0, 4)
+    cache.embed_documents(["same", "same"])
+    assert (cache.hits, cache.misses) == (2, 4)
+    assert cache.stats()["hit_rate"] == pytest.approx(2 / 6)
+
+
+def test_vectors_persist_across_instances(tmp_path):
+    vector = _cache(tmp_path).embed_documents(["persisted text"])[0]
+    inner = FakeEmbeddings()
+    assert _cache(tmp_path, inner).embed_documents(["persisted text"])[0] == pytest.approx(vector)
+    assert inner.calls == []
+
+
+def test_float16_round_trip(tmp_path):
+    vector = FakeEmbeddings().embed_query("half precision")
+    cache = _cache(tmp_path, dtype="float16")
+    cache.embed_documents(["half precision"])
+    cached = _cache(tmp_path, dtype="float16").embed_documents(["half precision"])[0]
+    assert cached == pytest.approx(vector, abs=1e-3)
+
+
+def test_keys_depend_on_model_and_normalize_flag(tmp_path):
+    base = _cache(tmp_path)
+    assert base._key("x") != _cache(tmp_path, model_name="other")._key("x")
+    assert base._key("x") != _cache(tmp_path, normalize=False)._key("x")
+
+
+def test_queries_stay_in_memory(tmp_path):
+    inner = FakeEmbeddings()
+    cache = _cache(tmp_path, inner, query_entries=2)
+    cache.embed_query("a")
+    cache.embed_query("a")
+    assert inner.calls == ["a"] and cache.hits == 1
+    rows = sqlite3.connect(str(tmp_path / CACHE_NAME)).execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+    assert rows == 0
+    cache.embed_query("b")
+    cache.embed_query("c")  # Evicts "a", the least recently used
+    cache.embed_query("a")
+    assert inner.calls == ["a", "b", "c", "a"]
+
+
+def test_eviction_keeps_the_cache_under_budget(tmp_path):
+    inner = FakeEmbeddings(dims=32)  # 128 bytes per float32 vector
+    cache = _cache(tmp_path, inner, max_bytes=128 * 10)
+    for n in range(10):
+        cache.embed_documents([f"old {n}"])
+    cache.embed_documents(["new"])
+    assert cache._size <= 128 * 10
+    rows, size = cache._conn.execute("SELECT COUNT(*), SUM(LENGTH(vec)) FROM vectors").fetchone()
+    assert size == cache._size and rows < 11
+    calls = len(inner.calls)
+    cache.embed_documents(["new"])
+    assert len(inner.calls) == calls  # The newest entry survived
+    cache.embed_documents(["old 0"])
+    assert len(inner.calls) == calls + 1  # The oldest was evicted
+
+
+def test_overwritten_keys_do_not_inflate_the_size(tmp_path):
+    cache = _cache(tmp_path)
+    cache._store([(cache._key("x"), [0.0] * 32)])
+    cache._store([(cache._key("x"), [1.0] * 32)])
+    assert cache._size == 128
@@ -0,0 +1,58 @@
+import random
+import pytest
+from extraction import iter_sections, smart_split
+
+ARTICLES = ["الأولى", "الثانية", "الثالثة", "الرابعة", "الخامسة", "السادسة", "السابعة"]
+TEXT = "\n".join(
+    ["نظام حماية البيانات الشخصية", "الفصل الأول: أحكام عامة"]
+    + [line for n, word in enumerate(ARTICLES, 1) for line in (
+        f"المادة {word}:",
+        f"يسري هذا النظام على كل معالجة للبيانات الشخصية رقم {n} تتم في المملكة.",
+        "ويجب على جهة التحكم الالتزام بالأحكام الواردة في هذا النظام ولوائحه.",
+    )]
+    + ["Article 8:", "The controller shall keep a record of processing activities."]
+)
+
+
+def _cut(text, pieces, seed):
+    # Pages cut at arbitrary points: mid-word, mid-header, right after a header
+    cuts = sorted(random.Random(seed).sample(range(1, len(text)), pieces - 1))
+    return [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+
+def _sections(docs):
+    return [(d.metadata["article"], d.page_content) for d in docs]
+
+
+def _whole(pages, source="PersonalData.pdf"):
+    # Streaming joins consecutive pages with a line break
+    return _sections(iter_sections(["\n".join(pages)], source))
+
+
+def test_splits_articles():
+    sections = _sections(smart_split(TEXT, "PersonalData.pdf"))
+    assert [title for title, _ in sections] == ["Introduction"] + [f"المادة {w}" for w in ARTICLES] + ["Article 8"]
+    assert sections[1][1].startswith("Source: PersonalData.pdf\nSection: المادة الأولى\n\n")
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("pieces", [2, 5, 40])
+def test_streaming_matches_whole_text(seed, pieces):
+    pages = _cut(TEXT, pieces, seed)
+    assert _sections(iter_sections(pages, "PersonalData.pdf")) == _whole(pages)
+
+
+def test_header_cut_at_page_end():
+    pages = ["مقدمة النظام\nالمادة", "الأولى:\nنص المادة الأولى من النظام هنا.\nالمادة الثانية:\nنص المادة الثانية هنا أيضا."]
+    sections = _sections(iter_sections(pages, "x.pdf"))
+    assert sections == _whole(pages, "x.pdf")
+    assert [title for title, _ in sections] == ["المادة\nالأولى", "المادة الثانية"]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_size_fallback_matches_whole_text(seed):
+    text = "\n".join(f"سطر رقم {n} من نص لا يحتوي على مواد مرقمة." for n in range(200))
+    pages = _cut(text, 10, seed)
+    sections = _sections(iter_sections(pages, "Plain.pdf"))
+    assert sections == _whole(pages, "Plain.pdf")
+    assert sections[0][0] == "Page/Part 1"
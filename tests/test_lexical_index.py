@@ -0,0 +1,106 @@
+import pytest
+from lexical_index import INDEX_NAME, LexicalIndex
+
+
+def _index(path=None):
+    index = LexicalIndex(path)
+    index.add(["a-0", "a-1", "b-0", "c-0"], ["a", "a", "b", "c"], [
+        "يلتزم المتحكم بحماية البيانات الشخصية",
+        "للمتحكم تعيين مسؤول حماية",
+        "إجراءات الإفلاس والتصفية",
+        "الدائنون في إجراءات التصفية",
+    ])
+    return index
+
+
+def test_search_ranks_by_bm25():
+    index = _index()
+    hits = index.search("إجراءات")
+    assert {h[0] for h in hits} == {"b-0", "c-0"} and {h[1] for h in hits} == {"b", "c"}
+    # Shorter chunk, same tf: ranks first
+    assert hits[0][0] == "b-0" and hits[0][2] > hits[1][2]
+    assert index.search("الافلاس")[0][:2] == ("b-0", "b")  # Hamza folded like the indexed text
+    assert index.search("") == [] and index.search("غير موجود") == []
+
+
+def test_search_within_parents():
+    index = _index()
+    assert [h[1] for h in index.search("حمايه البيانات", parents={"a"})] == ["a", "a"]
+    assert index.search("التصفية", parents={"a"}) == []
+
+
+def test_removed_chunks_are_tombstoned():
+    index = _index()
+    index.remove(["b-0", "missing"])
+    assert len(index) == 3
+    assert index.child_ids.count(None) == 1  # Slot kept until compaction
+    assert [h[0] for h in index.search("إجراءات")] == ["c-0"]
+    assert index.total_length == sum(index.lengths[index.slots[c]] for c in ("a-0", "a-1", "c-0"))
+
+
+def test_re_adding_a_chunk_replaces_it():
+    index = _index()
+    index.add(["a-0"], ["a"], ["نص جديد تماما"])
+    assert len(index) == 4
+    assert [h[0] for h in index.search("جديد")] == ["a-0"]
+    assert "a-0" not in [h[0] for h in index.search("المتحكم بحماية")]
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / INDEX_NAME)
+    index = _index(path)
+    before = index.search("حماية البيانات")
+    index.save()
+    loaded = LexicalIndex(path)
+    assert len(loaded) == 4 and not loaded.dirty
+    assert loaded.search("حماية البيانات") == before
+
+
+def test_save_compacts_once_tombstones_pile_up(tmp_path):
+    path = str(tmp_path / INDEX_NAME)
+    index = LexicalIndex(path)
+    index.add([f"c{n}" for n in range(8)], [f"p{n}" for n in range(8)],
+              [f"مشترك كلمة{n}" for n in range(8)])
+    index.remove(["c0"])  # 8 slots for 7 live chunks: under the 1.25 threshold
+    index.save()
+    assert len(index.child_ids) == 8
+
+    index.remove(["c3", "c5"])  # 8 slots for 5 live chunks
+    expected = index.search("مشترك كلمه4", k=10)
+    index.save()
+    assert index.child_ids == ["c1", "c2", "c4", "c6", "c7"]
+    assert index.slots == {cid: n for n, cid in enumerate(index.child_ids)}
+    assert all(max(slots) < 5 for slots, _ in index.postings.values())
+    assert "كلمه3" not in index.postings  # Terms of dropped chunks only are gone
+    assert index.search("مشترك كلمه4", k=10) == expected
+    loaded = LexicalIndex(path)
+    assert loaded.child_ids == index.child_ids and loaded.search("مشترك كلمه4", k=10) == expected
+
+
+def test_save_is_a_no_op_when_clean(tmp_path):
+    path = tmp_path / INDEX_NAME
+    index = _index(str(path))
+    index.save()
+    mtime = path.stat().st_mtime_ns
+    index.save()
+    assert path.stat().st_mtime_ns == mtime
+    assert LexicalIndex().save() is None  # No path: nothing to write
+
+
+def test_unreadable_file_starts_empty(tmp_path, capsys):
+    path = tmp_path / INDEX_NAME
+    path.write_bytes(b"not a pickle")
+    index = LexicalIndex(str(path))
+    assert len(index) == 0 and index.search("حماية") == []
+    assert "unreadable" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("removed", [[], ["a-0"], ["a-0", "a-1", "b-0", "c-0"]])
+def test_live_count_and_length_stay_consistent(removed):
+    index = _index()
+    index.remove(removed)
+    assert len(index) == 4 - len(removed)
+    live = [slot for slot, cid in enumerate(index.child_ids) if cid is not None]
+    assert index.total_length == sum(index.lengths[s] for s in live)
+    if not live:
+        assert index.search("حماية") == []
@@ -0,0 +1,177 @@
+import os
+import pytest
+import rag_engine
+from conftest import write_pdf
+from manifest import Manifest, file_hash
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_plan_and_record(tmp_path):
+    a = _write(tmp_path / "a.pdf", "one")
+    b = _write(tmp_path / "b.pdf", "two")
+    manifest = Manifest(str(tmp_path / "db"))
+    assert manifest.is_new
+    to_index, removed = manifest.plan([a, b])
+    assert (to_index, removed) == ([a, b], [])
+
+    manifest.record(a, ["p1"], ["p1-0", "p1-1"])
+    manifest.record(b, [], [])  # Extracted to nothing: skipped all the same
+    assert manifest.get("a.pdf")["hash"] == file_hash(a)
+    assert manifest.plan([a, b]) == ([], [])
+
+
+def test_plan_detects_changes_and_removals(tmp_path):
+    a = _write(tmp_path / "a.pdf", "one")
+    b = _write(tmp_path / "b.pdf", "two")
+    manifest = Manifest(str(tmp_path / "db"))
+    manifest.record(a, ["p1"], [])
+    manifest.record(b, ["p2"], [])
+
+    _write(tmp_path / "a.pdf", "one, changed")
+    assert manifest.plan([a]) == ([a], ["b.pdf"])
+
+
+def test_touched_but_identical_file_is_skipped(tmp_path):
+    a = _write(tmp_path / "a.pdf", "one")
+    manifest = Manifest(str(tmp_path / "db"))
+    manifest.record(a, ["p1"], [])
+    stat = os.stat(a)
+    os.utime(a, (stat.st_atime, stat.st_mtime + 10))
+    assert manifest.plan([a]) == ([], [])
+    assert manifest.get("a.pdf")["mtime"] == stat.st_mtime + 10
+
+
+def test_settings_change_reindexes_everything(tmp_path):
+    a = _write(tmp_path / "a.pdf", "one")
+    manifest = Manifest(str(tmp_path / "db"))
+    manifest.embedding, manifest.layout, manifest.text = "m|fp32", "single", "norm2"
+    manifest.record(a, ["p1"], [])
+    assert manifest.plan([a], embedding="m|fp32", layout="single", text="norm2") == ([], [])
+    assert manifest.plan([a], embedding="m|int8") == ([a], [])
+    assert manifest.plan([a], layout="subject") == ([a], [])
+    assert manifest.plan([a], text="norm3") == ([a], [])
+
+
+def test_save_and_reload(tmp_path):
+    a = _write(tmp_path / "a.pdf", "one")
+    db = str(tmp_path / "db")
+    manifest = Manifest(db)
+    manifest.embedding, manifest.layout, manifest.text = "m|fp32", "single", "norm2"
+    manifest.record(a, ["p1"], ["p1-0"])
+    os.makedirs(db)
+    manifest.save()
+
+    loaded = Manifest(db)
+    assert not loaded.is_new
+    assert (loaded.embedding, loaded.layout, loaded.text) == ("m|fp32", "single", "norm2")
+    assert loaded.entries == manifest.entries
+    assert loaded.plan([a]) == ([], [])
+
+
+def test_unreadable_manifest_starts_over(tmp_path):
+    db = tmp_path / "db"
+    db.mkdir()
+    (db / "manifest.json").write_text("{not json", encoding="utf-8")
+    assert Manifest(str(db)).is_new
+
+
+def test_record_of_a_deleted_file_is_purged_next_time(tmp_path):
+    a = _write(tmp_path / "a.pdf", "one")
+    manifest = Manifest(str(tmp_path / "db"))
+    manifest.plan([a])
+    os.remove(a)
+    manifest.record(a, ["p1"], ["p1-0"])
+    assert manifest.get("a.pdf")["parent_ids"] == ["p1"]
+    assert manifest.plan([]) == ([], ["a.pdf"])
+
+
+# --- Incremental sync (RAGEngine.ingest_all_data) ---
+
+@pytest.fixture
+def extracted(monkeypatch):
+    """
+    Names of the files each sync hands to the pipeline.
+    """
+    runs = []
+    run_pipeline = rag_engine.run_pipeline
+
+    def spy(files, *args, **kwargs):
+        runs.append(sorted(os.path.basename(f) for f in files))
+        return run_pipeline(files, *args, **kwargs)
+
+    monkeypatch.setattr(rag_engine, "run_pipeline", spy)
+    return runs
+
+
+def _sources(engine):
+    docs = [d for d in engine.store.mget(list(engine.store.yield_keys())) if d is not None]
+    return sorted({d.metadata["source"] for d in docs})
+
+
+def _children(engine, source):
+    return len(engine.vectorstore.get(where={"source": source})["ids"])
+
+
+def test_sync_skips_replaces_and_purges(tmp_path, engine, extracted):
+    data = tmp_path / "data"
+    data.mkdir()
+    write_pdf(data / "A.pdf", 8, word="controller")
+    write_pdf(data / "B.pdf", 8, word="processor")
+    write_pdf(data / "Blank.pdf", 0)
+
+    engine.ingest_all_data(jobs=1, data_path=str(data))
+    assert extracted == [["A.pdf", "B.pdf", "Blank.pdf"]]
+    assert _sources(engine) == ["A.pdf", "B.pdf"]
+    old_a = engine.manifest.get("A.pdf")["parent_ids"]
+    assert len(old_a) == 8 and _children(engine, "A.pdf")
+
+    # Unchanged (and empty) files are not extracted again
+    engine.ingest_all_data(jobs=1, data_path=str(data))
+    assert len(extracted) == 1
+
+    # A modified file replaces its old sections
+    write_pdf(data / "A.pdf", 5, word="auditor")
+    engine.ingest_all_data(jobs=1, data_path=str(data))
+    assert extracted[-1] == ["A.pdf"]
+    new_a = engine.manifest.get("A.pdf")["parent_ids"]
+    assert len(new_a) == 5 and not set(new_a) & set(old_a)
+    assert engine.store.mget(old_a) == [None] * len(old_a)
+    assert _children(engine, "A.pdf") == len(engine.manifest.get("A.pdf")["child_ids"])
+
+    # A deleted file is purged from every store
+    b_parents = engine.manifest.get("B.pdf")["parent_ids"]
+    os.remove(data / "B.pdf")
+    engine.ingest_all_data(jobs=1, data_path=str(data))
+    assert extracted == [["A.pdf", "B.pdf", "Blank.pdf"], ["A.pdf"]]
+    assert engine.manifest.get("B.pdf") is None
+    assert _sources(engine) == ["A.pdf"]
+    assert _children(engine, "B.pdf") == 0
+    assert not set(b_parents) & {p for _, p, _ in engine.lexical_index.search("processor", k=50)}
+    assert [s["source"] for s in engine.subjects()] == ["A.pdf"]
+
+    # The saved manifest agrees: a new engine on the same DB has nothing to do
+    assert Manifest(engine.db_path).plan([str(data / "A.pdf"), str(data / "Blank.pdf")]) == ([], [])
+
+
+def test_sync_retries_a_file_whose_write_failed(tmp_path, engine, extracted, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    write_pdf(data / "A.pdf", 4)
+
+    def broken(self, documents, ids=None):
+        raise RuntimeError("vector store down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(type(engine.retriever), "add_documents", broken)
+        with pytest.raises(RuntimeError):
+            engine.ingest_all_data(jobs=1, data_path=str(data))
+    assert engine.manifest.get("A.pdf") is None
+    assert Manifest(engine.db_path).get("A.pdf") is None
+
+    engine.ingest_all_data(jobs=1, data_path=str(data))
+    assert extracted == [["A.pdf"], ["A.pdf"]]
+    assert len(engine.manifest.get("A.pdf")["parent_ids"]) == 4
@@ -0,0 +1,80 @@
+import threading
+import fitz
+import pytest
+from conftest import write_pdf
+from pipeline import run_pipeline
+
+pytestmark = pytest.mark.usefixtures("no_ocr")
+
+
+class FailingRetriever:
+    def __init__(self):
+        self.deleted = []
+
+    def add_documents(self, documents, ids=None):
+        raise RuntimeError("vector store down")
+
+    def delete_documents(self, parent_ids, child_ids):
+        self.deleted.append(parent_ids)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_write_failure_raises_without_hanging(tmp_path, jobs):
+    files = [write_pdf(tmp_path / f"law{n}.pdf", 40) for n in range(3)]
+    done = []
+    outcome = {}
+
+    def run():
+        try:
+            run_pipeline(files, FailingRetriever(), jobs=jobs, batch_size=4, queue_depth=2,
+                         on_file_done=lambda *args: done.append(args))
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(60)
+    assert not thread.is_alive(), "run_pipeline hung after a write failure"
+    assert isinstance(outcome.get("error"), RuntimeError)
+    assert done == []
+
+
+class RecordingRetriever:
+    def __init__(self):
+        self.parents = {}
+
+    def add_documents(self, documents, ids=None):
+        self.parents.update(zip(ids, documents))
+        return {i: [f"{i}-0"] for i in ids}
+
+    def delete_documents(self, parent_ids, child_ids):
+        for i in parent_ids:
+            self.parents.pop(i, None)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_extraction_error_fails_only_that_file(tmp_path, jobs):
+    good = write_pdf(tmp_path / "good.pdf", 10)
+    bad = tmp_path / "bad.pdf"
+    bad.write_bytes(b"%PDF-1.4 not really a pdf")
+    retriever = RecordingRetriever()
+    done = {}
+    stats = run_pipeline([str(bad), good], retriever, jobs=jobs, batch_size=4,
+                         on_file_done=lambda path, parents, children: done.setdefault(path, parents))
+    assert stats.files == 2 and stats.failed == 1
+    # Failed files are left out of the manifest, so the next sync retries them
+    assert set(done) == {good}
+    assert sorted(done[good]) == sorted(retriever.parents)
+    assert {d.metadata["source"] for d in retriever.parents.values()} == {"good.pdf"}
+
+
+def test_empty_file_is_reported_without_ids(tmp_path):
+    empty = tmp_path / "blank.pdf"
+    doc = fitz.open()
+    doc.new_page()
+    doc.save(str(empty))
+    done = []
+    stats = run_pipeline([str(empty)], RecordingRetriever(), jobs=1,
+                         on_file_done=lambda *args: done.append(args))
+    assert stats.failed == 1
+    assert done == [(str(empty), [], [])]
@@ -0,0 +1,213 @@
+import pytest
+from rag_engine import ThinkFilter, reciprocal_rank_fusion
+
+
+def _run(chunks):
+    think = ThinkFilter()
+    return "".join(think.feed(c) for c in chunks) + think.flush()
+
+
+def test_think_filter_passes_plain_text():
+    assert _run(["مرحبا ", "بك"]) == "مرحبا بك"
+
+
+def test_think_filter_drops_think_block():
+    assert _run(["<think>reasoning</think>الجواب"]) == "الجواب"
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7])
+def test_think_filter_tags_split_across_chunks(size):
+    text = "قبل<think>سر\nطويل</think>بعد <think>x</think>النهاية"
+    chunks = [text[i:i + size] for i in range(0, len(text), size)]
+    assert _run(chunks) == "قبلبعد النهاية"
+
+
+def test_think_filter_holds_back_only_a_possible_tag():
+    think = ThinkFilter()
+    assert think.feed("a <thi") == "a "
+    assert think.feed("s is not a tag") == "<this is not a tag"
+
+
+def test_think_filter_flush():
+    think = ThinkFilter()
+    think.feed("answer <")
+    assert think.flush() == "<"
+    think = ThinkFilter()
+    think.feed("<think>never closed")
+    assert think.flush() == ""
+
+
+def test_rrf_single_ranking_keeps_order():
+    assert reciprocal_rank_fusion([["a", "b", "c"]]) == ["a", "b", "c"]
+
+
+def test_rrf_rewards_ids_found_by_both_sides():
+    dense = ["a", "b", "c"]
+    lexical = ["c", "d"]
+    fused = reciprocal_rank_fusion([dense, lexical])
+    assert fused[0] == "c"
+    assert set(fused) == {"a", "b", "c", "d"}
+
+
+def test_rrf_scores():
+    fused = reciprocal_rank_fusion([["a", "b"], ["b"]], k=1)
+    # a: 1/2, b: 1/3 + 1/2
+    assert fused == ["b", "a"]
+
+
+def test_rrf_duplicates_count_once_at_best_rank():
+    # Several children of one parent in the same list must not add up
+    assert reciprocal_rank_fusion([["a", "a", "a", "b"], ["b"]], k=1) == ["b", "a"]
+
+
+def test_rrf_skips_none_and_empty():
+    assert reciprocal_rank_fusion([[None, "a"], []]) == ["a"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def _sections(source, articles):
+    from langchain_core.documents import Document
+    return [Document(page_content=f"Article {n}: " + " ".join(f"{source[:4]}{n}x{i}" for i in range(120)),
+                     metadata={"source": source, "subject": source.split(".")[0], "article": f"Article {n}"})
+            for n in range(1, articles + 1)]
+
+
+def _counts(engine):
+    return (engine.vectorstore._collection.count(), len(engine.store),
+            len(engine.lexical_index), len(engine.article_index))
+
+
+def test_add_documents_rolls_back_when_a_later_batch_fails(engine, monkeypatch):
+    retriever = engine.retriever
+    retriever.add_documents(_sections("Kept.pdf", 2))
+    before = _counts(engine)
+    assert all(before)
+
+    monkeypatch.setattr(retriever, "write_batch_size", 2)
+    collection = engine.vectorstore._collection
+    upsert, calls = collection.upsert, []
+
+    def flaky_upsert(**kwargs):
+        calls.append(kwargs["ids"])
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+        return upsert(**kwargs)
+
+    monkeypatch.setattr(collection, "upsert", flaky_upsert)
+    with pytest.raises(RuntimeError, match="disk full"):
+        retriever.add_documents(_sections("Dropped.pdf", 3), ids=["d1", "d2", "d3"])
+
+    assert len(calls) == 2
+    # The first batch was written, then deleted again; nothing else was committed
+    assert _counts(engine) == before
+    assert not collection.get(ids=calls[0])["ids"]
+    assert engine.store.mget(["d1", "d2", "d3"]) == [None, None, None]
+    assert not engine.lexical_index.search("Drop1x5")
+    assert "Dropped" not in engine.article_index.articles
+
+
+_INGEST_IN_ANOTHER_PROCESS = """
+import sys
+sys.path[:0] = sys.argv[3:]
+from conftest import FakeEmbeddings
+from config import Config
+Config.get_embeddings = staticmethod(lambda *args, **kwargs: FakeEmbeddings())
+Config.ANSWER_CACHE = Config.LAW_ROUTER = Config.RERANK = Config.OCR_ENABLED = False
+Config.VECTOR_SHARDING, Config.PDF_BACKEND = "off", "pymupdf"
+from rag_engine import RAGEngine
+RAGEngine(db_path=sys.argv[1]).ingest_all_data(jobs=1, data_path=sys.argv[2])
+"""
+
+
+def test_refresh_reopens_only_this_engines_vector_store(engine, tmp_path):
+    import os
+    import subprocess
+    import sys
+    import chromadb
+    from conftest import write_pdf
+    data = tmp_path / "data"
+    data.mkdir()
+    write_pdf(data / "First.pdf", 4, word="controller")
+    engine.ingest_all_data(jobs=1, data_path=str(data))
+    assert not engine.refresh_if_stale()
+    # A client of another database in this process must survive the refresh
+    other = chromadb.PersistentClient(path=str(tmp_path / "other"))
+    other.get_or_create_collection("unrelated").add(ids=["x"], embeddings=[[1.0, 0.0]])
+
+    write_pdf(data / "Second.pdf", 4, word="processor")
+    tests = os.path.dirname(os.path.abspath(__file__))
+    subprocess.run([sys.executable, "-c", _INGEST_IN_ANOTHER_PROCESS, engine.db_path, str(data),
+                    tests, os.path.dirname(tests)], check=True)
+    hits = engine.vectorstore.similarity_search("every processor", k=4)
+    assert {d.metadata["source"] for d in hits} == {"First.pdf"}  # Stale in-memory segments
+
+    assert engine.refresh_if_stale()
+    hits = engine.vectorstore.similarity_search("every processor", k=4)
+    assert "Second.pdf" in {d.metadata["source"] for d in hits}
+    assert "Second" in {s["subject"] for s in engine.subjects()}
+    assert other.get_collection("unrelated").count() == 1
+    # ... and stay the one registered for its path (no second system on the same files)
+    from chromadb.api.client import SharedSystemClient
+    assert str(tmp_path / "other") in SharedSystemClient._identifier_to_system
+
+
+@pytest.fixture
+def answering_engine(engine, tmp_path, monkeypatch):
+    from config import Config
+    from conftest import write_pdf
+    from stub_llm import StubChatModel
+    llm = StubChatModel(answer_prefix="<think>plan the answer</think>Answer:")
+    monkeypatch.setattr(Config, "get_llm", staticmethod(lambda: llm))
+    data = tmp_path / "data"
+    data.mkdir()
+    write_pdf(data / "PersonalData.pdf", 8)
+    engine.ingest_all_data(jobs=1, data_path=str(data))
+    return engine
+
+
+def _collect(events):
+    events = list(events)
+    assert events[0]["type"] == "sources" and events[-1]["type"] == "done"
+    text = "".join(e["text"] for e in events if e["type"] == "token").strip()
+    return events[0]["documents"], text, events[-1]
+
+
+def test_answer_paths_agree(answering_engine):
+    import asyncio
+    engine = answering_engine
+    query = "which provisions apply to every controller"
+    result = engine.answer(query)
+    docs, streamed, done = _collect(engine.stream_answer(query))
+
+    async def run():
+        return [e async for e in engine.astream_answer(query)]
+    adocs, astreamed, adone = _collect(asyncio.run(run()))
+
+    assert result["result"].startswith("Answer:") and "<think>" not in result["result"]
+    assert result["result"] == streamed == astreamed
+    assert [d.page_content for d in result["source_documents"]] == [d.page_content for d in docs] \
+        == [d.page_content for d in adocs]
+    assert result["cached"] is done["cached"] is adone["cached"] is False
+    for event in (done, adone):
+        assert set(event) >= {"ttft", "total", "overhead", "trace", "prompt_tokens", "prefill"}
+        assert 0 <= event["ttft"] <= event["total"]
+    assert engine.last_trace == done["trace"]
+
+
+def test_answer_paths_agree_on_a_cache_hit(answering_engine, monkeypatch):
+    import asyncio
+    from config import Config
+    engine = answering_engine
+    monkeypatch.setattr(Config, "ANSWER_CACHE", True)
+    query = "which provisions apply to every controller"
+    first = engine.answer(query)
+    assert not first["cached"]
+    assert engine.answer(query)["cached"]
+    docs, streamed, done = _collect(engine.stream_answer(query))
+
+    async def run():
+        return [e async for e in engine.astream_answer(query)]
+    _, astreamed, adone = _collect(asyncio.run(run()))
+    assert streamed == astreamed == first["result"]
+    assert done["cached"] and adone["cached"]
+    assert done["ttft"] == done["total"]
@@ -0,0 +1,100 @@
+import time
+from langchain_core.documents import Document
+from reranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """
+    Scores a pair by how often the query's words occur in the passage; each
+    predict() call takes `delay` seconds.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def predict(self, pairs, batch_size=None, show_progress_bar=None):
+        self.calls.append(list(pairs))
+        time.sleep(self.delay)
+        return [sum(passage.split().count(w) for w in query.split()) for query, passage in pairs]
+
+
+def _reranker(model=None, **kwargs):
+    reranker = CrossEncoderReranker("fake-model", **kwargs)
+    reranker._model = model or FakeCrossEncoder()
+    return reranker
+
+
+def _docs(*texts):
+    return [Document(page_content=t, metadata={"doc_id": f"p{n}"}) for n, t in enumerate(texts)]
+
+
+def test_rerank_orders_by_score_and_keeps_top_n():
+    reranker = _reranker(batch_size=2)
+    docs = _docs("nothing here", "data data", "data", "data data data", "other")
+    ranked = reranker.rerank("data", docs, top_n=3)
+    assert [d.metadata["doc_id"] for d in ranked] == ["p3", "p1", "p2"]
+    assert [d.metadata["rerank_score"] for d in ranked] == [3.0, 2.0, 1.0]
+    assert reranker.last["reranked"] and reranker.last["scored"] == 5
+    assert len(reranker.model.calls) == 3  # Batches of 2
+
+
+def test_ties_keep_retrieval_order():
+    ranked = _reranker().rerank("data", _docs("a", "data", "b", "data"), top_n=4)
+    assert [d.metadata["doc_id"] for d in ranked] == ["p1", "p3", "p0", "p2"]
+
+
+def test_budget_cut_off_keeps_retrieval_order():
+    model = FakeCrossEncoder(delay=0.05)
+    reranker = _reranker(model, budget_ms=80, batch_size=2)
+    docs = _docs("x", "data", "x", "data data", "x", "data data data")
+    ranked = reranker.rerank("data", docs, top_n=3)
+    # The second batch would have overrun the budget: retrieval order, no scores
+    assert ranked == docs[:3]
+    assert all("rerank_score" not in d.metadata for d in docs)
+    last = reranker.last
+    assert (last["reranked"], last["candidates"], last["scored"]) == (False, 6, 2)
+    assert len(model.calls) == 1
+
+
+def test_zero_budget_never_calls_the_model():
+    model = FakeCrossEncoder()
+    reranker = _reranker(model, budget_ms=0)
+    docs = _docs("a", "data")
+    assert reranker.rerank("data", docs, top_n=1) == docs[:1]
+    assert model.calls == []
+
+
+def test_single_candidate_skips_the_model():
+    reranker = CrossEncoderReranker("not-loaded")
+    docs = _docs("only")
+    assert reranker.rerank("query", docs, top_n=3) == docs
+    assert reranker._model is None and not reranker.last["reranked"]
+
+
+def test_long_parents_are_cut_to_max_chars():
+    model = FakeCrossEncoder()
+    _reranker(model, max_chars=10).rerank("q", _docs("x" * 50, "y" * 5), top_n=2)
+    assert [len(passage) for _, passage in model.calls[0]] == [10, 5]
+
+
+def test_retriever_falls_back_to_fused_order_when_the_budget_runs_out(engine, tmp_path):
+    from conftest import write_pdf
+    data = tmp_path / "data"
+    data.mkdir()
+    write_pdf(data / "PersonalData.pdf", 12)
+    engine.ingest_all_data(jobs=1, data_path=str(data))
+    retriever = engine.retriever
+    retriever.k, retriever.rerank_candidates = 3, 10
+    query = "provisions of this article number 7"
+    plain = [d.metadata["doc_id"] for d in retriever.invoke(query)]
+    assert len(plain) == 3
+
+    retriever.reranker = _reranker(budget_ms=0)
+    assert [d.metadata["doc_id"] for d in retriever.invoke(query)] == plain
+    assert retriever.reranker.last["candidates"] == 10 and not retriever.reranker.last["reranked"]
+
+    retriever.reranker = _reranker()
+    reranked = retriever.invoke(query)
+    assert len(reranked) == 3 and retriever.reranker.last["reranked"]
+    assert all("rerank_score" in d.metadata for d in reranked)
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+from config import Config
+import server
+
+
+class FakeEngine:
+    """
+    Just enough of RAGEngine for the request handling; warm_up blocks until released.
+    """
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.queries = []
+
+    def warm_up(self, timer=None):
+        self.release.wait(10)
+
+    def subjects(self):
+        return [{"subject": "PersonalData", "source": "PersonalData.pdf"}]
+
+    def embedding_stats(self):
+        return {}
+
+    async def astream_answer(self, query, llm_slots=None, **filters):
+        self.queries.append((query, filters))
+        yield {"type": "sources", "documents": [], "scope": None}
+        yield {"type": "token", "text": "answer"}
+        yield {"type": "done", "cached": False}
+
+
+def serve(engine, check):
+    async def run():
+        async with TestClient(TestServer(server.create_app(engine))) as client:
+            await check(client)
+    asyncio.run(run())
+
+
+@pytest.fixture
+def fake_engine(monkeypatch):
+    monkeypatch.setattr(Config, "WARMUP", "background")
+    engine = FakeEngine()
+    yield engine
+    engine.release.set()
+
+
+@pytest.mark.parametrize("body", [[], "query", 3, None])
+def test_query_body_must_be_an_object(fake_engine, body):
+    fake_engine.release.set()
+
+    async def check(client):
+        response = await client.post("/query", json=body)
+        assert response.status == 400
+    serve(fake_engine, check)
+
+
+@pytest.mark.parametrize("route, status", [(True, 200), (False, 200), (None, 200), ("no", 400), (1, 400)])
+def test_route_must_be_a_boolean(fake_engine, route, status):
+    fake_engine.release.set()
+
+    async def check(client):
+        response = await client.post("/query", json={"query": "المادة 5", "route": route})
+        assert response.status == status
+    serve(fake_engine, check)
+    if status == 200:
+        assert fake_engine.queries[-1][1]["route"] is route
+
+
+def test_health_reports_warming_while_queries_wait(fake_engine):
+    async def check(client):
+        health = await (await client.get("/health")).json()
+        assert health["status"] == "warming"
+        assert health["startup"]["state"] == "warming"
+        query = asyncio.ensure_future(client.post("/query", json={"query": "المادة 5"}))
+        await asyncio.sleep(0.2)
+        assert not query.done() and not fake_engine.queries
+        fake_engine.release.set()
+        response = await query
+        assert response.status == 200
+        assert (await response.json())["answer"] == "answer"
+        health = await (await client.get("/health")).json()
+        assert health["status"] == "ok" and health["startup"]["state"] == "ready"
+    serve(fake_engine, check)
@@ -0,0 +1,86 @@
+import time
+import pytest
+from conftest import write_pdf
+from watcher import FolderWatcher, is_watched
+
+
+class RecordingEngine:
+    def __init__(self):
+        self.syncs = []
+
+    def ingest_all_data(self, jobs=None, data_path=None):
+        self.syncs.append(data_path)
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+@pytest.fixture
+def start_watcher():
+    watchers = []
+
+    def start(engine, folder, **kwargs):
+        kwargs = {"backend": "poll", "poll_interval": 0.05, "debounce": 0.3, "max_delay": 5, **kwargs}
+        watchers.append(FolderWatcher(engine, folder=str(folder), **kwargs).start())
+        return watchers[-1]
+    yield start
+    for watcher in watchers:
+        watcher.stop()
+
+
+def test_is_watched():
+    assert is_watched("data/Law.pdf")
+    assert is_watched("data/Law.DOCX")
+    assert not is_watched("data/notes.txt")
+    assert not is_watched("data/~$Law.docx")
+
+
+def test_burst_of_changes_syncs_once(tmp_path, start_watcher):
+    engine = RecordingEngine()
+    watcher = start_watcher(engine, tmp_path)
+    assert engine.syncs == [str(tmp_path)]  # Initial catch-up
+
+    for n in range(3):
+        (tmp_path / f"law{n}.pdf").write_bytes(b"%PDF" + bytes(n))
+        time.sleep(0.06)
+    (tmp_path / "notes.txt").write_text("ignored")
+    assert wait_for(lambda: len(engine.syncs) == 2)
+    time.sleep(0.5)
+    assert len(engine.syncs) == 2 and watcher.syncs == 2
+    assert watcher.status()["pending"] == 0
+
+    (tmp_path / "law1.pdf").unlink()
+    assert wait_for(lambda: len(engine.syncs) == 3)
+
+
+def test_max_delay_caps_a_steady_stream_of_changes(tmp_path, start_watcher):
+    engine = RecordingEngine()
+    start_watcher(engine, tmp_path, debounce=0.5, max_delay=0.4)
+    start = time.monotonic()
+    n = 0
+    while len(engine.syncs) < 2 and time.monotonic() - start < 3:
+        (tmp_path / "law.pdf").write_bytes(b"%PDF" + bytes(n))  # Never quiet for 0.5s
+        n += 1
+        time.sleep(0.1)
+    assert len(engine.syncs) == 2
+    assert time.monotonic() - start < 1.5
+
+
+def test_watcher_ingests_added_and_deleted_files(engine, tmp_path, start_watcher):
+    data = tmp_path / "data"
+    data.mkdir()
+    watcher = start_watcher(engine, data, jobs=1)
+    write_pdf(data / "PersonalData.pdf", 4)
+    assert wait_for(lambda: watcher.syncs == 2)
+    assert [s["subject"] for s in engine.subjects()] == ["PersonalData"]
+
+    (data / "PersonalData.pdf").unlink()
+    assert wait_for(lambda: watcher.syncs == 3)
+    assert engine.subjects() == []
+    assert not engine.vectorstore.get(where={"source": "PersonalData.pdf"})["ids"]
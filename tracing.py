@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import atexit
+import threading
+import contextvars
+from contextlib import contextmanager
+from config import Config
+
+# --- TRACING AND METRICS ---
+# Timed spans and counters around the ingest and query stages:
+#   with span("query.vector_search"): ...    one timed stage (nests)
+#   observe("extract.read", seconds)         a stage timed elsewhere
+#   count("query.cache_hits")                a counter
+# Every span feeds a per-name histogram (Prometheus text: render_metrics(),
+# GET /metrics in server.py, METRICS_FILE), is appended to TRACE_LOG as one
+# JSON line when that is set, and is added to the active Trace, if any
+# (collect(): the per-question breakdown shown by the app and the API).
+# With TRACING=0 span() hands back a shared no-op context manager and
+# observe()/count() return at once.
+
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_TRACE = contextvars.ContextVar("trace", default=None)
+_DEPTH = contextvars.ContextVar("trace_depth", default=0)
+
+
+def enabled():
+    return Config.TRACING
+
+
+class _Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # span name -> [bucket counts..., count, sum]
+        self.counters = {}
+
+    def observe(self, name, seconds):
+        with self.lock:
+            row = self.histograms.get(name)
+            if row is None:
+                row = self.histograms[name] = [0] * (len(_BUCKETS) + 2)
+            for i, bound in enumerate(_BUCKETS):
+                if seconds <= bound:
+                    row[i] += 1
+            row[-2] += 1
+            row[-1] += seconds
+
+    def count(self, name, value):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+
+REGISTRY = _Registry()
+_log_lock = threading.Lock()
+
+
+def _log(record):
+    path = Config.TRACE_LOG
+    if not path:
+        return
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _log_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class Trace:
+    """
+    Spans finished while collect() was active, in completion order:
+    [(name, seconds, depth)].
+    """
+
+    def __init__(self):
+        self.spans = []
+        self.counters = {}
+
+    def breakdown(self):
+        """[{"span", "ms", "depth"}], outer spans after the spans they contain."""
+        return [{"span": name, "ms": round(seconds * 1000, 2), "depth": depth}
+                for name, seconds, depth in self.spans]
+
+    def totals(self):
+        """{span name: total ms}, for flat summaries."""
+        out = {}
+        for name, seconds, _ in self.spans:
+            out[name] = round(out.get(name, 0.0) + seconds * 1000, 2)
+        return out
+
+
+def _finish(name, seconds, depth, attrs):
+    REGISTRY.observe(name, seconds)
+    trace = _TRACE.get()
+    if trace is not None:
+        trace.spans.append((name, seconds, depth))
+    if Config.TRACE_LOG:
+        _log({"ts": round(time.time(), 3), "pid": os.getpid(), "span": name,
+              "ms": round(seconds * 1000, 3), **attrs})
+
+
+class _Span:
+    __slots__ = ("name", "attrs", "start", "token")
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.token = _DEPTH.set(_DEPTH.get() + 1)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        depth = _DEPTH.get() - 1
+        try:
+            _DEPTH.reset(self.token)
+        except ValueError:
+            _DEPTH.set(depth)  # Exited in another context (generator closed elsewhere)
+        _finish(self.name, seconds, depth, self.attrs)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name, **attrs):
+    """
+    Times the enclosed block as stage `name`. `attrs` only go to TRACE_LOG.
+    """
+    if not Config.TRACING:
+        return _NOOP
+    return _Span(name, attrs)
+
+
+def traced(name):
+    """
+    Decorator form of span() for plain (non-generator) functions.
+    """
+    def wrap(fn):
+        def inner(*args, **kwargs):
+            if not Config.TRACING:
+                return fn(*args, **kwargs)
+            with _Span(name, {}):
+                return fn(*args, **kwargs)
+        inner.__name__, inner.__doc__, inner.__wrapped__ = fn.__name__, fn.__doc__, fn
+        return inner
+    return wrap
+
+
+def observe(name, seconds, **attrs):
+    """
+    Records a stage timed by the caller (e.g. summed over a stream of pages).
+    """
+    if Config.TRACING:
+        _finish(name, seconds, _DEPTH.get(), attrs)
+
+
+def count(name, value=1):
+    if not Config.TRACING:
+        return
+    REGISTRY.count(name, value)
+    trace = _TRACE.get()
+    if trace is not None:
+        trace.counters[name] = trace.counters.get(name, 0) + value
+
+
+def totals():
+    """
+    {span name: (count, seconds)} recorded so far in this process.
+    """
+    with REGISTRY.lock:
+        return {name: (row[-2], row[-1]) for name, row in REGISTRY.histograms.items()}
+
+
+def merge(trace):
+    """
+    Adds a Trace recorded in another process (pipeline workers) to the metrics.
+    Its TRACE_LOG lines were already written by that process.
+    """
+    if trace is None:
+        return
+    for name, seconds, _ in trace.spans:
+        REGISTRY.observe(name, seconds)
+    for name, value in trace.counters.items():
+        REGISTRY.count(name, value)
+
+
+@contextmanager
+def collect():
+    """
+    Collects the spans finished inside the block (this thread and the threads
+    it hands its context to) into a Trace.
+    """
+    trace = Trace()
+    token = _TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        try:
+            _TRACE.reset(token)
+        except ValueError:
+            _TRACE.set(None)
+
+
+class IterTimer:
+    """
+    Wraps an iterator and sums the time spent producing its items (the time
+    the consumer spends between items is not counted). Stacked IterTimers
+    measure a streaming chain stage by stage: each one includes the stages
+    upstream of it.
+    """
+
+    def __init__(self, iterable):
+        self._it = iter(iterable)
+        self.seconds = 0.0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            return next(self._it)
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+def _metric_name(name):
+    return "rag_" + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics():
+    """
+    All spans and counters in the Prometheus text exposition format.
+    """
+    with REGISTRY.lock:
+        histograms = {name: list(row) for name, row in REGISTRY.histograms.items()}
+        counters = dict(REGISTRY.counters)
+    lines = ["# HELP rag_span_seconds Time spent in instrumented stages.",
+             "# TYPE rag_span_seconds histogram"]
+    for name in sorted(histograms):
+        row = histograms[name]
+        label = _label(name)
+        for bound, n in zip(_BUCKETS, row):
+            lines.append(f'rag_span_seconds_bucket{{span="{label}",le="{bound}"}} {n}')
+        lines.append(f'rag_span_seconds_bucket{{span="{label}",le="+Inf"}} {row[-2]}')
+        lines.append(f'rag_span_seconds_sum{{span="{label}"}} {row[-1]:.6f}')
+        lines.append(f'rag_span_seconds_count{{span="{label}"}} {row[-2]}')
+    for name in sorted(counters):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {counters[name]}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path=None):
+    """
+    Writes render_metrics() to `path` (default METRICS_FILE) atomically, e.g.
+    for node_exporter's textfile collector.
+    """
+    path = path or Config.METRICS_FILE
+    if not path:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_metrics())
+    os.replace(tmp, path)
+
+
+if Config.METRICS_FILE:
+    atexit.register(write_metrics)
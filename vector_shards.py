@@ -0,0 +1,172 @@
+import os
+import re
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# --- SHARDED VECTOR STORE (VECTOR_SHARDING=subject) ---
+# One Chroma collection per subject (law) instead of one collection for the
+# whole corpus. Each HNSW graph stays small, so builds and searches scale with
+# the law rather than the corpus. A query embeds once, searches the shards in
+# parallel and merges their hits by distance; a `source` filter (explicit or
+# from the law router) only touches the shards of the selected laws.
+# Exposes the subset of the langchain Chroma API the engine uses.
+
+
+def shard_name(base, subject):
+    """
+    Collection name for a subject. Chroma names are 3-63 chars of [A-Za-z0-9._-],
+    so Arabic/odd names are slugged and a short hash keeps them unique.
+    """
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', subject).strip('_-')[:32]
+    digest = hashlib.sha1(subject.encode("utf-8")).hexdigest()[:8]
+    return f"{base}__{slug}-{digest}" if slug else f"{base}__{digest}"
+
+
+def _filter_subjects(where):
+    # Subjects a `source` filter can match (None: any)
+    if not where or "source" not in where:
+        return None
+    value = where["source"]
+    names = value["$in"] if isinstance(value, dict) else [value]
+    return {os.path.splitext(name)[0] for name in names}
+
+
+class ShardedChroma:
+    def __init__(self, base_name, embedding_function, persist_directory, collection_metadata=None, threads=4):
+        import chromadb
+        self.base_name = base_name
+        self.embedding_function = embedding_function
+        self.collection_metadata = collection_metadata
+        self._client = chromadb.PersistentClient(path=persist_directory)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="shard")
+        self.shards = {}  # collection name -> langchain Chroma
+        prefix = base_name + "__"
+        for collection in self._client.list_collections():
+            name = getattr(collection, "name", collection)  # Collection objects or names, by chromadb version
+            if name.startswith(prefix):
+                self._open(name)
+
+    def close(self):
+        """
+        Releases the Chroma client (and its in-memory system, if no other client
+        in the process holds the same path) and the search threads.
+        """
+        self._pool.shutdown(wait=False)
+        self._client.close()
+
+    def _open(self, name):
+        from langchain_chroma import Chroma
+        shard = self.shards.get(name)
+        if shard is None:
+            shard = self.shards[name] = Chroma(
+                collection_name=name,
+                embedding_function=self.embedding_function,
+                client=self._client,
+                collection_metadata=self.collection_metadata,
+            )
+        return shard
+
+    def _targets(self, where):
+        subjects = _filter_subjects(where)
+        if subjects is None:
+            return list(self.shards.values())
+        names = {shard_name(self.base_name, s) for s in subjects}
+        return [shard for name, shard in self.shards.items() if name in names]
+
+    def add_documents(self, documents, ids=None):
+        groups = {}
+        for i, doc in enumerate(documents):
+            subject = doc.metadata.get("subject") or os.path.splitext(doc.metadata.get("source", ""))[0]
+            docs, doc_ids = groups.setdefault(subject, ([], []))
+            docs.append(doc)
+            doc_ids.append(ids[i] if ids is not None else None)
+        written = []
+        for subject, (docs, doc_ids) in groups.items():
+            shard = self._open(shard_name(self.base_name, subject))
+            written.extend(shard.add_documents(docs, ids=doc_ids if ids is not None else None))
+        return written
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    def upsert_embedded(self, documents, ids, embeddings):
+        """
+        Writes already-embedded chunks to their subjects' shards.
+        """
+        groups = {}
+        for doc, doc_id, vector in zip(documents, ids, embeddings):
+            subject = doc.metadata.get("subject") or os.path.splitext(doc.metadata.get("source", ""))[0]
+            groups.setdefault(subject, []).append((doc, doc_id, vector))
+        for subject, rows in groups.items():
+            shard = self._open(shard_name(self.base_name, subject))
+            shard._collection.upsert(ids=[r[1] for r in rows], embeddings=[r[2] for r in rows],
+                                     documents=[r[0].page_content for r in rows],
+                                     metadatas=[r[0].metadata for r in rows])
+
+    def delete(self, ids=None, where=None):
+        # Child ids do not name their shard; deleting unknown ids is a no-op
+        for shard in self._targets(where):
+            if ids is not None:
+                shard.delete(ids=ids)
+            else:
+                shard._collection.delete(where=where)
+
+    def similarity_search_with_score(self, query, k=4, filter=None):
+        """
+        [(Document, distance)] over the shards `filter` can match, nearest first.
+        """
+        if not self._targets(filter):
+            return []
+        return self.similarity_search_by_vector_with_score(self.embedding_function.embed_query(query), k, filter)
+
+    def similarity_search_by_vector_with_score(self, vector, k=4, filter=None):
+        targets = self._targets(filter)
+        if not targets:
+            return []
+        if len(targets) == 1:
+            return targets[0].similarity_search_by_vector_with_relevance_scores(vector, k=k, filter=filter)
+        results = self._pool.map(
+            lambda shard: shard.similarity_search_by_vector_with_relevance_scores(vector, k=k, filter=filter),
+            targets)
+        merged = [hit for hits in results for hit in hits]
+        merged.sort(key=lambda hit: hit[1])
+        return merged[:k]
+
+    def similarity_search(self, query, k=4, filter=None):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")):
+        """
+        Chroma-style get() across shards. With limit/offset the shards are paged
+        in name order, as if they were one collection.
+        """
+        include = list(include)
+        out = {"ids": [], **{field: [] for field in include}}
+
+        def collect(batch):
+            out["ids"].extend(batch["ids"])
+            for field in include:
+                out[field].extend(batch.get(field) if batch.get(field) is not None else [])
+
+        if limit is None:
+            for shard in self._targets(where):
+                collect(shard.get(ids=ids, where=where, include=include))
+            return out
+        skip = offset or 0
+        for name in sorted(self.shards):
+            shard = self.shards[name]
+            if where is not None and shard not in self._targets(where):
+                continue
+            size = shard._collection.count()
+            if skip >= size:
+                skip -= size
+                continue
+            collect(shard.get(ids=ids, where=where, limit=limit - len(out["ids"]), offset=skip, include=include))
+            skip = 0
+            if len(out["ids"]) >= limit:
+                break
+        return out
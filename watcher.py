@@ -0,0 +1,194 @@
+import os
+import time
+import argparse
+import threading
+from config import Config
+from pipeline import list_data_files, SUPPORTED_EXTENSIONS, IGNORED_PREFIXES
+
+# --- WATCH-FOLDER INGESTION ---
+# Watches Config.DATA_PATH for created / modified / deleted / renamed PDF and
+# DOCX files (watchdog filesystem events, or polling when watchdog is missing
+# or WATCH_BACKEND=poll). A burst of changes is debounced: the sync starts once
+# the folder has been quiet for WATCH_DEBOUNCE_SECONDS (or WATCH_MAX_DELAY_SECONDS
+# after the first change) and ingests everything as one batch through
+# RAGEngine.ingest_all_data, so indexes and the manifest are saved once.
+#   python watcher.py              standalone daemon (the query service and the
+#                                  Streamlit app reload the index on their next query)
+#   python server.py --watch       watcher inside the query service
+
+
+def is_watched(path):
+    name = os.path.basename(path)
+    return name.lower().endswith(SUPPORTED_EXTENSIONS) and not name.startswith(IGNORED_PREFIXES)
+
+
+def snapshot(folder):
+    """
+    {path: (mtime_ns, size)} of the watched files, for the polling backend.
+    """
+    state = {}
+    for path in list_data_files(folder):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue  # Deleted between listing and stat
+        state[path] = (st.st_mtime_ns, st.st_size)
+    return state
+
+
+class FolderWatcher:
+    def __init__(self, engine, folder=None, debounce=None, max_delay=None, poll_interval=None,
+                 backend=None, jobs=None):
+        self.engine = engine
+        self.folder = folder or Config.DATA_PATH
+        self.debounce = Config.WATCH_DEBOUNCE_SECONDS if debounce is None else debounce
+        self.max_delay = Config.WATCH_MAX_DELAY_SECONDS if max_delay is None else max_delay
+        self.poll_interval = poll_interval or Config.WATCH_POLL_SECONDS
+        self.backend = (backend or Config.WATCH_BACKEND).lower()
+        self.jobs = jobs
+        self.syncs = 0
+        self.last_sync = None
+        self._first_change = None
+        self._last_change = None
+        self._changed = set()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._observer = None
+        self._threads = []
+
+    # --- change notifications (any thread) ---
+
+    def notify(self, path):
+        if not is_watched(path):
+            return
+        with self._cond:
+            now = time.monotonic()
+            self._first_change = self._first_change or now
+            self._last_change = now
+            self._changed.add(os.path.basename(path))
+            self._cond.notify()
+
+    # --- backends ---
+
+    def _start_watchdog(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return False
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                watcher.notify(event.src_path)
+                if getattr(event, "dest_path", None):
+                    watcher.notify(event.dest_path)
+
+        self._observer = Observer()
+        self._observer.schedule(Handler(), self.folder, recursive=False)
+        self._observer.daemon = True
+        self._observer.start()
+        print(f"👀 Watching {self.folder} (filesystem events)")
+        return True
+
+    def _poll_loop(self):
+        previous = snapshot(self.folder)
+        while not self._stop.wait(self.poll_interval):
+            current = snapshot(self.folder)
+            for path in set(previous) | set(current):
+                if previous.get(path) != current.get(path):
+                    self.notify(path)
+            previous = current
+
+    # --- debounced sync ---
+
+    def _due(self):
+        # Seconds until the pending batch should be synced (None: nothing pending)
+        if self._last_change is None:
+            return None
+        now = time.monotonic()
+        return max(0.0, min(self._last_change + self.debounce, self._first_change + self.max_delay) - now)
+
+    def _sync_loop(self):
+        while not self._stop.is_set():
+            with self._cond:
+                wait = self._due()
+                if wait is None or wait > 0:
+                    self._cond.wait(timeout=wait if wait is not None else 1.0)
+                    continue
+                changed = sorted(self._changed)
+                self._changed.clear()
+                self._first_change = self._last_change = None
+            self.sync(changed)
+
+    def sync(self, changed=()):
+        start = time.perf_counter()
+        if changed:
+            print(f"📥 {len(changed)} file(s) changed: {', '.join(changed[:5])}{' ...' if len(changed) > 5 else ''}")
+        try:
+            self.engine.ingest_all_data(jobs=self.jobs, data_path=self.folder)
+        except Exception as e:
+            # Keep watching; the manifest makes the next sync retry what was missed
+            print(f"❌ Watch sync failed: {e}")
+            return False
+        self.syncs += 1
+        self.last_sync = time.time()
+        print(f"✅ Watch sync done in {time.perf_counter() - start:.1f}s")
+        return True
+
+    def start(self, initial_sync=True):
+        """
+        Starts watching in background threads. `initial_sync` first catches up on
+        changes made while nothing was watching.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        if initial_sync:
+            self.sync()
+        if self.backend == "poll" or not self._start_watchdog():
+            print(f"👀 Watching {self.folder} (polling every {self.poll_interval}s)")
+            self._threads.append(threading.Thread(target=self._poll_loop, name="watch-poll", daemon=True))
+        self._threads.append(threading.Thread(target=self._sync_loop, name="watch-sync", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def status(self):
+        with self._cond:
+            pending = len(self._changed)
+        return {"folder": self.folder, "syncs": self.syncs, "last_sync": self.last_sync, "pending": pending}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest files as they appear in the data folder.")
+    parser.add_argument("--folder", default=Config.DATA_PATH)
+    parser.add_argument("--poll", action="store_true", help="Poll instead of using filesystem events")
+    parser.add_argument("--jobs", "-j", type=int, default=Config.INGEST_WORKERS,
+                        help="Extraction worker processes per sync")
+    args = parser.parse_args(argv)
+
+    from rag_engine import RAGEngine
+    watcher = FolderWatcher(RAGEngine(), folder=args.folder, jobs=args.jobs,
+                            backend="poll" if args.poll else None).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("🛑 Stopping watcher...")
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    main()